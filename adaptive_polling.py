@@ -0,0 +1,180 @@
+"""
+Adaptive polling for the PrairieTest monitor.
+Learns when slots are released and speeds up around those times, slows down
+when nothing usually happens, and backs off when the site is struggling.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Optional, List, Dict
+
+from scheduler import IntervalPolicy, BurstWindow
+from slot_state import slot_key
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 7 * 24
+
+# HTTP statuses that mean "slow down" rather than "something is broken"
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+
+def hour_of_week(moment: datetime) -> int:
+    """Bucket a moment into one of the 168 hours of the week (Monday 00:00 = 0)."""
+    return moment.weekday() * 24 + moment.hour
+
+
+class SlotReleaseHistory:
+    """Persisted hour-of-week counts of slots appearing and disappearing, per location."""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.counts = {}
+        self._load()
+
+    @classmethod
+    def for_path(cls, path: str) -> 'SlotReleaseHistory':
+        """Share one history per file between all monitors in the process."""
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.counts = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read slot history %s: %s", self.path, e)
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.counts, f)
+        os.replace(tmp_path, self.path)
+
+    def record(self, location: str, event: str, moment: datetime):
+        """Count an 'added' or 'removed' event for a location at a moment."""
+        with self.lock:
+            buckets = self.counts.setdefault(location, {}).setdefault(event, [0] * HOURS_PER_WEEK)
+            buckets[hour_of_week(moment)] += 1
+
+    def flush(self):
+        """Write the counts to disk."""
+        with self.lock:
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("Could not write slot history %s: %s", self.path, e)
+
+    def activity(self, moment: datetime) -> int:
+        """Total events recorded in the hour-of-week of a moment."""
+        hour = hour_of_week(moment)
+        with self.lock:
+            return sum(buckets[hour] for events in self.counts.values() for buckets in events.values())
+
+    def total(self) -> int:
+        """Total events recorded across the whole week."""
+        with self.lock:
+            return sum(sum(buckets) for events in self.counts.values() for buckets in events.values())
+
+
+class AdaptiveIntervalPolicy(IntervalPolicy):
+    """Interval policy driven by slot-release history, recent churn and errors.
+
+    - Historically hot hours and the minutes after any slot change use min_interval.
+    - Hours with no recorded activity (once enough history exists) use max_interval.
+    - HTTP 429/5xx and repeated check failures back off exponentially.
+    """
+
+    def __init__(self, interval: float, history: SlotReleaseHistory, min_interval: float,
+                 max_interval: float, jitter: float = 0, burst_windows: Optional[List[BurstWindow]] = None,
+                 hot_threshold: int = 3, churn_window: float = 600, max_backoff: float = 1800):
+        super().__init__(interval, jitter=jitter, burst_windows=burst_windows)
+        self.history = history
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.hot_threshold = hot_threshold
+        self.churn_window = churn_window
+        self.max_backoff = max_backoff
+        self.previous_keys = None
+        self.previous_locations = {}
+        self.last_churn = None
+        self.consecutive_errors = 0
+        self.backoff_status = None
+        self.retry_after = None
+        self.reason = 'base'
+
+    def record_success(self, slots: List[Dict[str, str]]):
+        """Diff the slots against the previous check and record any releases."""
+        self.consecutive_errors = 0
+        self.backoff_status = None
+        self.retry_after = None
+
+        locations = {slot_key(slot): slot.get('location') for slot in slots}
+        keys = set(locations)
+        if self.previous_keys is not None and keys != self.previous_keys:
+            now = datetime.now()
+            for key in keys - self.previous_keys:
+                self.history.record(locations[key], 'added', now)
+            for key in self.previous_keys - keys:
+                self.history.record(self.previous_locations[key], 'removed', now)
+            self.history.flush()
+            self.last_churn = time.monotonic()
+            logger.info("Slot churn: %s added, %s removed",
+                        len(keys - self.previous_keys), len(self.previous_keys - keys))
+        self.previous_keys = keys
+        self.previous_locations = locations
+
+    def record_error(self, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        """Count a failed check; server pushback starts backing off immediately."""
+        self.consecutive_errors += 1
+        if status_code in BACKOFF_STATUSES:
+            self.backoff_status = status_code
+        self.retry_after = retry_after
+
+    def _choose_interval(self, moment: datetime):
+        base = self.base_interval(moment)
+
+        # Server pushback, or the same check failing again and again
+        if self.backoff_status or self.consecutive_errors >= 2:
+            exponent = self.consecutive_errors if self.backoff_status else self.consecutive_errors - 1
+            delay = min(base * 2 ** exponent, self.max_backoff)
+            if self.retry_after:
+                delay = max(delay, self.retry_after)
+            reason = f"backoff (HTTP {self.backoff_status})" if self.backoff_status else \
+                f"backoff ({self.consecutive_errors} errors)"
+            return delay, reason
+
+        if self.last_churn is not None and time.monotonic() - self.last_churn < self.churn_window:
+            return min(base, self.min_interval), 'recent churn'
+
+        if self.history.activity(moment) >= self.hot_threshold:
+            return min(base, self.min_interval), 'hot window'
+
+        # Only trust a quiet hour once there is history for the rest of the week
+        if base == self.interval and self.history.total() >= self.hot_threshold * 10 \
+                and self.history.activity(moment) == 0:
+            return max(base, self.max_interval), 'quiet window'
+
+        return base, 'base'
+
+    def next_delay(self, moment: Optional[datetime] = None) -> float:
+        moment = moment or datetime.now()
+        delay, reason = self._choose_interval(moment)
+
+        if (delay, reason) != (self.current_interval, self.reason):
+            logger.info("Polling interval now %gs (%s)", delay, reason)
+        self.current_interval, self.reason = delay, reason
+
+        return self._finish_delay(delay, moment, allow_burst_wakeup=not reason.startswith('backoff'))
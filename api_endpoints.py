@@ -0,0 +1,157 @@
+"""
+JSON endpoint polling for the PrairieTest monitor.
+Finds the XHR/fetch requests the schedule page loads its data from (using
+Chrome DevTools performance logs) and maps their JSON into the same slot
+dicts ({'date', 'time', 'location'}) the HTML parsers produce.
+"""
+
+import re
+import json
+import base64
+import logging
+from typing import Optional, List, Dict, Any
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import WebDriverException
+
+from slot_state import slot_key
+
+logger = logging.getLogger(__name__)
+
+# Keys that hold a slot's fields in the JSON, in order of preference
+DATE_KEYS = ('date', 'day', 'slot_date', 'slotDate', 'start_date', 'startDate')
+TIME_KEYS = ('time', 'start_time', 'startTime', 'time_range', 'timeRange')
+END_TIME_KEYS = ('end_time', 'endTime')
+DATETIME_KEYS = ('start', 'starts_at', 'startsAt', 'start_at', 'startAt', 'datetime', 'start_datetime')
+END_DATETIME_KEYS = ('end', 'ends_at', 'endsAt', 'end_at', 'endAt', 'end_datetime')
+LOCATION_KEYS = ('location', 'location_name', 'locationName', 'room', 'center', 'building', 'venue')
+
+# Flags that mark a listed slot as not bookable
+UNAVAILABLE_STATUSES = {'full', 'closed', 'unavailable', 'cancelled', 'canceled', 'booked'}
+SEAT_KEYS = ('seats_available', 'seatsAvailable', 'available_seats', 'availableSeats', 'remaining', 'capacity_left')
+
+# JSON endpoints whose path looks like schedule data are kept even while they list no slots
+SCHEDULE_PATH_HINT = re.compile(r'slot|schedul|reserv|exam|availab', re.IGNORECASE)
+
+_ISO_DATETIME = re.compile(r'^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2})')
+
+
+def _first(item: Dict[str, Any], keys) -> Any:
+    for key in keys:
+        value = item.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _location_text(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        return _first(value, ('name', 'title', 'label', 'description'))
+    return str(value) if value is not None else None
+
+
+def _is_unavailable(item: Dict[str, Any]) -> bool:
+    if item.get('available') is False or item.get('is_available') is False or item.get('isAvailable') is False:
+        return True
+    status = item.get('status')
+    if isinstance(status, str) and status.lower() in UNAVAILABLE_STATUSES:
+        return True
+    seats = _first(item, SEAT_KEYS)
+    return isinstance(seats, (int, float)) and not isinstance(seats, bool) and seats <= 0
+
+
+def json_slot(item: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Map one JSON object to a slot dict, or None if it does not describe a slot."""
+    slot_date = _first(item, DATE_KEYS)
+    slot_time = _first(item, TIME_KEYS)
+
+    # '2024-01-15T21:00:00' style start (and end) timestamps
+    start = _first(item, DATETIME_KEYS)
+    if isinstance(start, str):
+        match = _ISO_DATETIME.match(start)
+        if match:
+            slot_date = slot_date or match.group(1)
+            slot_time = slot_time or match.group(2)
+
+    if not isinstance(slot_date, str) or not isinstance(slot_time, str):
+        return None
+
+    end = _first(item, END_TIME_KEYS)
+    end_datetime = _first(item, END_DATETIME_KEYS)
+    if end is None and isinstance(end_datetime, str) and _ISO_DATETIME.match(end_datetime):
+        end = _ISO_DATETIME.match(end_datetime).group(2)
+    if isinstance(end, str) and end not in slot_time:
+        slot_time = f"{slot_time} - {end}"
+
+    return {
+        'date': slot_date.strip(),
+        'time': slot_time.strip(),
+        'location': (_location_text(_first(item, LOCATION_KEYS)) or 'Unknown').strip()
+    }
+
+
+def slots_from_json(data: Any) -> List[Dict[str, str]]:
+    """Every bookable slot described anywhere in a JSON document."""
+    slots = []
+    seen = set()
+    pending = [data]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(reversed(node))
+        elif isinstance(node, dict):
+            slot = json_slot(node)
+            if slot is None:
+                pending.extend(reversed(list(node.values())))
+            elif not _is_unavailable(node) and slot_key(slot) not in seen:
+                seen.add(slot_key(slot))
+                slots.append(slot)
+    return slots
+
+
+def capture_json_endpoints(driver, host: str) -> List[str]:
+    """GET XHR/fetch URLs on host that returned slot JSON since the last call.
+
+    Reads (and so drains) the driver's performance log, which must have been
+    enabled with the goog:loggingPrefs capability when the browser started.
+    """
+    try:
+        entries = driver.get_log('performance')
+    except WebDriverException as e:
+        logger.warning("Performance log unavailable, cannot capture JSON endpoints: %s", e)
+        return []
+
+    methods = {}
+    responses = []
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, TypeError, ValueError):
+            continue
+        params = message.get('params', {})
+        if message.get('method') == 'Network.requestWillBeSent':
+            methods[params.get('requestId')] = params.get('request', {}).get('method')
+        elif message.get('method') == 'Network.responseReceived' and params.get('type') in ('XHR', 'Fetch'):
+            responses.append(params)
+
+    endpoints = []
+    for params in responses:
+        response = params.get('response', {})
+        url = response.get('url', '')
+        if (urlparse(url).netloc != host or 'json' not in response.get('mimeType', '')
+                or methods.get(params.get('requestId'), 'GET') != 'GET' or url in endpoints):
+            continue
+
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': params['requestId']})
+            text = base64.b64decode(body['body']).decode('utf-8') if body.get('base64Encoded') else body['body']
+            slot_count = len(slots_from_json(json.loads(text)))
+        except (WebDriverException, KeyError, ValueError) as e:
+            logger.debug("Skipping %s: %s", url, e)
+            continue
+
+        if slot_count or SCHEDULE_PATH_HINT.search(urlparse(url).path):
+            logger.info("Captured schedule endpoint %s (%s slots)", url, slot_count)
+            endpoints.append(url)
+
+    return endpoints
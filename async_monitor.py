@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Asyncio PrairieTest monitor.
+Runs any number of accounts and watches on one event loop: schedule requests
+go over a shared, pooled aiohttp client with bounded concurrency, parsing runs
+in an executor and alerts are delivered through async notification sinks.
+Logging in still goes through Selenium, which is synchronous, so it runs in a
+worker thread on the wrapped PrairieTestMonitor.
+"""
+
+import sys
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Optional, List, Dict, Any, Callable
+
+import aiohttp
+import requests
+
+from config import load_config
+from prairie_monitor import PrairieTestMonitor, USER_AGENT
+from browser_factory import ChromeFactory
+from notifier import NotificationDispatcher
+from slot_matcher import SlotMatcher, WatchRule
+from metrics import MetricsExporter, STAGE_SECONDS
+from logging_setup import configure_logging, stop_logging, start_check
+
+logger = logging.getLogger(__name__)
+
+
+class EmailSink:
+    """Notification sink that hands alerts to the background SMTP dispatcher."""
+
+    def __init__(self, notifier: NotificationDispatcher, default_recipient: Optional[str] = None):
+        self.notifier = notifier
+        self.default_recipient = default_recipient
+
+    async def send(self, slots: List[Dict[str, str]], recipient: Optional[str], prairie_url: str,
+                   detected_at: Optional[float] = None,
+                   on_undelivered: Optional[Callable[[List[Dict[str, str]]], None]] = None):
+        # submit() only enqueues; SMTP runs on the dispatcher's own thread
+        self.notifier.submit(slots, recipient or self.default_recipient, prairie_url, detected_at=detected_at,
+                             on_undelivered=on_undelivered)
+
+
+class AsyncPrairieTestMonitor:
+    """Async checks for one account, evaluating every watch on it against one fetch.
+
+    Sinks are objects with an ``async send(slots, recipient, prairie_url, detected_at=None,
+    on_undelivered=None)`` method; every new-slot alert is delivered to all of them concurrently.
+    detected_at is the wall-clock start of the check that found the slots. A sink that gives up
+    on an alert calls on_undelivered(slots), which forgets them so the next check alerts again.
+    """
+
+    def __init__(self, monitor: Optional[PrairieTestMonitor] = None, matcher: Optional[SlotMatcher] = None,
+                 recipients: Optional[Dict[str, Optional[str]]] = None, sinks: Optional[List[Any]] = None,
+                 http: Optional[aiohttp.ClientSession] = None, executor: Optional[ThreadPoolExecutor] = None,
+                 fetch_limit: Optional[asyncio.Semaphore] = None):
+        self.monitor = monitor or PrairieTestMonitor()
+        self.config = self.monitor.config
+        watch_name = self.config['watch_name']
+        self.matcher = matcher or self.monitor.matcher
+        self.recipients = recipients if recipients is not None else {watch_name: None}
+        self.sinks = sinks if sinks is not None else [
+            EmailSink(self.monitor.notifier, self.config['notification_email'])
+        ]
+        self.http = http
+        self.owns_http = http is None
+        self.executor = executor
+        self.fetch_limit = fetch_limit or asyncio.Semaphore(self.config['max_concurrent_fetches'])
+
+    async def _client(self) -> aiohttp.ClientSession:
+        if self.http is None:
+            self.http = create_client(self.config)
+        return self.http
+
+    def _cookie_header(self, url: str) -> Optional[str]:
+        """The Cookie header the HTTP session would send to url."""
+        request = requests.Request('GET', url).prepare()
+        return requests.cookies.get_cookie_header(self.monitor.session.cookies, request)
+
+    def _keep_cookies(self, response: aiohttp.ClientResponse):
+        """Copy cookies the server set into the HTTP session, which owns the login."""
+        for name, morsel in response.cookies.items():
+            self.monitor.session.cookies.set(
+                name,
+                morsel.value,
+                domain=morsel['domain'] or response.url.host,
+                path=morsel['path'] or '/'
+            )
+
+    async def _get(self, url: str, accept: str) -> Optional[str]:
+        """Conditional GET of url; the body (cached on a 304), or None if the login is gone."""
+        monitor = self.monitor
+        headers = {'Accept': accept, **monitor.page_cache.request_headers(url)}
+        cookie_header = self._cookie_header(url)
+        if cookie_header:
+            headers['Cookie'] = cookie_header
+
+        client = await self._client()
+        async with self.fetch_limit:
+            async with client.get(url, headers=headers) as response:
+                text = await response.text()
+                self._keep_cookies(response)
+                return monitor._response_body(url, response.status, str(response.url), response.headers, text)
+
+    async def fetch_slots(self) -> Optional[List[Dict[str, str]]]:
+        """Every slot on the schedule, unfiltered (None if the check failed).
+
+        Only the requests go over aiohttp. Checking the responses, parsing and
+        recording the check are the wrapped monitor's own steps, so both
+        paths handle them the same way.
+        """
+        monitor = self.monitor
+        if not (monitor._polls_over_http() and monitor.is_logged_in and monitor.session):
+            # Restoring a session, logging in and browser mode all go through the sync monitor
+            return await asyncio.to_thread(monitor._fetch_slots)
+        if not monitor._begin_fetch():
+            return None
+
+        urls, from_json = monitor._poll_urls()
+        accept = 'application/json' if from_json else 'text/html,application/xhtml+xml'
+        try:
+            with STAGE_SECONDS.time(stage='fetch'):
+                bodies = await asyncio.gather(*(self._get(url, accept) for url in urls))
+            if any(body is None for body in bodies):
+                # Logged out: log in through the browser in a worker thread
+                return await asyncio.to_thread(monitor._fetch_slots)
+            await asyncio.to_thread(monitor._save_http_session)
+
+            slots = await asyncio.get_running_loop().run_in_executor(
+                self.executor, monitor._slots_from_bodies, urls, bodies, from_json
+            )
+            if slots is None:
+                # An endpoint stopped returning JSON; the sync check parses the page instead
+                return await asyncio.to_thread(monitor._fetch_slots)
+            if not from_json:
+                slots = await asyncio.to_thread(monitor._confirm_page_slots, slots, True)
+                if slots is None:
+                    monitor._record_failed_check()
+                    return None
+        except Exception as e:
+            monitor._record_fetch_error(e)
+            return None
+
+        monitor._record_successful_check(slots)
+        return slots
+
+    async def notify(self, slots: List[Dict[str, str]], recipient: Optional[str] = None,
+                     watch_name: Optional[str] = None):
+        """Deliver an alert to every sink concurrently."""
+        detected_at = self.monitor.check_started
+        on_undelivered = partial(self.monitor.slot_state.forget, watch_name or self.config['watch_name'])
+        results = await asyncio.gather(
+            *(sink.send(slots, recipient, self.config['prairie_url'], detected_at=detected_at,
+                        on_undelivered=on_undelivered)
+              for sink in self.sinks),
+            return_exceptions=True
+        )
+        for sink, result in zip(self.sinks, results):
+            if isinstance(result, Exception):
+                logger.error("Error sending notification via %s: %s", type(sink).__name__, result)
+
+    async def check_and_notify(self):
+        """Fetch once, match every watch and alert about slots each watch has not seen yet."""
+        start_check()
+        try:
+            slots = await self.fetch_slots()
+            if slots is None:
+                logger.warning("Check failed, keeping the previous slot snapshot")
+                return
+            if self.monitor.schedule_unchanged:
+                logger.info("Schedule unchanged, nothing to match (%s)", self.monitor.page_cache.summary())
+                return
+
+            with STAGE_SECONDS.time(stage='match'):
+                matches = self.matcher.match_all(slots)
+            for watch_name, recipient in self.recipients.items():
+                new_slots, _ = await asyncio.to_thread(self.monitor.slot_state.diff, watch_name, matches[watch_name],
+                                                      observed_at=self.monitor.check_started)
+                if new_slots:
+                    logger.info("[%s] Found %s new available slots!", watch_name, len(new_slots))
+                    if self.monitor.reserver.enabled:
+                        new_slots = await asyncio.to_thread(self.monitor._reserve_slots, new_slots, watch_name)
+                    await self.notify(new_slots, recipient, watch_name)
+                elif matches[watch_name]:
+                    logger.info("[%s] No new slots (%s already notified)", watch_name, len(matches[watch_name]))
+        except Exception as e:
+            logger.error("Error in check_and_notify: %s", e)
+        finally:
+            self.monitor.last_check = datetime.now()
+
+    async def run(self):
+        """Check on the monitor's interval policy until cancelled."""
+        while True:
+            await self.check_and_notify()
+            await asyncio.sleep(self.monitor._next_delay())
+
+    async def close(self):
+        if self.owns_http and self.http is not None:
+            await self.http.close()
+        await asyncio.to_thread(self.monitor.cleanup)
+
+
+def create_client(config: Dict[str, Any]) -> aiohttp.ClientSession:
+    """Pooled client shared by every monitor; cookies stay in each account's own HTTP session."""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=config['max_concurrent_fetches'], ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=config['http_timeout']),
+        cookie_jar=aiohttp.DummyCookieJar(),
+        headers={'User-Agent': USER_AGENT}
+    )
+
+
+class AsyncMonitorGroup:
+    """Many accounts and watches on one event loop, sharing one client, executor and concurrency limit."""
+
+    def __init__(self, watches, max_browsers: Optional[int] = None, max_concurrency: Optional[int] = None):
+        from watch_supervisor import BrowserPool
+
+        self.config = load_config()
+        self.max_concurrency = max_concurrency or self.config['max_concurrent_fetches']
+        self.browser_pool = BrowserPool(max_browsers or self.config['max_browsers'],
+                                        ChromeFactory.for_config(self.config).create)
+        self.notifier = NotificationDispatcher(self.config)
+        self.executor = ThreadPoolExecutor(max_workers=self.config['max_workers'], thread_name_prefix='parse')
+        self.watches = watches
+        self.http = None
+        self.monitors = []
+        self.metrics_exporter = MetricsExporter.from_config(self.config)
+
+    async def start(self):
+        self.http = create_client(dict(self.config, max_concurrent_fetches=self.max_concurrency))
+        fetch_limit = asyncio.Semaphore(self.max_concurrency)
+        sinks = [EmailSink(self.notifier, self.config['notification_email'])]
+
+        by_account = {}
+        for watch in self.watches:
+            by_account.setdefault(watch.account_key, []).append(watch)
+
+        for account_watches in by_account.values():
+            fetch_mode = 'api' if self.config['fetch_mode'] == 'api' else 'http'
+            monitor = PrairieTestMonitor(config=dict(account_watches[0].account, fetch_mode=fetch_mode),
+                                         browser_pool=self.browser_pool, notifier=self.notifier)
+            self.monitors.append(AsyncPrairieTestMonitor(
+                monitor,
+                matcher=SlotMatcher([WatchRule.from_criteria(watch.name, watch.criteria)
+                                     for watch in account_watches]),
+                recipients={watch.name: watch.notification_email for watch in account_watches},
+                sinks=sinks,
+                http=self.http,
+                executor=self.executor,
+                fetch_limit=fetch_limit
+            ))
+
+    async def run(self):
+        """Run every account's check loop until cancelled."""
+        if not self.monitors:
+            await self.start()
+        logger.info("Running %s watches across %s accounts on one event loop (at most %s concurrent requests)",
+                    len(self.watches), len(self.monitors), self.max_concurrency)
+        self.metrics_exporter.start()
+        await asyncio.gather(*(monitor.run() for monitor in self.monitors))
+
+    async def close(self):
+        for monitor in self.monitors:
+            await asyncio.to_thread(monitor.monitor.cleanup)
+        if self.http is not None:
+            await self.http.close()
+        self.executor.shutdown(wait=False)
+        self.notifier.stop()
+        self.browser_pool.close()
+        self.metrics_exporter.stop()
+
+
+async def main(path: str):
+    from watch_supervisor import load_watches
+
+    group = AsyncMonitorGroup(load_watches(path))
+    configure_logging(group.config)
+    try:
+        await group.run()
+    finally:
+        await group.close()
+        stop_logging()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else 'watches.json'))
+    except KeyboardInterrupt:
+        logger.info("Received interrupt signal, stopping...")
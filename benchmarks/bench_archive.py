@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark the slot archive on a synthetic year of schedule changes.
+
+Usage:
+    python benchmarks/bench_archive.py                 # 365 days, 20 locations
+    python benchmarks/bench_archive.py --days 30 --keep /tmp/archive
+
+Generates a year in which slots for the week ahead are released in evening
+batches, stay open for an exponentially distributed time and are sometimes
+cancelled and reopened. Reports archive size (against storing a JSON snapshot
+of every check), append time, the time to open the archive and the median
+time and peak memory of each kind of history query.
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slot_archive import SlotArchive
+
+TIMES = ["8:00 AM", "9:00 AM", "10:00 AM", "11:00 AM", "12:00 PM", "1:00 PM",
+         "2:00 PM", "3:00 PM", "4:00 PM", "5:00 PM", "7:00 PM", "9:00 PM"]
+START = date(2024, 1, 1)
+
+
+def synthetic_year(days: int, locations: int, seed: int):
+    """Schedule changes as sorted (unix time, +1/-1, slot dict) tuples."""
+    rng = random.Random(seed)
+    names = [f"CBTF Room {100 + index}" for index in range(locations)]
+    events = []
+    for day in range(days):
+        exam_day = START + timedelta(days=day + 7)
+        # Slots for a day are released a week ahead, mostly around 9 PM
+        release = datetime.combine(START + timedelta(days=day), datetime.min.time()).timestamp() + 21 * 3600
+        for location in names:
+            for slot_time in TIMES:
+                if rng.random() < 0.3:
+                    continue
+                slot = {'date': exam_day.isoformat(), 'time': slot_time, 'location': location}
+                opened = release + rng.expovariate(1 / 900)
+                # Popular slots go in minutes, the rest within hours
+                taken = opened + rng.expovariate(1 / (300 if slot_time == "9:00 PM" else 7200))
+                events.append((opened, 1, slot))
+                events.append((taken, -1, slot))
+                if rng.random() < 0.1:
+                    reopened = taken + rng.expovariate(1 / 86400)
+                    events.append((reopened, 1, slot))
+                    events.append((reopened + rng.expovariate(1 / 1800), -1, slot))
+    # Checks run every 30 seconds, so changes are seen in 30 second steps
+    events = [(int(moment) // 30 * 30, change, slot) for moment, change, slot in events]
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def fill(archive: SlotArchive, events):
+    """Append the changes check by check; returns per-check append times and the JSON snapshot estimate."""
+    timings = []
+    snapshot_bytes = 0
+    open_bytes = 0
+    last_check = None
+    index = 0
+    while index < len(events):
+        moment = events[index][0]
+        added, removed = [], []
+        while index < len(events) and events[index][0] == moment:
+            _, change, slot = events[index]
+            (added if change > 0 else removed).append(slot)
+            open_bytes += change * (len(str(slot)) + 2)
+            index += 1
+        if last_check is not None:
+            # Every check in between would have stored the same snapshot again
+            snapshot_bytes += (moment - last_check) // 30 * open_bytes
+        last_check = moment
+        started = time.perf_counter()
+        archive.record_changes(added, removed, timestamp=moment)
+        timings.append(time.perf_counter() - started)
+    return timings, snapshot_bytes
+
+
+def time_query(query, repeat: int):
+    """Median wall time and peak traced memory of a query."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    query()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--locations', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', metavar='DIR', help="write the archive here and keep it")
+    args = parser.parse_args(argv)
+
+    events = synthetic_year(args.days, args.locations, args.seed)
+    work_dir = args.keep or tempfile.mkdtemp(prefix='bench-archive-')
+    try:
+        archive = SlotArchive(os.path.join(work_dir, 'archive'), max_gap=86400 * 365)
+        started = time.perf_counter()
+        appends, snapshot_bytes = fill(archive, events)
+        elapsed = time.perf_counter() - started
+        summary = archive.summary()
+        print(f"{args.days} days, {args.locations} locations: {summary['events']} events, "
+              f"{summary['slots']} slots, {len(appends)} checks with changes")
+        print(f"archive {summary['bytes'] / 1024:.0f} KiB ({summary['bytes'] / summary['events']:.1f} bytes/event), "
+              f"JSON snapshot per check {snapshot_bytes / 1024 ** 2:.0f} MiB")
+        appends.sort()
+        print(f"appended in {elapsed:.1f}s: {statistics.median(appends) * 1000:.2f} ms median, "
+              f"{appends[int(0.99 * (len(appends) - 1))] * 1000:.2f} ms p99 per check")
+
+        started = time.perf_counter()
+        archive = SlotArchive(archive.directory, max_gap=archive.max_gap)
+        print(f"opened in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        first, last = summary['first_event'], summary['last_event']
+        middle = (first + last) / 2
+        evening = {'desired_time': '21:00'}
+        queries = [
+            ("releases, all slots", lambda: archive.releases()),
+            ("releases, 9 PM slots", lambda: archive.releases(evening)),
+            ("releases, last 30 days", lambda: archive.releases(None, last - 30 * 86400, last)),
+            ("open-at, mid-year", lambda: archive.open_at(middle)),
+            ("series, week hourly", lambda: archive.series(middle, middle + 7 * 86400, 3600)),
+            ("series, year daily", lambda: archive.series(first, last, 86400, evening)),
+            ("durations, 9 PM slots", lambda: archive.durations(evening)),
+            ("durations, one month", lambda: archive.durations(None, middle, middle + 30 * 86400)),
+        ]
+        print(f"{'query':26} {'median':>10} {'peak memory':>12}")
+        for name, query in queries:
+            median, peak = time_query(query, args.repeat)
+            print(f"{name:26} {median * 1000:8.1f}ms {peak / 1024:9.0f} KiB")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
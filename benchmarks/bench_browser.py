@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark browser startup, page load time and memory, full vs lean profile.
+
+Usage:
+    python benchmarks/bench_browser.py                 # local synthetic page with assets
+    python benchmarks/bench_browser.py https://...     # any URL
+
+The synthetic page references images, web fonts, a video and a tracker
+script, each served with a small artificial latency, the way a real
+schedule page pulls in assets the monitor never looks at.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_factory import ChromeFactory
+from benchmarks.synthetic import make_schedule_page
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+LOADS = 10
+ASSET_LATENCY = 0.05
+
+
+def asset_heavy_page(slot_count: int = 200, images: int = 30) -> str:
+    """The synthetic schedule page plus the kind of assets a real page loads."""
+    head = """
+  <style>
+    @font-face { font-family: Brand; src: url('/fonts/brand.woff2') format('woff2'); }
+    @font-face { font-family: Icons; src: url('/fonts/icons.ttf'); }
+    body { font-family: Brand, sans-serif; } .icon { font-family: Icons; }
+  </style>
+  <script async src="/analytics/collect.js"></script>
+</head>"""
+    body = ''.join(f'<img src="/img/banner-{n}.png" width="64" height="64">' for n in range(images))
+    body += '<video src="/media/intro.mp4" autoplay muted></video>\n</main>'
+    return make_schedule_page(slot_count).replace('</head>', head, 1).replace('</main>', body, 1)
+
+
+class _AssetHandler(BaseHTTPRequestHandler):
+    page = b''
+
+    def do_GET(self):
+        if self.path in ('/', '/schedule'):
+            self._reply(200, 'text/html', self.page)
+            return
+        time.sleep(ASSET_LATENCY)
+        content_type = {'.png': 'image/png', '.woff2': 'font/woff2', '.ttf': 'font/ttf',
+                        '.mp4': 'video/mp4', '.js': 'application/javascript'}
+        extension = os.path.splitext(self.path)[1]
+        self._reply(200, content_type.get(extension, 'application/octet-stream'), b'\0' * 20000)
+
+    def _reply(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_synthetic_page():
+    """Serve the asset-heavy page on an ephemeral local port; returns (server, url)."""
+    _AssetHandler.page = asset_heavy_page().encode('utf-8')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _AssetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/schedule"
+
+
+def _children(pid: int):
+    """Descendant PIDs from /proc (used when psutil is not installed)."""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    parents.setdefault(int(f.read().rsplit(')', 1)[1].split()[1]), []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    found, pending = [], [pid]
+    while pending:
+        for child in parents.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident memory of chromedriver and every Chrome process under it, in bytes."""
+    if psutil is not None:
+        root = psutil.Process(pid)
+        total = 0
+        for process in [root] + root.children(recursive=True):
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    total = 0
+    for process_id in [pid] + _children(pid):
+        try:
+            with open(f'/proc/{process_id}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+def run_mode(lean: bool, url: str, profile_root: str, driver_path: str):
+    """Startup time, per-load times and peak RSS for one browser profile."""
+    factory = ChromeFactory(profile_root=profile_root, lean=lean, driver_path=driver_path)
+
+    started = time.perf_counter()
+    driver = factory.create()
+    startup = time.perf_counter() - started
+
+    loads, peak_rss = [], 0
+    try:
+        for _ in range(LOADS):
+            started = time.perf_counter()
+            driver.get(url)
+            loads.append(time.perf_counter() - started)
+            peak_rss = max(peak_rss, process_tree_rss(driver.service.process.pid))
+    finally:
+        driver.quit()
+
+    return startup, loads, peak_rss
+
+
+def main():
+    server = None
+    if len(sys.argv) > 1:
+        url = sys.argv[1]
+    else:
+        server, url = serve_synthetic_page()
+
+    # Resolve chromedriver once, the way the cached path does for the monitor
+    cache_file = os.path.join(tempfile.gettempdir(), 'bench-chromedriver-path')
+    driver_path = ChromeFactory(driver_cache_file=cache_file)._resolve_driver_path()
+
+    print(f"{'profile':<8} {'startup s':>10} {'first ms':>10} {'median ms':>10} {'min ms':>8} {'peak RSS MB':>12}")
+    try:
+        for name, lean in (('full', False), ('lean', True)):
+            profile_root = tempfile.mkdtemp(prefix=f'bench-{name}-')
+            try:
+                startup, loads, peak_rss = run_mode(lean, url, profile_root, driver_path)
+            finally:
+                shutil.rmtree(profile_root, ignore_errors=True)
+            print(f"{name:<8} {startup:>10.2f} {loads[0] * 1000:>10.0f} {statistics.median(loads[1:]) * 1000:>10.0f} "
+                  f"{min(loads) * 1000:>8.0f} {peak_rss / 1024 / 1024:>12.0f}")
+    finally:
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
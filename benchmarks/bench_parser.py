@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the schedule page parser backends.
+
+Usage:
+    python benchmarks/bench_parser.py                  # synthetic pages
+    python benchmarks/bench_parser.py page1.html ...   # captured pages
+
+Synthetic pages are also timed as the equivalent JSON API response
+(FETCH_MODE=api), decoded and mapped with api_endpoints.slots_from_json.
+"""
+
+import os
+import sys
+import time
+import json
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slot_parser import LxmlSlotParser, SoupSlotParser
+from slot_state import slot_key
+from api_endpoints import slots_from_json
+from benchmarks.synthetic import make_schedule_page, make_schedule_json
+
+SYNTHETIC_SIZES = [10, 100, 1000, 5000]
+
+
+def time_parser(parser, html: str, repeat: int):
+    """Median and best wall time of parser.parse(html) over repeat runs."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parser.parse(html)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), min(timings)
+
+
+class JsonSlotParser:
+    """Decode an API response and map it to slots, the FETCH_MODE=api path."""
+
+    def parse(self, text: str):
+        return slots_from_json(json.loads(text))
+
+
+def main():
+    if len(sys.argv) > 1:
+        pages = []
+        for path in sys.argv[1:]:
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = [(f"synthetic-{size}", make_schedule_page(size)) for size in SYNTHETIC_SIZES]
+
+    soup_parser = SoupSlotParser()
+    lxml_parser = LxmlSlotParser()
+
+    lxml_timings = {}
+    print(f"{'page':<20} {'KB':>8} {'slots':>6} {'soup ms':>10} {'lxml ms':>10} {'speedup':>8}")
+    for name, html in pages:
+        soup_slots = soup_parser.parse(html)
+        lxml_slots = lxml_parser.parse(html)
+        if sorted(map(slot_key, soup_slots)) != sorted(map(slot_key, lxml_slots)):
+            print(f"{name}: WARNING backends disagree ({len(soup_slots)} vs {len(lxml_slots)} slots)")
+
+        repeat = max(3, min(50, 200000 // max(len(html), 1)))
+        soup_median, _ = time_parser(soup_parser, html, repeat)
+        lxml_median, _ = time_parser(lxml_parser, html, repeat)
+        lxml_timings[name] = lxml_median
+        print(f"{name:<20} {len(html) / 1024:>8.0f} {len(lxml_slots):>6} {soup_median * 1000:>10.2f} "
+              f"{lxml_median * 1000:>10.2f} {soup_median / lxml_median:>7.1f}x")
+
+    if len(sys.argv) > 1:
+        return
+
+    json_parser = JsonSlotParser()
+    print()
+    print(f"{'api response':<20} {'KB':>8} {'slots':>6} {'json ms':>10} {'vs lxml':>10}")
+    for size in SYNTHETIC_SIZES:
+        name = f"synthetic-{size}"
+        text = make_schedule_json(size)
+        json_slots = json_parser.parse(text)
+        repeat = max(3, min(50, 200000 // max(len(text), 1)))
+        json_median, _ = time_parser(json_parser, text, repeat)
+        print(f"{name:<20} {len(text) / 1024:>8.0f} {len(json_slots):>6} {json_median * 1000:>10.3f} "
+              f"{lxml_timings[name] / json_median:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
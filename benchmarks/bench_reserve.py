@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+End-to-end auto-reserve benchmark against the local mock PrairieTest.
+
+Usage:
+    python benchmarks/bench_reserve.py                        # HTTP mode, 20 rounds
+    python benchmarks/bench_reserve.py --mode api --slots 2000
+
+Each round releases one new 9 PM slot on the mock, runs one check_and_notify
+and measures the time from the start of that check to the mock server
+confirming the reservation. Afterwards it checks that the per-watch cap
+stops further bookings and that dry run books nothing. Exits 1 if any
+reservation or check did not happen as expected.
+"""
+
+import os
+import sys
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_prairietest import MockPrairieTest
+from benchmarks.replay import percentile
+
+TARGET_TIME = "9:00 PM"
+TARGET_LOCATION = "Target Hall"
+
+
+class CollectingNotifier:
+    """Keeps alerts in memory instead of emailing them."""
+
+    def __init__(self):
+        self.alerts = []
+
+    def submit(self, slots, recipient, prairie_url, detected_at=None, on_undelivered=None):
+        self.alerts.append(list(slots))
+
+    def stop(self):
+        pass
+
+
+def make_monitor(base_url: str, work_dir: str, mode: str, notifier: CollectingNotifier, mock: MockPrairieTest):
+    """A monitor logged in to the mock over HTTP, reserving the target slots."""
+    from prairie_monitor import PrairieTestMonitor
+
+    monitor = PrairieTestMonitor(config=dict(
+        prairie_url=base_url,
+        fetch_mode=mode,
+        desired_date=None,
+        desired_time=TARGET_TIME,
+        desired_location=TARGET_LOCATION,
+        desired_weekdays=None,
+        auto_reserve=True,
+        auto_reserve_dry_run=False,
+        auto_reserve_url_template='',
+        adaptive_polling=False,
+        metrics_port=0,
+        circuit_failure_threshold=0,
+        slot_state_db=os.path.join(work_dir, 'slot_state.db'),
+        slot_archive_dir='',
+        slot_history_file=os.path.join(work_dir, 'slot_history.json'),
+        selector_cache_file=os.path.join(work_dir, 'selector_cache.json'),
+        session_dir=os.path.join(work_dir, 'sessions'),
+    ), notifier=notifier)
+
+    # Stands in for the browser login (and, in api mode, the endpoint capture)
+    monitor._setup_http_session()
+    monitor.session.post(f"{base_url}login", data={'email': mock.email, 'password': mock.password})
+    monitor.is_logged_in = True
+    monitor.session_restore_attempted = True
+    if mode == 'api':
+        monitor.selector_cache.record(monitor._instance(), 'api_endpoints', [f"{base_url}api/slots"])
+    return monitor
+
+
+def release_target(mock: MockPrairieTest, round_number: int) -> int:
+    """Open a new slot the watch wants, on its own date so it is new to the watch."""
+    slot_date = (date(2024, 7, 1) + timedelta(days=round_number)).isoformat()
+    slot_id = mock.add_slot(slot_date, TARGET_TIME, TARGET_LOCATION)
+    mock.release(slot_id)
+    return slot_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--mode', choices=('http', 'api'), default='http')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--slots', type=int, default=200, help="other open slots on the schedule")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    mock = MockPrairieTest(slot_count=args.slots)
+    base_url = mock.start()
+    work_dir = tempfile.mkdtemp(prefix='bench-reserve-')
+    notifier = CollectingNotifier()
+    failures = []
+    latencies = []
+    try:
+        monitor = make_monitor(base_url, work_dir, args.mode, notifier, mock)
+        monitor.reserver.max_per_watch = args.rounds
+        if not monitor.check_and_notify():
+            print("Initial check against the mock failed")
+            return 1
+
+        for round_number in range(args.rounds):
+            slot_id = release_target(mock, round_number)
+            monitor.check_and_notify()
+            slot = mock.slots[slot_id]
+            if slot.reserved_by is None:
+                failures.append(f"round {round_number}: slot {slot_id} was not reserved")
+                continue
+            latencies.append(slot.reserved_at - monitor.check_started)
+            if not notifier.alerts or notifier.alerts[-1][0].get('reserved') != 'yes':
+                failures.append(f"round {round_number}: alert does not say the slot was reserved")
+
+        # The cap is now reached: a new slot is alerted about but not booked
+        slot_id = release_target(mock, args.rounds)
+        monitor.check_and_notify()
+        if mock.slots[slot_id].reserved_by is not None:
+            failures.append("cap: booked past AUTO_RESERVE_MAX_PER_WATCH")
+
+        monitor.reserver.max_per_watch = args.rounds + 10
+        monitor.reserver.dry_run = True
+        slot_id = release_target(mock, args.rounds + 1)
+        monitor.check_and_notify()
+        if mock.slots[slot_id].reserved_by is not None:
+            failures.append("dry run: slot was booked")
+        elif notifier.alerts[-1][-1].get('reserved') != 'dry run':
+            failures.append("dry run: alert does not mention the dry run")
+        monitor.cleanup()
+    finally:
+        mock.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if latencies:
+        latencies.sort()
+        print(f"{args.mode} mode, {args.slots} other slots, {len(latencies)}/{args.rounds} reserved")
+        print(f"check start to confirmed reservation: p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+              f"mean {statistics.mean(latencies) * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark process startup and import time of the command line entry points.
+
+Usage:
+    python benchmarks/bench_startup.py              # fresh interpreter per run
+    python benchmarks/bench_startup.py cli          # plus -X importtime's slowest imports for a module
+
+Every measurement starts a new Python process, the way cron does, so
+nothing is already imported or cached in memory.
+"""
+
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNS = 10
+
+# (label, python arguments)
+TARGETS = [
+    ('python (baseline)', ['-c', 'pass']),
+    ('import cli', ['-c', 'import cli']),
+    ('import config', ['-c', 'import config']),
+    ('import prairie_monitor', ['-c', 'import prairie_monitor']),
+    ('import watch_supervisor', ['-c', 'import watch_supervisor']),
+    ('import async_monitor', ['-c', 'import async_monitor']),
+    ('cli.py --help', ['cli.py', '--help']),
+    ('cli.py validate-config', ['cli.py', 'validate-config']),
+]
+
+
+def time_process(arguments) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable] + arguments, cwd=ROOT, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - started
+
+
+def slowest_imports(module: str, count: int = 15):
+    """(cumulative microseconds, name) of the slowest direct imports of a module under -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=False)
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        # Names are indented two spaces per level, and a module is listed after everything it imported
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                break
+            children = []
+    return sorted(children, reverse=True)[:count]
+
+
+def main():
+    print(f"{'target':<26} {'median ms':>10} {'min ms':>8}")
+    for label, arguments in TARGETS:
+        timings = [time_process(arguments) for _ in range(RUNS)]
+        print(f"{label:<26} {statistics.median(timings) * 1000:>10.0f} {min(timings) * 1000:>8.0f}")
+
+    for module in sys.argv[1:]:
+        print(f"\nSlowest imports of {module} (cumulative ms):")
+        for cumulative, name in slowest_imports(module):
+            print(f"  {cumulative / 1000:>8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
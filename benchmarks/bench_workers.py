@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark sharded workers against the local mock PrairieTest.
+
+Usage:
+    python benchmarks/bench_workers.py                    # 3 workers, 24 accounts, 40 s
+    python benchmarks/bench_workers.py --workers 2 --accounts 10 --seconds 20
+
+Publishes one watch for each of --accounts accounts to a fresh lease store,
+starts --workers worker processes and kills one of them halfway through
+(SIGKILL, so it cannot hand its leases back). Reports how the accounts were
+spread, how long the dead worker's accounts went unchecked, schedule requests
+per second and every pair of requests for one account closer together than
+the rate limit, which would mean two workers checked it at once. Exits 1 on
+such a pair or an account that was not taken over.
+"""
+
+import os
+import sys
+import time
+import shutil
+import signal
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_prairietest import MockPrairieTest
+from benchmarks.replay import percentile
+
+
+def worker_settings(work_dir: str, base_url: str, args) -> dict:
+    """Environment for the worker processes: fast polling, no browser, nothing written to the repo."""
+    return {
+        'PRAIRIE_TEST_URL': base_url,
+        'CHECK_INTERVAL_SECONDS': str(args.interval),
+        'ACCOUNT_RATE_LIMIT_SECONDS': str(args.rate_limit),
+        'LEASE_TTL_SECONDS': str(args.ttl),
+        'ADAPTIVE_POLLING': 'false',
+        'CIRCUIT_FAILURE_THRESHOLD': '0',
+        'METRICS_PORT': '0',
+        'INGEST_PORT': '0',
+        'SLOT_ARCHIVE_DIR': '',
+        'SLOT_STATE_DB': os.path.join(work_dir, 'slot_state.db'),
+        'SLOT_HISTORY_FILE': os.path.join(work_dir, 'slot_history.json'),
+        'SELECTOR_CACHE_FILE': os.path.join(work_dir, 'selector_cache.json'),
+        'SESSION_DIR': os.path.join(work_dir, 'sessions'),
+        'LOG_FILE': os.path.join(work_dir, 'workers.log'),
+    }
+
+
+def run_worker(store_path: str, base_url: str, worker_id: str, settings: dict, email: str, password: str):
+    """One worker process; the settings must be in place before the monitor modules read them."""
+    os.environ.update(settings)
+    logging.basicConfig(filename=settings['LOG_FILE'], level=logging.INFO,
+                        format=f"%(asctime)s {worker_id} %(levelname)s %(name)s: %(message)s")
+
+    from sharding import LeaseStore, ShardWorker
+
+    def log_in(monitor):
+        # Stands in for the browser login, as in bench_reserve; the header tells the mock who asked
+        monitor._setup_http_session()
+        monitor.session.headers['X-Client'] = f"{worker_id} {monitor.config['school_email']}"
+        monitor.session.post(f"{base_url}login", data={'email': email, 'password': password}, allow_redirects=False)
+        monitor.is_logged_in = True
+        monitor.session_restore_attempted = True
+
+    worker = ShardWorker(LeaseStore(store_path, ttl=float(settings['LEASE_TTL_SECONDS'])),
+                         worker_id=worker_id, monitor_hook=log_in)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    try:
+        worker.run()
+    finally:
+        worker.cleanup()
+
+
+def wait_for(condition, timeout: float, step: float = 0.1):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(step)
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--accounts', type=int, default=24)
+    parser.add_argument('--seconds', type=float, default=40)
+    parser.add_argument('--interval', type=float, default=1, help="CHECK_INTERVAL_SECONDS of the workers")
+    parser.add_argument('--rate-limit', type=float, default=2, help="ACCOUNT_RATE_LIMIT_SECONDS of the workers")
+    parser.add_argument('--ttl', type=float, default=3, help="LEASE_TTL_SECONDS of the workers")
+    args = parser.parse_args(argv)
+
+    from sharding import LeaseStore
+    from watch_supervisor import Watch
+
+    mock = MockPrairieTest()
+    base_url = mock.start()
+    work_dir = tempfile.mkdtemp(prefix='bench-workers-')
+    store_path = os.path.join(work_dir, 'leases.db')
+    settings = worker_settings(work_dir, base_url, args)
+    # Nothing on the mock is at 23:59, so the workers poll without ever sending an alert
+    watches = [Watch.from_definition({'name': f"watch-{index}", 'prairie_url': base_url,
+                                      'school_email': f"student{index}@example.edu", 'school_password': 'secret',
+                                      'desired_time': '23:59'}, index)
+               for index in range(args.accounts)]
+    store = LeaseStore(store_path, ttl=args.ttl)
+    store.publish(watches)
+
+    context = multiprocessing.get_context('spawn')
+    processes = {}
+    failures = []
+    try:
+        for index in range(args.workers):
+            worker_id = f"worker-{index}"
+            process = context.Process(
+                target=run_worker, args=(store_path, base_url, worker_id, settings, mock.email, mock.password))
+            process.start()
+            processes[worker_id] = process
+
+        def leased():
+            return [lease['worker'] for lease in store.status()['leases']]
+
+        if not wait_for(lambda: all(leased()) and len(set(leased())) == args.workers, 60):
+            failures.append("accounts were not spread over every worker within 60 s")
+        started = time.time()
+        spread = Counter(leased())
+        print(f"{args.accounts} accounts on {args.workers} workers: "
+              + ", ".join(f"{worker} {count}" for worker, count in sorted(spread.items())))
+
+        time.sleep(args.seconds / 2)
+        victim = sorted(processes)[0]
+        orphaned = {lease['account'].split('|')[1] for lease in store.status()['leases'] if lease['worker'] == victim}
+        killed_at = time.time()
+        os.kill(processes[victim].pid, signal.SIGKILL)
+        processes[victim].join()
+        print(f"killed {victim} holding {len(orphaned)} accounts")
+
+        time.sleep(args.seconds / 2)
+        finished = time.time()
+        spread = Counter(leased())
+        print("after the kill: " + ", ".join(f"{worker} {count}" for worker, count in sorted(spread.items())))
+    finally:
+        for worker_id, process in processes.items():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join(10)
+        store.close()
+        mock.stop()
+
+    requests_by_account = {}
+    for moment, _, client in mock.request_log:
+        if started <= moment <= finished and client:
+            worker_id, email = client.split(' ', 1)
+            requests_by_account.setdefault(email, []).append((moment, worker_id))
+
+    total = sum(len(requests) for requests in requests_by_account.values())
+    print(f"{total} schedule requests in {finished - started:.1f}s: {total / (finished - started):.1f}/s "
+          f"(rate limit allows {args.accounts / args.rate_limit:.1f}/s)")
+
+    gaps = []
+    for email, requests in requests_by_account.items():
+        requests.sort()
+        for (earlier, earlier_worker), (later, later_worker) in zip(requests, requests[1:]):
+            gaps.append(later - earlier)
+            # Request latency jitters around the reserved time, so allow a little slack
+            if later - earlier < 0.9 * args.rate_limit:
+                failures.append(f"{email}: requests by {earlier_worker} and {later_worker} "
+                                f"{later - earlier:.2f}s apart")
+    if gaps:
+        gaps.sort()
+        print(f"gap between requests for one account: min {min(gaps):.2f}s, "
+              f"median {percentile(gaps, 0.5):.2f}s, p99 {percentile(gaps, 0.99):.2f}s")
+
+    takeovers = []
+    for email in orphaned:
+        after = [moment for moment, worker_id in requests_by_account.get(email, [])
+                 if moment > killed_at and worker_id != victim]
+        if after:
+            takeovers.append(min(after) - killed_at)
+        else:
+            failures.append(f"{email}: never checked again after {victim} died")
+    if takeovers:
+        takeovers.sort()
+        print(f"takeover after the kill (TTL {args.ttl:g}s): median {percentile(takeovers, 0.5):.2f}s, "
+              f"max {max(takeovers):.2f}s")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Local mock of PrairieTest for end-to-end runs of the monitor.
+
+Usage:
+    python benchmarks/mock_prairietest.py                     # serve on 127.0.0.1:8780
+    python benchmarks/mock_prairietest.py --release-every 60  # open a new 9 PM slot every minute
+
+Serves a login form, a schedule page whose slots carry reservation forms
+(with a per-session CSRF token), the same slots as JSON at /api/slots, and
+POST /reservations/<id>, which books a slot for the first session to ask
+and redirects to a confirmation page. Point PRAIRIE_TEST_URL at it to try
+auto-reserve (or a browser login) without touching the real site; the login
+is SCHOOL_EMAIL student@example.edu, SCHOOL_PASSWORD secret.
+"""
+
+import sys
+import json
+import time
+import uuid
+import html
+import argparse
+import threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+LOCATIONS = ["Main Testing Center", "CBTF Grainger", "CBTF Siebel Basement", "Library Room 220"]
+TIMES = ["8:00 AM", "9:30 AM", "11:00 AM", "1:00 PM", "3:00 PM", "5:00 PM", "7:00 PM"]
+
+
+class MockSlot:
+    def __init__(self, slot_id: int, slot_date: str, slot_time: str, location: str, released: bool = True):
+        self.id = slot_id
+        self.date = slot_date
+        self.time = slot_time
+        self.location = location
+        self.released = released
+        self.reserved_by = None
+        self.reserved_at = None
+
+
+class MockPrairieTest:
+    """In-memory PrairieTest: sessions, slots and reservations, served over HTTP by start()."""
+
+    def __init__(self, slot_count: int = 50, email: str = 'student@example.edu', password: str = 'secret'):
+        self.email = email
+        self.password = password
+        self.lock = threading.Lock()
+        # session token -> CSRF token
+        self.sessions = {}
+        self.slots = {}
+        # Schedule requests as (time, path, X-Client header), for benchmarks that check who polled when
+        self.request_log = []
+        self.server = None
+        start = date(2024, 1, 15)
+        for index in range(slot_count):
+            self.add_slot((start + timedelta(days=index // len(TIMES))).isoformat(),
+                          TIMES[index % len(TIMES)], LOCATIONS[index % len(LOCATIONS)], released=True)
+
+    def add_slot(self, slot_date: str, slot_time: str, location: str, released: bool = False) -> int:
+        with self.lock:
+            slot_id = len(self.slots) + 1
+            self.slots[slot_id] = MockSlot(slot_id, slot_date, slot_time, location, released)
+            return slot_id
+
+    def release(self, slot_id: int):
+        """Make a slot bookable, the way PrairieTest opens new slots."""
+        with self.lock:
+            self.slots[slot_id].released = True
+
+    def login(self, email: str, password: str) -> str:
+        """A new session token, or None for wrong credentials."""
+        if email != self.email or password != self.password:
+            return None
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[token] = uuid.uuid4().hex
+        return token
+
+    def expire_sessions(self):
+        """Log every session out, as an expired SSO login would."""
+        with self.lock:
+            self.sessions.clear()
+
+    def reserve(self, token: str, slot_id: int, csrf: str = None) -> int:
+        """HTTP status of a reservation request: 303 when booked, 403 on a bad token, 409 when taken."""
+        with self.lock:
+            if csrf is not None and csrf != self.sessions.get(token):
+                return 403
+            slot = self.slots.get(slot_id)
+            if slot is None or not slot.released or slot.reserved_by is not None:
+                return 409
+            slot.reserved_by = token
+            slot.reserved_at = time.time()
+            return 303
+
+    def open_slots(self):
+        with self.lock:
+            return [slot for slot in self.slots.values() if slot.released and slot.reserved_by is None]
+
+    def schedule_page(self, token: str) -> str:
+        csrf = self.sessions.get(token, '')
+        rows = ''.join(f"""
+      <div class="slot" data-slot-id="{slot.id}">
+        <span class="date">{slot.date}</span>
+        <span class="time">{slot.time}</span>
+        <span class="location">{html.escape(slot.location)}</span>
+        <form class="reserve-form" method="post" action="/reservations/{slot.id}">
+          <input type="hidden" name="csrf_token" value="{csrf}">
+          <button type="submit">Reserve</button>
+        </form>
+      </div>""" for slot in self.open_slots())
+        return f"""<!DOCTYPE html>
+<html>
+<head><title>PrairieTest - Schedule</title></head>
+<body>
+  <div class="dashboard"><a href="/logout">Log out</a></div>
+  <main><h1>Schedule an exam</h1><div class="schedule">{rows}
+  </div></main>
+</body>
+</html>
+"""
+
+    def slots_json(self) -> str:
+        return json.dumps({'slots': [
+            {'id': slot.id, 'date': slot.date, 'time': slot.time, 'location': {'name': slot.location},
+             'seats_available': 1, 'reserve_url': f"/reservations/{slot.id}"}
+            for slot in self.open_slots()
+        ]})
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Serve on a background thread; returns the base URL."""
+        handler = type('_BoundHandler', (_MockHandler,), {'mock': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        threading.Thread(target=self.server.serve_forever, name='mock-prairietest', daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}/"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+LOGIN_PAGE = b"""<!DOCTYPE html>
+<html><body>
+  <form method="post" action="/login">
+    <input type="email" name="email"><input type="password" name="password">
+    <button type="submit">Sign in</button>
+  </form>
+</body></html>
+"""
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    mock = None
+
+    def _token(self):
+        for part in self.headers.get('Cookie', '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == 'session' and value in self.mock.sessions:
+                return value
+        return None
+
+    def _form(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        fields = parse_qs(self.rfile.read(length).decode('utf-8')) if length else {}
+        return {name: values[0] for name, values in fields.items()}
+
+    def _reply(self, status: int, body: bytes = b'', content_type: str = 'text/html; charset=utf-8',
+               headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self, location: str, headers=None):
+        self._reply(303 if self.command == 'POST' else 302, headers=dict(headers or {}, Location=location))
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip('/')
+        token = self._token()
+        if path == '/login':
+            self._reply(200, LOGIN_PAGE)
+        elif path == '/logout':
+            self.mock.sessions.pop(token, None)
+            self._redirect('/login')
+        elif token is None:
+            if path.startswith('/api/'):
+                self._reply(401, b'{"error": "not logged in"}', 'application/json')
+            else:
+                self._redirect('/login')
+        elif path in ('', '/schedule'):
+            self.mock.request_log.append((time.time(), path, self.headers.get('X-Client', '')))
+            self._reply(200, self.mock.schedule_page(token).encode('utf-8'))
+        elif path == '/api/slots':
+            self.mock.request_log.append((time.time(), path, self.headers.get('X-Client', '')))
+            self._reply(200, self.mock.slots_json().encode('utf-8'), 'application/json')
+        elif path.startswith('/reservations/') and path.endswith('/confirmation'):
+            self._reply(200, b'<html><body><h1>Reservation confirmed</h1></body></html>')
+        else:
+            self._reply(404, b'Not found')
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip('/')
+        form = self._form()
+        if path == '/login':
+            token = self.mock.login(form.get('email'), form.get('password'))
+            if token is None:
+                self._reply(401, LOGIN_PAGE)
+            else:
+                self._redirect('/schedule', {'Set-Cookie': f"session={token}; Path=/; HttpOnly"})
+            return
+
+        token = self._token()
+        if token is None:
+            self._redirect('/login')
+        elif path.startswith('/reservations/') and path.rsplit('/', 1)[-1].isdigit():
+            slot_id = int(path.rsplit('/', 1)[-1])
+            status = self.mock.reserve(token, slot_id, form.get('csrf_token'))
+            if status == 303:
+                self._redirect(f"/reservations/{slot_id}/confirmation")
+            else:
+                self._reply(status, b'<html><body>This slot is no longer available.</body></html>')
+        else:
+            self._reply(404, b'Not found')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--port', type=int, default=8780)
+    parser.add_argument('--slots', type=int, default=50, help="bookable slots at startup")
+    parser.add_argument('--release-every', type=float, default=0,
+                        help="open a new 9:00 PM slot every this many seconds (0: never)")
+    args = parser.parse_args(argv)
+
+    mock = MockPrairieTest(slot_count=args.slots)
+    base_url = mock.start(port=args.port)
+    print(f"Mock PrairieTest at {base_url} (login {mock.email} / {mock.password})")
+    try:
+        released = 0
+        while True:
+            if args.release_every:
+                time.sleep(args.release_every)
+                released += 1
+                slot_id = mock.add_slot((date(2024, 6, 1) + timedelta(days=released)).isoformat(), "9:00 PM",
+                                        "Main Testing Center")
+                mock.release(slot_id)
+                print(f"Released slot {slot_id}")
+            else:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Replay recorded and synthetic schedule pages through the monitor's check path.
+
+Usage:
+    python benchmarks/replay.py                        # corpus + synthetic pages
+    python benchmarks/replay.py --save-baseline        # store the results as the baseline
+    python benchmarks/replay.py --compare              # exit 1 if slower or bigger than the baseline
+    python benchmarks/replay.py --record my-course     # save the live schedule page to the corpus
+
+Each page is served by a local stand-in for PrairieTest and fetched with
+PrairieTestMonitor._check_available_slots over HTTP, so every check goes
+through the real fetch, parse (extract_slot_info per slot) and
+_is_desired_slot match. "changed" runs start each check with an empty page
+cache, the cost of a schedule that changed; "unchanged" runs keep it, the
+cost of a schedule that did not.
+
+Recorded pages live in benchmarks/corpus/*.html. They come from your own
+account, so they are not committed.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_schedule_page
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCH_DIR, 'corpus')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+
+SYNTHETIC_SIZES = [10, 100, 1000, 5000]
+
+# Criteria that match a fraction of the synthetic slots, so matching does real work
+CRITERIA = {'desired_date': '2024-01-16', 'desired_time': None, 'desired_location': 'CBTF',
+            'desired_weekdays': None}
+
+# Keys compared against the baseline, and whether a higher value is the regression
+GATED = {'throughput': False, 'p50_ms': True, 'p95_ms': True, 'peak_kb': True}
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, keep-alive adds a delayed-ACK stall
+    disable_nagle_algorithm = True
+    page = b''
+
+    def do_GET(self):
+        if self.path.split('?')[0].rstrip('/') == '/schedule':
+            status, body = 200, self.page
+        else:
+            status, body = 404, b'Not found'
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in():
+    """Serve _StandInHandler.page at /schedule on an ephemeral local port; returns (server, base URL)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def load_pages(corpus_dir: str, synthetic: bool = True):
+    """(name, html) for every recorded page, then the synthetic ones."""
+    pages = []
+    if os.path.isdir(corpus_dir):
+        for filename in sorted(os.listdir(corpus_dir)):
+            if filename.endswith('.html'):
+                with open(os.path.join(corpus_dir, filename), 'r', encoding='utf-8') as f:
+                    pages.append((f"corpus/{filename[:-5]}", f.read()))
+    if synthetic:
+        pages.extend((f"synthetic-{size}", make_schedule_page(size)) for size in SYNTHETIC_SIZES)
+    return pages
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def make_monitor(base_url: str, work_dir: str):
+    """A monitor that polls the stand-in over HTTP, with all state in work_dir."""
+    from prairie_monitor import PrairieTestMonitor
+
+    monitor = PrairieTestMonitor(config=dict(
+        CRITERIA,
+        prairie_url=base_url,
+        fetch_mode='http',
+        adaptive_polling=False,
+        metrics_port=0,
+        slot_state_db=os.path.join(work_dir, 'slot_state.db'),
+        slot_archive_dir='',
+        slot_history_file=os.path.join(work_dir, 'slot_history.json'),
+        selector_cache_file=os.path.join(work_dir, 'selector_cache.json'),
+        session_dir=os.path.join(work_dir, 'sessions'),
+    ))
+    monitor._setup_http_session()
+    monitor.is_logged_in = True
+    monitor.session_restore_attempted = True
+    return monitor
+
+
+def run_case(monitor, html: str, changed: bool, min_time: float, min_runs: int, max_runs: int):
+    """Latencies, throughput and traced peak memory of repeated checks of one page."""
+    from page_cache import PageCache
+
+    _StandInHandler.page = html.encode('utf-8')
+    monitor.page_cache = PageCache()
+    monitor.last_available = None
+
+    def check():
+        if changed:
+            monitor.page_cache = PageCache()
+        started = time.perf_counter()
+        available = monitor._check_available_slots()
+        elapsed = time.perf_counter() - started
+        if available is None:
+            raise RuntimeError("Check against the stand-in server failed")
+        return elapsed, available
+
+    # Warm up the connection pool and the learned selectors
+    for _ in range(2):
+        check()
+
+    latencies = []
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < max_runs and (len(latencies) < min_runs or time.perf_counter() < deadline):
+        elapsed, available = check()
+        latencies.append(elapsed)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        check()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'runs': len(latencies),
+        'matched': len(available),
+        'throughput': len(latencies) / sum(latencies),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_kb': peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance: float):
+    """Every gated measurement that is more than tolerance worse than the baseline."""
+    regressions = []
+    for case, measured in results.items():
+        expected = baseline.get(case)
+        if not expected:
+            continue
+        for key, higher_is_worse in GATED.items():
+            if key not in expected or not expected[key]:
+                continue
+            ratio = measured[key] / expected[key]
+            if (ratio > 1 + tolerance) if higher_is_worse else (ratio < 1 - tolerance):
+                regressions.append(f"{case}: {key} {measured[key]:.2f} vs baseline {expected[key]:.2f} "
+                                   f"({ratio - 1:+.0%})")
+    return regressions
+
+
+def record(name: str, corpus_dir: str):
+    """Fetch the live schedule page with the .env configuration and save it to the corpus."""
+    from prairie_monitor import PrairieTestMonitor
+    from logging_setup import configure_logging, stop_logging
+
+    monitor = PrairieTestMonitor()
+    configure_logging(monitor.config)
+    try:
+        page_source = monitor._fetch_schedule_page()
+    finally:
+        monitor.cleanup()
+        stop_logging()
+    if page_source is None:
+        print("Could not fetch the schedule page, see the log above")
+        return 1
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    path = os.path.join(corpus_dir, f"{name}.html")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(page_source)
+    print(f"Saved {len(page_source) / 1024:.0f} KB to {path}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--corpus', default=CORPUS_DIR, help="directory of recorded *.html pages")
+    parser.add_argument('--no-synthetic', action='store_true', help="replay only the recorded pages")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline results file")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results to the baseline file")
+    parser.add_argument('--compare', action='store_true', help="exit 1 when a result regresses the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown/growth (default 0.25)")
+    parser.add_argument('--min-time', type=float, default=1.0, help="seconds to replay each case for")
+    parser.add_argument('--min-runs', type=int, default=10)
+    parser.add_argument('--max-runs', type=int, default=2000)
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--record', metavar='NAME', help="save the live schedule page as corpus/NAME.html")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        return record(args.record, args.corpus)
+
+    logging.disable(logging.WARNING)
+
+    pages = load_pages(args.corpus, synthetic=not args.no_synthetic)
+    if not pages:
+        print(f"No pages to replay (corpus: {args.corpus})")
+        return 1
+
+    server, base_url = start_stand_in()
+    work_dir = tempfile.mkdtemp(prefix='bench-replay-')
+    results = {}
+    try:
+        monitor = make_monitor(base_url, work_dir)
+        print(f"{'case':<32} {'KB':>6} {'match':>6} {'runs':>6} {'checks/s':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak KB':>9}")
+        for name, html in pages:
+            for changed in (True, False):
+                case = f"{name} {'changed' if changed else 'unchanged'}"
+                result = run_case(monitor, html, changed, args.min_time, args.min_runs, args.max_runs)
+                results[case] = result
+                print(f"{case:<32} {len(html) / 1024:>6.0f} {result['matched']:>6} {result['runs']:>6} "
+                      f"{result['throughput']:>9.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                      f"{result['p99_ms']:>8.2f} {result['peak_kb']:>9.0f}")
+        monitor.cleanup()
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.compare:
+        try:
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"\nCannot compare, no usable baseline at {args.baseline}: {str(e)}")
+            return 1
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
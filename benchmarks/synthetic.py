@@ -0,0 +1,81 @@
+"""
+Synthetic PrairieTest schedule pages for benchmarks.
+"""
+
+import json
+import random
+from datetime import date, timedelta
+
+LOCATIONS = [
+    "Main Testing Center",
+    "CBTF Grainger",
+    "CBTF Siebel Basement",
+    "Library Room 220",
+    "Engineering Hall 106",
+]
+
+TIMES = ["8:00 AM", "9:30 AM", "11:00 AM", "1:00 PM", "3:00 PM", "5:00 PM", "7:00 PM", "9:00 PM"]
+
+
+def make_slot(index: int, rng: random.Random, start: date) -> str:
+    """One slot row, varying the markup the way real pages do."""
+    slot_date = (start + timedelta(days=index // len(TIMES))).isoformat()
+    slot_time = TIMES[index % len(TIMES)]
+    location = rng.choice(LOCATIONS)
+    classes = rng.choice(["slot", "slot available-slot", "time-slot", "calendar-slot"])
+    return f"""
+      <div class="{classes}" data-slot="{index}">
+        <div class="slot-header"><span class="badge">Open</span></div>
+        <div class="slot-body">
+          <span class="date">{slot_date}</span>
+          <span class="time"> {slot_time} </span>
+          <span class="location"><i class="icon"></i>{location}</span>
+          <span class="seats">{rng.randint(1, 40)} seats</span>
+        </div>
+        <button class="btn btn-primary reserve" data-url="/reserve/{index}">Reserve</button>
+      </div>"""
+
+
+def make_schedule_page(slot_count: int, seed: int = 0) -> str:
+    """A full schedule page with navigation, scripts and slot_count slots."""
+    rng = random.Random(seed)
+    start = date(2024, 1, 15)
+    slots = ''.join(make_slot(index, rng, start) for index in range(slot_count))
+    navigation = ''.join(f'<li><a href="/course/{n}">Course {n}</a></li>' for n in range(40))
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+  <title>PrairieTest - Schedule</title>
+  <script>window.__STATE__ = {{"user": "student", "csrf": "{rng.random()}"}};</script>
+  <style>.slot {{ padding: 4px; }}</style>
+</head>
+<body>
+  <nav><ul>{navigation}</ul></nav>
+  <main>
+    <h1>Schedule an exam</h1>
+    <div class="schedule">{slots}
+    </div>
+  </main>
+  <footer><a href="/logout">Log out</a></footer>
+</body>
+</html>
+"""
+
+
+def make_schedule_json(slot_count: int, seed: int = 0) -> str:
+    """The same slots as make_schedule_page, as a JSON API response."""
+    rng = random.Random(seed)
+    start = date(2024, 1, 15)
+    slots = []
+    for index in range(slot_count):
+        location = rng.choice(LOCATIONS)
+        rng.choice(["slot", "slot available-slot", "time-slot", "calendar-slot"])
+        slots.append({
+            'id': index,
+            'date': (start + timedelta(days=index // len(TIMES))).isoformat(),
+            'time': TIMES[index % len(TIMES)],
+            'location': {'id': LOCATIONS.index(location), 'name': location},
+            'seats_available': rng.randint(1, 40),
+            'reserve_url': f"/reserve/{index}",
+        })
+    return json.dumps({'user': 'student', 'slots': slots})
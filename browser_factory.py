@@ -0,0 +1,220 @@
+"""
+Chrome WebDriver creation for the PrairieTest monitor.
+Starts browsers on persistent profiles with a cached chromedriver path and,
+in lean mode, without images, fonts, media or third-party trackers.
+"""
+
+import os
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
+
+from page_readiness import install_network_tracker
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+# Content settings that stop Chrome from fetching or prompting for things a monitor never needs
+LEAN_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.default_content_setting_values.notifications': 2,
+    'profile.default_content_setting_values.geolocation': 2,
+    'profile.default_content_setting_values.media_stream': 2,
+}
+
+LEAN_ARGUMENTS = [
+    '--blink-settings=imagesEnabled=false',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--mute-audio',
+    '--no-first-run',
+]
+
+# Requests dropped in lean mode (Network.setBlockedURLs patterns)
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.ogg',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*hotjar.com*', '*segment.io*', '*segment.com*',
+    '*newrelic.com*', '*nr-data.net*', '*sentry.io*', '*fullstory.com*', '*clarity.ms*',
+]
+
+# A profile slot claimed by a browser that is still starting
+_STARTING = object()
+
+
+def _driver_running(driver) -> bool:
+    """True while the driver's chromedriver process has not exited."""
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    return process is None or process.poll() is None
+
+
+class ChromeFactory:
+    """Creates Chrome drivers, one persistent profile directory per concurrently running browser.
+
+    Profiles keep Chrome's HTTP cache warm between checks and restarts, and
+    the resolved chromedriver path is cached on disk so startup does not go
+    through webdriver-manager.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, profile_root: Optional[str] = None, headless: bool = True, lean: bool = True,
+                 driver_cache_file: Optional[str] = None, driver_path: Optional[str] = None,
+                 capture_network: bool = False):
+        self.profile_root = profile_root
+        self.headless = headless
+        self.lean = lean
+        self.driver_cache_file = driver_cache_file
+        self.fixed_driver_path = driver_path
+        self.driver_path = driver_path
+        # Record DevTools network events so data endpoints can be discovered
+        self.capture_network = capture_network
+        self.profiles = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_config(cls, config: Dict[str, Any]) -> 'ChromeFactory':
+        """Share one factory (and its profile slots) between monitors with the same browser settings."""
+        capture_network = config['fetch_mode'] == 'api'
+        key = (config['browser_profile_dir'], config['headless'], config['lean_browser'],
+               config['chromedriver_cache_file'], config['chromedriver_path'], capture_network)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(
+                    profile_root=config['browser_profile_dir'] or None,
+                    headless=config['headless'],
+                    lean=config['lean_browser'],
+                    driver_cache_file=config['chromedriver_cache_file'] or None,
+                    driver_path=config['chromedriver_path'] or None,
+                    capture_network=capture_network
+                )
+            return cls._instances[key]
+
+    def create(self):
+        """Start a browser on a free profile slot."""
+        slot = self._claim_profile_slot()
+        try:
+            try:
+                driver = self._start(slot)
+            except SessionNotCreatedException as e:
+                if self.fixed_driver_path:
+                    raise
+                # The cached chromedriver no longer matches the installed Chrome
+                logger.info("Cached chromedriver rejected (%s), resolving it again", str(e).splitlines()[0])
+                self._resolve_driver_path(refresh=True)
+                driver = self._start(slot)
+        except Exception:
+            with self.lock:
+                self.profiles.pop(slot, None)
+            raise
+
+        with self.lock:
+            self.profiles[slot] = driver
+        return driver
+
+    def is_alive(self, driver) -> bool:
+        """Whether a driver still answers commands."""
+        if not _driver_running(driver):
+            return False
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _claim_profile_slot(self) -> int:
+        with self.lock:
+            slot = 0
+            while slot in self.profiles:
+                driver = self.profiles[slot]
+                if driver is not _STARTING and not _driver_running(driver):
+                    break
+                slot += 1
+            self.profiles[slot] = _STARTING
+            return slot
+
+    def _start(self, slot: int):
+        # Loaded on first use, so HTTP-only checks never import the WebDriver stack
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        chrome_options = Options()
+
+        if self.headless:
+            chrome_options.add_argument('--headless')
+
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+
+        if self.profile_root:
+            profile_dir = os.path.abspath(os.path.join(self.profile_root, f"profile-{slot}"))
+            os.makedirs(profile_dir, mode=0o700, exist_ok=True)
+            chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+
+        if self.lean:
+            chrome_options.add_argument('--window-size=1280,800')
+            for argument in LEAN_ARGUMENTS:
+                chrome_options.add_argument(argument)
+            chrome_options.add_experimental_option('prefs', LEAN_PREFS)
+        else:
+            chrome_options.add_argument('--window-size=1920,1080')
+
+        if self.capture_network:
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+        service = Service(self._resolve_driver_path())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Explicit waits only, so a selector that is not on the page fails immediately
+        driver.implicitly_wait(0)
+        install_network_tracker(driver)
+        if self.lean:
+            self._block_requests(driver)
+        return driver
+
+    def _block_requests(self, driver):
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        except (AttributeError, WebDriverException) as e:
+            logger.warning("Could not enable request blocking, loading every asset: %s", e)
+
+    def _resolve_driver_path(self, refresh: bool = False) -> str:
+        """The chromedriver executable: configured, cached on disk, or installed once."""
+        with self.lock:
+            if self.fixed_driver_path:
+                return self.fixed_driver_path
+            if self.driver_path and not refresh:
+                return self.driver_path
+
+            if not refresh and self.driver_cache_file and os.path.exists(self.driver_cache_file):
+                try:
+                    with open(self.driver_cache_file, 'r') as f:
+                        cached = f.read().strip()
+                    if cached and os.access(cached, os.X_OK):
+                        self.driver_path = cached
+                        return cached
+                except OSError as e:
+                    logger.warning("Could not read chromedriver cache %s: %s", self.driver_cache_file, e)
+
+            from webdriver_manager.chrome import ChromeDriverManager
+            self.driver_path = ChromeDriverManager().install()
+            logger.info("Using chromedriver at %s", self.driver_path)
+            if self.driver_cache_file:
+                try:
+                    with open(self.driver_cache_file, 'w') as f:
+                        f.write(self.driver_path)
+                except OSError as e:
+                    logger.warning("Could not write chromedriver cache %s: %s", self.driver_cache_file, e)
+            return self.driver_path
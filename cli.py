@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+PrairieTest monitor command line.
+
+Usage:
+    python cli.py run [--watches FILE] [--async]
+    python cli.py check-once [--watches FILE]
+    python cli.py validate-config [--watches FILE]
+    python cli.py history {summary,releases,open-at,series,durations} [OPTIONS]
+    python cli.py coordinate [--watches FILE] [--store FILE] [--json]
+    python cli.py worker [--store FILE] [--id NAME] [--capacity N]
+    python cli.py bench {parser,browser,replay,startup,reserve,archive,workers} [ARGS...]
+
+Each subcommand imports only what it needs: validate-config never loads
+requests, Selenium or the parsers, and check-once only loads Selenium if it
+has to log in through the browser. That keeps cron invocations fast.
+"""
+
+import sys
+import argparse
+
+BENCHMARKS = ('parser', 'browser', 'replay', 'startup', 'reserve', 'archive', 'workers')
+
+WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def cmd_run(args) -> int:
+    """Monitor until interrupted."""
+    from logging_setup import configure_logging, stop_logging
+
+    if args.watches and args.use_async:
+        import asyncio
+        from async_monitor import main as async_main
+
+        try:
+            asyncio.run(async_main(args.watches))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.watches:
+        from watch_supervisor import WatchSupervisor, load_watches
+
+        runner = WatchSupervisor(load_watches(args.watches))
+        start = runner.run
+    else:
+        from prairie_monitor import PrairieTestMonitor
+
+        runner = PrairieTestMonitor()
+        start = runner.start_monitoring
+
+    configure_logging(runner.config)
+    try:
+        start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.cleanup()
+        stop_logging()
+    return 0
+
+
+def cmd_check_once(args) -> int:
+    """One check (alerts included), then exit; non-zero if the check failed."""
+    from logging_setup import configure_logging, stop_logging
+
+    if args.watches:
+        from watch_supervisor import WatchSupervisor, load_watches
+
+        runner = WatchSupervisor(load_watches(args.watches))
+        check = runner.check_all
+    else:
+        from prairie_monitor import PrairieTestMonitor
+
+        runner = PrairieTestMonitor()
+        check = runner.check_and_notify
+
+    configure_logging(runner.config)
+    try:
+        succeeded = check()
+    finally:
+        # Delivers any queued alert before the process exits
+        runner.cleanup()
+        stop_logging()
+    return 0 if succeeded else 1
+
+
+def cmd_validate_config(args) -> int:
+    """Check the .env settings (and a watches file) without contacting anything."""
+    from config import ConfigError, load_config, validate_config, validate_watches
+
+    try:
+        config = load_config()
+    except ConfigError as e:
+        print(f"Invalid configuration: {str(e)}")
+        return 1
+
+    problems = validate_config(config)
+    if args.watches:
+        problems.extend(validate_watches(args.watches, config))
+
+    if problems:
+        print(f"{len(problems)} configuration problem(s):")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print(f"Configuration OK (fetch mode {config['fetch_mode']}, parser {config['parser_backend']})")
+    return 0
+
+
+def _timestamp(text):
+    """Unix time of an ISO date or date and time (local time), or None."""
+    from datetime import datetime
+
+    return datetime.fromisoformat(text).timestamp() if text else None
+
+
+def _format_time(moment) -> str:
+    from datetime import datetime
+
+    return datetime.fromtimestamp(moment).strftime('%Y-%m-%d %H:%M') if moment else '-'
+
+
+def cmd_history(args) -> int:
+    """Answer a question about past availability from the slot archive."""
+    import os
+    import json
+    import time
+    from config import load_config
+    from slot_archive import SlotArchive, archive_directory
+
+    if args.archive:
+        directory = args.archive
+    else:
+        config = load_config()
+        if not config['slot_archive_dir']:
+            print("SLOT_ARCHIVE_DIR is empty, so no slot history is kept")
+            return 1
+        directory = archive_directory(config['slot_archive_dir'], config['prairie_url'], config['school_email'])
+    if not os.path.isdir(directory):
+        print(f"No slot archive at {directory}")
+        return 1
+
+    archive = SlotArchive(directory)
+    criteria = {'desired_date': args.date, 'desired_time': args.time,
+                'desired_location': args.location, 'desired_weekdays': args.weekdays}
+    try:
+        since, until, at = _timestamp(args.since), _timestamp(args.until), _timestamp(args.at)
+    except ValueError as e:
+        print(f"Invalid --since, --until or --at: {str(e)}")
+        return 1
+
+    if args.query == 'summary':
+        result = archive.summary()
+        result['covered_seconds'] = archive.coverage_seconds(since, until)
+    elif args.query == 'releases':
+        result = archive.releases(criteria, since, until)
+    elif args.query == 'open-at':
+        result = archive.open_at(at if at is not None else time.time(), criteria)
+    elif args.query == 'series':
+        end = until if until is not None else time.time()
+        start = since if since is not None else end - 7 * 86400
+        result = archive.series(start, end, args.step, criteria)
+    else:
+        result = archive.durations(criteria, since, until)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif args.query == 'summary':
+        for name, value in result.items():
+            print(f"{name:20} {_format_time(value) if name.endswith('_event') else value}")
+    elif args.query == 'releases':
+        print(f"{result['total']} matching slot(s) released")
+        busiest = sorted(range(len(result['by_hour_of_week'])), key=lambda h: -result['by_hour_of_week'][h])
+        for hour in busiest[:args.top]:
+            if result['by_hour_of_week'][hour]:
+                print(f"  {WEEKDAY_NAMES[hour // 24]} {hour % 24:02d}:00  {result['by_hour_of_week'][hour]}")
+    elif args.query == 'open-at':
+        print(f"{len(result)} matching slot(s) open")
+        for slot in result:
+            print(f"  {slot['date']} {slot['time']} at {slot['location']}")
+    elif args.query == 'series':
+        for moment, count in result:
+            print(f"{_format_time(moment)}  {count}")
+    elif result['count']:
+        print(f"{result['count']} matching slot(s) taken: median open {result['median']}s, "
+              f"p90 {result['p90']}s, mean {result['mean']:.0f}s, longest {result['max']}s "
+              f"({result['still_open']} still open)")
+    else:
+        print(f"No matching slot has been taken yet ({result['still_open']} still open)")
+    return 0
+
+
+def cmd_coordinate(args) -> int:
+    """Publish a watches file to the lease store and show who is checking what."""
+    import json
+    from config import load_config
+    from sharding import LeaseStore
+
+    config = load_config()
+    store = LeaseStore(args.store or config['lease_store'], ttl=config['lease_ttl'])
+    try:
+        if args.watches:
+            from watch_supervisor import load_watches
+
+            counts = store.publish(load_watches(args.watches))
+            if not args.json:
+                print(f"Published {args.watches}: {counts['added']} accounts added, "
+                      f"{counts['updated']} updated, {counts['removed']} removed")
+        status = store.status()
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps(status, indent=2))
+        return 0
+    print(f"{len(status['leases'])} accounts, {sum(worker['live'] for worker in status['workers'])} live workers")
+    for lease in status['leases']:
+        print(f"  {lease['account']:50} {lease['worker'] or 'unassigned':30} v{lease['version']}")
+    for worker in status['workers']:
+        print(f"  worker {worker['worker']:43} {'live' if worker['live'] else 'gone':6} "
+              f"heartbeat {worker['last_heartbeat']:g}s ago, capacity {worker['capacity']}")
+    return 0
+
+
+def cmd_worker(args) -> int:
+    """Lease accounts from the lease store and check them until interrupted."""
+    import signal
+    from logging_setup import configure_logging, stop_logging
+    from config import load_config
+    from sharding import LeaseStore, ShardWorker
+
+    config = load_config()
+    worker = ShardWorker(LeaseStore(args.store or config['lease_store'], ttl=config['lease_ttl']),
+                         worker_id=args.id, capacity=args.capacity)
+    # Hand the leases back on kill as well as on Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+
+    configure_logging(worker.config)
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.cleanup()
+        stop_logging()
+    return 0
+
+
+def cmd_bench(args) -> int:
+    """Run one of the benchmarks in benchmarks/ with the remaining arguments."""
+    import runpy
+
+    module = 'benchmarks.replay' if args.benchmark == 'replay' else f"benchmarks.bench_{args.benchmark}"
+    sys.argv = [module.replace('.', '/') + '.py'] + args.args
+    try:
+        runpy.run_module(module, run_name='__main__', alter_sys=True)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description="PrairieTest slot monitor")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="monitor until interrupted")
+    run.add_argument('--watches', metavar='FILE', help="run every watch in a watches JSON file")
+    run.add_argument('--async', dest='use_async', action='store_true',
+                     help="run the watches on one asyncio event loop (with --watches)")
+    run.set_defaults(handler=cmd_run)
+
+    check_once = commands.add_parser('check-once', help="check once, send any alerts and exit (for cron)")
+    check_once.add_argument('--watches', metavar='FILE', help="check every watch in a watches JSON file")
+    check_once.set_defaults(handler=cmd_check_once)
+
+    validate = commands.add_parser('validate-config', help="check .env (and a watches file) for mistakes")
+    validate.add_argument('--watches', metavar='FILE', help="also check a watches JSON file")
+    validate.set_defaults(handler=cmd_validate_config)
+
+    history = commands.add_parser('history', help="query the slot archive (SLOT_ARCHIVE_DIR)")
+    history.add_argument('query', choices=('summary', 'releases', 'open-at', 'series', 'durations'))
+    history.add_argument('--date', help="only slots matching this DESIRED_DATE")
+    history.add_argument('--time', help="only slots matching this DESIRED_TIME")
+    history.add_argument('--location', help="only slots matching this DESIRED_LOCATION")
+    history.add_argument('--weekdays', help="only slots on these DESIRED_WEEKDAYS")
+    history.add_argument('--since', metavar='ISO_TIME', help="from this local date/time")
+    history.add_argument('--until', metavar='ISO_TIME', help="up to this local date/time")
+    history.add_argument('--at', metavar='ISO_TIME', help="moment for open-at (default: now)")
+    history.add_argument('--step', type=float, default=3600, help="seconds between series points")
+    history.add_argument('--top', type=int, default=10, help="busiest hours listed by releases")
+    history.add_argument('--archive', metavar='DIR', help="an account's archive directory (default: from .env)")
+    history.add_argument('--json', action='store_true', help="print the result as JSON")
+    history.set_defaults(handler=cmd_history)
+
+    coordinate = commands.add_parser('coordinate', help="publish watches to the lease store for workers")
+    coordinate.add_argument('--watches', metavar='FILE', help="make the store hold exactly these watches")
+    coordinate.add_argument('--store', metavar='FILE', help="lease store (default: LEASE_STORE)")
+    coordinate.add_argument('--json', action='store_true', help="print the lease status as JSON")
+    coordinate.set_defaults(handler=cmd_coordinate)
+
+    worker = commands.add_parser('worker', help="check accounts leased from the lease store")
+    worker.add_argument('--store', metavar='FILE', help="lease store (default: LEASE_STORE)")
+    worker.add_argument('--id', help="worker name (default: host-pid)")
+    worker.add_argument('--capacity', type=int, help="most accounts to lease (default: WORKER_CAPACITY)")
+    worker.set_defaults(handler=cmd_worker)
+
+    bench = commands.add_parser('bench', help="run a benchmark from benchmarks/")
+    bench.add_argument('benchmark', choices=BENCHMARKS)
+    bench.add_argument('args', nargs=argparse.REMAINDER, help="arguments passed to the benchmark")
+    bench.set_defaults(handler=cmd_bench)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'use_async', False) and not args.watches:
+        parser.error("run --async needs --watches FILE")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
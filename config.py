@@ -0,0 +1,236 @@
+"""
+Configuration for the PrairieTest monitor.
+Reads settings from the environment (and .env) and checks them, without
+importing anything the monitor itself needs to run.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+FETCH_MODES = ('http', 'api', 'browser')
+PARSER_BACKENDS = ('lxml', 'soup')
+LOG_FORMATS = ('text', 'json')
+LOG_ROTATIONS = ('size', 'time', 'none')
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+class ConfigError(ValueError):
+    """Raised when an environment variable has a value of the wrong type."""
+
+
+def _number(name: str, default, kind):
+    value = os.getenv(name) or default
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        expected = 'an integer' if kind is int else 'a number'
+        raise ConfigError(f"{name} must be {expected}, got {value!r}") from None
+
+
+def _int(name: str, default) -> int:
+    return _number(name, default, int)
+
+
+def _float(name: str, default) -> float:
+    return _number(name, default, float)
+
+
+def _bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.lower() == 'true'
+
+
+def load_config() -> Dict[str, Any]:
+    """Load configuration from environment variables (and .env, without overriding them)."""
+    load_dotenv()
+    check_interval = _int('CHECK_INTERVAL_MINUTES', '5')
+    return {
+        'prairie_url': os.getenv('PRAIRIE_TEST_URL', 'https://us.prairietest.com/'),
+        'school_email': os.getenv('SCHOOL_EMAIL'),
+        'school_password': os.getenv('SCHOOL_PASSWORD'),
+        'smtp_server': os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+        'smtp_port': _int('SMTP_PORT', '587'),
+        'smtp_starttls': _bool('SMTP_STARTTLS', True),
+        'smtp_idle_timeout': _float('SMTP_IDLE_TIMEOUT_SECONDS', '240'),
+        'notify_coalesce_seconds': _float('NOTIFY_COALESCE_SECONDS', '5'),
+        'notify_max_retries': _int('NOTIFY_MAX_RETRIES', '5'),
+        'notification_email': os.getenv('NOTIFICATION_EMAIL'),
+        'email_password': os.getenv('EMAIL_PASSWORD'),
+        'check_interval': check_interval,
+        'check_interval_seconds': _float('CHECK_INTERVAL_SECONDS', check_interval * 60),
+        'check_jitter': _float('CHECK_JITTER_SECONDS', '0'),
+        'burst_windows': os.getenv('BURST_WINDOWS', ''),
+        'adaptive_polling': _bool('ADAPTIVE_POLLING', True),
+        'min_check_interval': _float('MIN_CHECK_INTERVAL_SECONDS', '30'),
+        'max_check_interval': _float('MAX_CHECK_INTERVAL_SECONDS', '1800'),
+        'max_backoff': _float('MAX_BACKOFF_SECONDS', '1800'),
+        'slot_history_file': os.getenv('SLOT_HISTORY_FILE', 'slot_history.json'),
+        'slot_state_db': os.getenv('SLOT_STATE_DB', 'slot_state.db'),
+        'slot_archive_dir': os.getenv('SLOT_ARCHIVE_DIR', 'slot_archive'),
+        'watch_name': os.getenv('WATCH_NAME', 'default'),
+        'desired_date': os.getenv('DESIRED_DATE'),
+        'desired_time': os.getenv('DESIRED_TIME'),
+        'desired_location': os.getenv('DESIRED_LOCATION'),
+        'desired_weekdays': os.getenv('DESIRED_WEEKDAYS'),
+        'auto_reserve': _bool('AUTO_RESERVE', False),
+        'auto_reserve_dry_run': _bool('AUTO_RESERVE_DRY_RUN', False),
+        'auto_reserve_max_per_watch': _int('AUTO_RESERVE_MAX_PER_WATCH', '1'),
+        'auto_reserve_url_template': os.getenv('AUTO_RESERVE_URL_TEMPLATE', ''),
+        'auto_reserve_confirm_path': os.getenv('AUTO_RESERVE_CONFIRM_PATH', r'/confirm(ation|ed)?/?$'),
+        'auto_reserve_confirm_pattern': os.getenv('AUTO_RESERVE_CONFIRM_PATTERN', ''),
+        'headless': _bool('HEADLESS_MODE', True),
+        'timeout': _int('BROWSER_TIMEOUT', '30'),
+        'lean_browser': _bool('LEAN_BROWSER', True),
+        'browser_profile_dir': os.getenv('BROWSER_PROFILE_DIR', '.chrome-profiles'),
+        'chromedriver_path': os.getenv('CHROMEDRIVER_PATH'),
+        'chromedriver_cache_file': os.getenv('CHROMEDRIVER_CACHE_FILE', '.chromedriver-path'),
+        'ready_poll_interval': _float('READY_POLL_SECONDS', '0.1'),
+        'network_idle_seconds': _float('NETWORK_IDLE_SECONDS', '0.5'),
+        'ready_xhr_pattern': os.getenv('READY_XHR_PATTERN') or None,
+        'fetch_mode': os.getenv('FETCH_MODE', 'http').lower(),
+        'http_timeout': _int('HTTP_TIMEOUT', '10'),
+        'parser_backend': os.getenv('PARSER_BACKEND', 'lxml').lower(),
+        'selector_cache_file': os.getenv('SELECTOR_CACHE_FILE', 'selector_cache.json'),
+        'session_dir': os.getenv('SESSION_DIR', '.sessions'),
+        'session_encryption_key': os.getenv('SESSION_ENCRYPTION_KEY'),
+        'max_browsers': _int('MAX_BROWSERS', '2'),
+        'max_workers': _int('MAX_WORKERS', '8'),
+        'max_concurrent_fetches': _int('MAX_CONCURRENT_FETCHES', '20'),
+        'lease_store': os.getenv('LEASE_STORE', 'leases.db'),
+        'lease_ttl': _float('LEASE_TTL_SECONDS', '30'),
+        'worker_capacity': _int('WORKER_CAPACITY', '20'),
+        'account_rate_limit_seconds': _float('ACCOUNT_RATE_LIMIT_SECONDS', '10'),
+        'browser_recycle_checks': _int('BROWSER_RECYCLE_CHECKS', '200'),
+        'browser_max_rss_mb': _float('BROWSER_MAX_RSS_MB', '1500'),
+        'circuit_failure_threshold': _int('CIRCUIT_FAILURE_THRESHOLD', '5'),
+        'circuit_reset_seconds': _float('CIRCUIT_RESET_SECONDS', '300'),
+        'metrics_port': _int('METRICS_PORT', '0'),
+        'metrics_host': os.getenv('METRICS_HOST', '127.0.0.1'),
+        'metrics_json_file': os.getenv('METRICS_JSON_FILE', ''),
+        'ingest_port': _int('INGEST_PORT', '0'),
+        'ingest_host': os.getenv('INGEST_HOST', '127.0.0.1'),
+        'ingest_token': os.getenv('INGEST_TOKEN', ''),
+        'ingest_account': os.getenv('INGEST_ACCOUNT', ''),
+        'ingest_fresh_seconds': _float('INGEST_FRESH_SECONDS', '120'),
+        'ingest_poll_interval': _float('INGEST_POLL_INTERVAL_SECONDS', '600'),
+        'log_file': os.getenv('LOG_FILE', 'prairie_monitor.log'),
+        'log_level': os.getenv('LOG_LEVEL', 'INFO'),
+        'log_format': os.getenv('LOG_FORMAT', 'text').lower(),
+        'log_rotation': os.getenv('LOG_ROTATION', 'size').lower(),
+        'log_max_mb': _float('LOG_MAX_MB', '10'),
+        'log_backup_count': _int('LOG_BACKUP_COUNT', '5'),
+        'log_rotate_when': os.getenv('LOG_ROTATE_WHEN', 'midnight')
+    }
+
+
+def validate_config(config: Dict[str, Any]) -> List[str]:
+    """Every problem with a loaded configuration, as messages naming the setting."""
+    from scheduler import parse_burst_windows
+    from slot_matcher import criteria_problems
+
+    problems = []
+    for key, name in (('school_email', 'SCHOOL_EMAIL'), ('school_password', 'SCHOOL_PASSWORD'),
+                      ('notification_email', 'NOTIFICATION_EMAIL')):
+        if not config.get(key):
+            problems.append(f"{name} is not set")
+    if not config.get('email_password') and config['smtp_server'] not in ('localhost', '127.0.0.1'):
+        problems.append("EMAIL_PASSWORD is not set (only a local SMTP relay works without one)")
+
+    url = urlparse(config['prairie_url'] or '')
+    if url.scheme not in ('http', 'https') or not url.netloc:
+        problems.append(f"PRAIRIE_TEST_URL is not an http(s) URL: {config['prairie_url']!r}")
+
+    for key, name, allowed in (('fetch_mode', 'FETCH_MODE', FETCH_MODES),
+                               ('parser_backend', 'PARSER_BACKEND', PARSER_BACKENDS),
+                               ('log_format', 'LOG_FORMAT', LOG_FORMATS),
+                               ('log_rotation', 'LOG_ROTATION', LOG_ROTATIONS)):
+        if config[key] not in allowed:
+            problems.append(f"{name} must be one of {', '.join(allowed)}, got {config[key]!r}")
+    if str(config['log_level']).upper() not in LOG_LEVELS:
+        problems.append(f"LOG_LEVEL must be one of {', '.join(LOG_LEVELS)}, got {config['log_level']!r}")
+
+    for key, name in (('check_interval_seconds', 'CHECK_INTERVAL_SECONDS'), ('timeout', 'BROWSER_TIMEOUT'),
+                      ('http_timeout', 'HTTP_TIMEOUT'), ('min_check_interval', 'MIN_CHECK_INTERVAL_SECONDS'),
+                      ('max_browsers', 'MAX_BROWSERS'), ('max_workers', 'MAX_WORKERS'),
+                      ('max_concurrent_fetches', 'MAX_CONCURRENT_FETCHES'),
+                      ('notify_max_retries', 'NOTIFY_MAX_RETRIES'),
+                      ('lease_ttl', 'LEASE_TTL_SECONDS'), ('worker_capacity', 'WORKER_CAPACITY')):
+        if config[key] <= 0:
+            problems.append(f"{name} must be greater than 0, got {config[key]:g}")
+    for key, name in (('browser_recycle_checks', 'BROWSER_RECYCLE_CHECKS'),
+                      ('browser_max_rss_mb', 'BROWSER_MAX_RSS_MB'),
+                      ('circuit_failure_threshold', 'CIRCUIT_FAILURE_THRESHOLD'),
+                      ('circuit_reset_seconds', 'CIRCUIT_RESET_SECONDS'),
+                      ('ingest_fresh_seconds', 'INGEST_FRESH_SECONDS'),
+                      ('ingest_poll_interval', 'INGEST_POLL_INTERVAL_SECONDS'),
+                      ('account_rate_limit_seconds', 'ACCOUNT_RATE_LIMIT_SECONDS')):
+        if config[key] < 0:
+            problems.append(f"{name} must be 0 (off) or more, got {config[key]:g}")
+    if config['ingest_port'] and config['ingest_port'] == config['metrics_port']:
+        problems.append("INGEST_PORT and METRICS_PORT must differ")
+    if config['min_check_interval'] > config['max_check_interval']:
+        problems.append("MIN_CHECK_INTERVAL_SECONDS is greater than MAX_CHECK_INTERVAL_SECONDS")
+    for key, name, lowest in (('smtp_port', 'SMTP_PORT', 1), ('metrics_port', 'METRICS_PORT', 0),
+                              ('ingest_port', 'INGEST_PORT', 0)):
+        if not lowest <= config[key] <= 65535:
+            problems.append(f"{name} must be a port number, got {config[key]}")
+
+    try:
+        parse_burst_windows(config['burst_windows'], strict=True)
+    except ValueError as e:
+        problems.append(f"BURST_WINDOWS: {str(e)}")
+
+    problems.extend(criteria_problems(config))
+
+    if config['auto_reserve_max_per_watch'] < 0:
+        problems.append(f"AUTO_RESERVE_MAX_PER_WATCH must be 0 or more, got {config['auto_reserve_max_per_watch']}")
+    for key, name in (('auto_reserve_confirm_path', 'AUTO_RESERVE_CONFIRM_PATH'),
+                      ('auto_reserve_confirm_pattern', 'AUTO_RESERVE_CONFIRM_PATTERN')):
+        try:
+            re.compile(config[key])
+        except re.error as e:
+            problems.append(f"{name} is not a valid regular expression: {str(e)}")
+    if not config['auto_reserve_confirm_path'].strip():
+        problems.append("AUTO_RESERVE_CONFIRM_PATH must not be empty, it would confirm every redirect")
+    template = config['auto_reserve_url_template']
+    if template and '{id}' not in template:
+        problems.append(f"AUTO_RESERVE_URL_TEMPLATE must contain {{id}}, got {template!r}")
+
+    if config['session_encryption_key']:
+        try:
+            from cryptography.fernet import Fernet
+            Fernet(config['session_encryption_key'])
+        except ImportError:
+            problems.append("SESSION_ENCRYPTION_KEY is set but the cryptography package is not installed")
+        except ValueError:
+            problems.append("SESSION_ENCRYPTION_KEY is not a valid Fernet key")
+
+    return problems
+
+
+def validate_watches(path: str, config: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Problems with a watches file: its JSON shape and each watch's criteria."""
+    import json
+    from slot_matcher import criteria_problems
+
+    try:
+        with open(path, 'r') as f:
+            definitions = json.load(f)
+    except (OSError, ValueError) as e:
+        return [f"{path}: {str(e)}"]
+    if not isinstance(definitions, list) or not all(isinstance(item, dict) for item in definitions):
+        return [f"{path}: expected a JSON list of watch objects"]
+
+    problems = []
+    for index, definition in enumerate(definitions):
+        name = definition.get('name', f"watch-{index + 1}")
+        # Keys a watch leaves out fall back to the .env values
+        criteria = dict(config or {}, **{key: value for key, value in definition.items() if value})
+        problems.extend(f"{path} [{name}]: {problem}" for problem in criteria_problems(criteria))
+        if not criteria.get('school_email') or not criteria.get('school_password'):
+            problems.append(f"{path} [{name}]: no school_email/school_password (and none in .env)")
+    return problems
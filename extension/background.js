@@ -1,9 +1,19 @@
 // Background service worker for PrairieTest Monitor extension
+
+// Same identity as the Python monitor's slot_key: normalised date, time and location
+function slotKey(slot) {
+  return ["date", "time", "location"]
+    .map((field) => (slot[field] || "").trim().toLowerCase().replace(/\s+/g, " ") || "unknown")
+    .join("|");
+}
+
 class PrairieTestBackground {
   constructor() {
     this.isMonitoring = false;
     this.monitoringInterval = null;
     this.settings = {};
+    // Matching slots already shown in a notification
+    this.notifiedKeys = new Set();
     this.setupMessageListeners();
     this.loadSettings();
   }
@@ -22,8 +32,8 @@ class PrairieTestBackground {
         case "getStatus":
           sendResponse({ isMonitoring: this.isMonitoring });
           break;
-        case "slotFound":
-          this.handleSlotFound(message.slot);
+        case "slotSnapshot":
+          this.handleSnapshot(message);
           sendResponse({ success: true });
           break;
         case "logActivity":
@@ -125,47 +135,102 @@ class PrairieTestBackground {
     }
   }
 
-  async handleSlotFound(slot) {
+  async handleSnapshot(snapshot) {
     try {
-      // Send notification
-      await this.sendNotification(slot);
+      // Everything on the page goes to the local monitor, which does its own matching
+      await this.postToMonitor(snapshot.url, snapshot.slots);
 
-      // Log the find
-      this.logActivity(`Slot found: ${slot.date} at ${slot.time}`, "success");
+      const newSlots = snapshot.matchingSlots.filter((slot) => {
+        const key = slotKey(slot);
+        if (this.notifiedKeys.has(key)) {
+          return false;
+        }
+        this.notifiedKeys.add(key);
+        return true;
+      });
+      if (newSlots.length === 0) {
+        return;
+      }
 
-      // Optionally stop monitoring after finding a slot
-      // this.stopMonitoring();
+      // One notification for the whole batch
+      await this.sendNotification(newSlots);
+      this.logActivity(
+        newSlots.length === 1
+          ? `Slot found: ${newSlots[0].date} at ${newSlots[0].time}`
+          : `${newSlots.length} slots found`,
+        "success"
+      );
+    } catch (error) {
+      console.error("Error handling slot snapshot:", error);
+      this.logActivity("Error handling slot snapshot", "error");
+    }
+  }
+
+  async postToMonitor(url, slots) {
+    const { ingestUrl, ingestToken } = await chrome.storage.sync.get([
+      "ingestUrl",
+      "ingestToken",
+    ]);
+    if (!ingestUrl) {
+      return;
+    }
+
+    try {
+      const headers = { "Content-Type": "application/json" };
+      if (ingestToken) {
+        headers["X-Ingest-Token"] = ingestToken;
+      }
+      // Fields the content script could not read stay "Unknown"; the monitor
+      // reads them the way its own parsers write them, so slot keys agree
+      const response = await fetch(ingestUrl, {
+        method: "POST",
+        headers: headers,
+        body: JSON.stringify({ url: url, slots: slots }),
+      });
+      if (!response.ok) {
+        this.logActivity(
+          `Local monitor refused the snapshot (HTTP ${response.status})`,
+          "error"
+        );
+      }
     } catch (error) {
-      console.error("Error handling slot found:", error);
-      this.logActivity("Error handling slot found", "error");
+      // The local monitor is not running; the extension keeps working on its own
+      console.warn("Could not reach the local monitor:", error);
     }
   }
 
-  async sendNotification(slot) {
+  async sendNotification(slots) {
     try {
       // Create notification
       const notificationId = `prairie-slot-${Date.now()}`;
+      const describe = (slot) =>
+        `${slot.date} at ${slot.time}${slot.location ? ` (${slot.location})` : ""}`;
 
       await chrome.notifications.create(notificationId, {
         type: "basic",
         iconUrl: "icons/icon48.png",
-        title: "🎉 PrairieTest Slot Available!",
-        message: `Found slot on ${slot.date} at ${slot.time}${
-          slot.location ? ` (${slot.location})` : ""
-        }`,
+        title:
+          slots.length === 1
+            ? "🎉 PrairieTest Slot Available!"
+            : `🎉 ${slots.length} PrairieTest Slots Available!`,
+        message:
+          slots.length === 1
+            ? `Found slot on ${describe(slots[0])}`
+            : slots.slice(0, 3).map(describe).join("\n") +
+              (slots.length > 3 ? `\n…and ${slots.length - 3} more` : ""),
         priority: 2,
       });
 
       // Send email notification if configured
       if (this.settings.notificationEmail) {
-        await this.sendEmailNotification(slot);
+        await this.sendEmailNotification(slots);
       }
     } catch (error) {
       console.error("Error sending notification:", error);
     }
   }
 
-  async sendEmailNotification(slot) {
+  async sendEmailNotification(slots) {
     try {
       // Use a simple email service or webhook
       // For now, we'll use a simple approach with a webhook service
@@ -175,11 +240,14 @@ class PrairieTestBackground {
         to: this.settings.notificationEmail,
         subject: "🎉 PrairieTest Slot Available!",
         body: `
-                    Good news! A PrairieTest slot is available:
+                    Good news! PrairieTest slots are available:
                     
-                    Date: ${slot.date}
-                    Time: ${slot.time}
-                    Location: ${slot.location || "Not specified"}
+                    ${slots
+                      .map(
+                        (slot) =>
+                          `${slot.date} at ${slot.time} (${slot.location || "Not specified"})`
+                      )
+                      .join("\n")}
                     
                     Click here to book: https://us.prairietest.com/
                     
@@ -1,6 +1,16 @@
 // Content script for PrairieTest Monitor extension
+
+// Wait for the page to stop changing this long before reading the slots
+const DEBOUNCE_MS = 500;
+// Resend an unchanged page this often, so the local monitor knows the tab is still open
+const HEARTBEAT_MS = 60000;
+
 class PrairieTestContentScript {
   constructor() {
+    this.debounceTimer = null;
+    // Signature of the last snapshot sent, so an unchanged page is not sent again
+    this.lastSignature = null;
+    this.lastSent = 0;
     this.setupMessageListeners();
     this.initializeSlotDetection();
   }
@@ -25,19 +35,16 @@ class PrairieTestContentScript {
     setTimeout(() => {
       this.checkForSlots();
     }, 2000);
+    setInterval(() => this.checkForSlots(), HEARTBEAT_MS);
   }
 
   setupMutationObserver() {
-    // Watch for changes in the DOM that might indicate new slots
+    // Watch for changes in the DOM that might indicate new slots. A burst of
+    // mutations (one re-render) only leads to one check once it settles.
     const observer = new MutationObserver((mutations) => {
-      mutations.forEach((mutation) => {
-        if (mutation.type === "childList" && mutation.addedNodes.length > 0) {
-          // Check if new content might contain slots
-          setTimeout(() => {
-            this.checkForSlots();
-          }, 1000);
-        }
-      });
+      if (mutations.some((mutation) => mutation.addedNodes.length > 0)) {
+        this.scheduleCheck();
+      }
     });
 
     // Start observing the document
@@ -47,6 +54,14 @@ class PrairieTestContentScript {
     });
   }
 
+  scheduleCheck() {
+    clearTimeout(this.debounceTimer);
+    this.debounceTimer = setTimeout(() => {
+      this.debounceTimer = null;
+      this.checkForSlots();
+    }, DEBOUNCE_MS);
+  }
+
   async checkForSlots(settings = null) {
     try {
       // Get settings from storage if not provided
@@ -67,21 +82,21 @@ class PrairieTestContentScript {
 
       // Look for available slots on the page
       const availableSlots = this.findAvailableSlots();
-
-      if (availableSlots.length > 0) {
-        // Filter slots based on user preferences
-        const matchingSlots = this.filterSlots(availableSlots, settings);
-
-        if (matchingSlots.length > 0) {
-          // Send notification for each matching slot
-          for (const slot of matchingSlots) {
-            await chrome.runtime.sendMessage({
-              action: "slotFound",
-              slot: slot,
-            });
-          }
-        }
+      const signature = JSON.stringify(availableSlots);
+      if (signature === this.lastSignature && Date.now() - this.lastSent < HEARTBEAT_MS) {
+        return;
       }
+      this.lastSignature = signature;
+      this.lastSent = Date.now();
+
+      // The whole page goes out as one batch: the background script forwards
+      // it to the local monitor and shows one notification for the matches
+      await chrome.runtime.sendMessage({
+        action: "slotSnapshot",
+        url: window.location.href,
+        slots: availableSlots,
+        matchingSlots: this.filterSlots(availableSlots, settings),
+      });
     } catch (error) {
       console.error("Error checking for slots:", error);
     }
@@ -89,6 +104,15 @@ class PrairieTestContentScript {
 
   findAvailableSlots() {
     const slots = [];
+    const seen = new Set();
+    const addSlot = (slotInfo) => {
+      // The container and clickable selectors can find the same slot twice
+      const key = `${slotInfo.date}|${slotInfo.time}|${slotInfo.location}`;
+      if (!seen.has(key)) {
+        seen.add(key);
+        slots.push(slotInfo);
+      }
+    };
 
     // Common selectors for slot elements (adjust based on actual PrairieTest HTML)
     const slotSelectors = [
@@ -106,7 +130,7 @@ class PrairieTestContentScript {
     slotContainers.forEach((container) => {
       const slotInfo = this.extractSlotInfo(container);
       if (slotInfo) {
-        slots.push(slotInfo);
+        addSlot(slotInfo);
       }
     });
 
@@ -117,7 +141,7 @@ class PrairieTestContentScript {
     clickableSlots.forEach((element) => {
       const slotInfo = this.extractSlotInfo(element);
       if (slotInfo) {
-        slots.push(slotInfo);
+        addSlot(slotInfo);
       }
     });
 
@@ -194,7 +218,6 @@ class PrairieTestContentScript {
           date: date || "Unknown",
           time: time || "Unknown",
           location: location || "Unknown",
-          element: element,
         };
       }
     } catch (error) {
@@ -20,6 +20,8 @@ class PrairieTestPopup {
     this.desiredLocation = document.getElementById("desiredLocation");
     this.checkInterval = document.getElementById("checkInterval");
     this.notificationEmail = document.getElementById("notificationEmail");
+    this.ingestUrl = document.getElementById("ingestUrl");
+    this.ingestToken = document.getElementById("ingestToken");
   }
 
   setupEventListeners() {
@@ -33,6 +35,8 @@ class PrairieTestPopup {
       this.desiredLocation,
       this.checkInterval,
       this.notificationEmail,
+      this.ingestUrl,
+      this.ingestToken,
     ].forEach((element) => {
       element.addEventListener("change", () => this.saveSettings());
     });
@@ -46,6 +50,8 @@ class PrairieTestPopup {
         "desiredLocation",
         "checkInterval",
         "notificationEmail",
+        "ingestUrl",
+        "ingestToken",
         "isMonitoring",
       ]);
 
@@ -54,6 +60,8 @@ class PrairieTestPopup {
       this.desiredLocation.value = settings.desiredLocation || "";
       this.checkInterval.value = settings.checkInterval || "5";
       this.notificationEmail.value = settings.notificationEmail || "";
+      this.ingestUrl.value = settings.ingestUrl || "";
+      this.ingestToken.value = settings.ingestToken || "";
 
       if (settings.isMonitoring) {
         this.showStopButton();
@@ -73,6 +81,8 @@ class PrairieTestPopup {
         desiredLocation: this.desiredLocation.value,
         checkInterval: this.checkInterval.value,
         notificationEmail: this.notificationEmail.value,
+        ingestUrl: this.ingestUrl.value.trim(),
+        ingestToken: this.ingestToken.value,
       };
 
       await chrome.storage.sync.set(settings);
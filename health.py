@@ -0,0 +1,127 @@
+"""
+Health checks for the PrairieTest monitor.
+A circuit breaker that pauses checks while the site is failing, and memory
+measurement of the browser processes so leaky Chrome instances can be recycled.
+"""
+
+import os
+import time
+import logging
+from typing import Optional
+
+from metrics import RECOVERIES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class CircuitBreaker:
+    """Stops checks after repeated failures and lets one through again after a cooldown.
+
+    closed: checks run normally. open: every check is skipped until
+    reset_timeout has passed. half_open: the next check is a trial; success
+    closes the circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 300):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self) -> bool:
+        """Whether a check may run now (always, when failure_threshold is 0)."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            logger.info("Circuit for %s half-open, trying one check", self.name)
+        return True
+
+    def remaining(self) -> float:
+        """Seconds until an open circuit lets a trial check through."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Circuit for %s closed, checks resumed", self.name)
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if not self.failure_threshold:
+            return
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Circuit for %s open after %s consecutive failures, pausing checks for %gs",
+                               self.name, self.failures, self.reset_timeout)
+                RECOVERIES.inc(action='circuit_open')
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+def _children(pid: int):
+    """PIDs of a process's direct children, from /proc (Linux)."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", 'r') as f:
+            return [int(child) for child in f.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def _proc_rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """Resident memory in bytes of a process and all its descendants (None if it cannot be measured)."""
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            tree = [process] + process.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for member in tree:
+            try:
+                total += member.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    if not os.path.isdir(f"/proc/{pid}"):
+        return None
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        total += _proc_rss(current)
+        pending.extend(_children(current))
+    return total
+
+
+def driver_rss(driver) -> Optional[int]:
+    """Resident memory of a WebDriver's chromedriver and the Chrome processes it started."""
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is None:
+        return None
+    return process_tree_rss(process.pid)
@@ -0,0 +1,168 @@
+"""
+Local ingest endpoint for the PrairieTest monitor.
+Accepts schedule snapshots that the browser extension batches from the
+pages the user has open, and hands them to the monitor's matching and
+alerting. Only listens on localhost.
+"""
+
+import json
+import hmac
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, List, Dict, Any, Callable
+from urllib.parse import urlparse
+
+from metrics import INGESTED
+
+logger = logging.getLogger(__name__)
+
+INGEST_PATH = '/ingest'
+
+# Refuse bodies and snapshots bigger than any real schedule page
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_SLOTS = 5000
+
+SLOT_FIELDS = ('date', 'time', 'location')
+
+# What the extension's content script and the monitor's parsers put in a field they could not read
+UNKNOWN = 'Unknown'
+
+
+class IngestError(ValueError):
+    """Raised for a snapshot that cannot be accepted."""
+
+
+def _field_text(item: Dict[str, Any], field: str) -> str:
+    value = item.get(field)
+    text = '' if value is None else str(value).strip()
+    return '' if text == UNKNOWN else text
+
+
+def parse_snapshot(body: bytes) -> Dict[str, Any]:
+    """Validate an ingest request body: {"url": page URL, "slots": [{"date", "time", "location"}, ...]}.
+
+    Slots come back shaped like the monitor's own parsers shape them: an
+    unreadable date or time is left out and an unreadable location is
+    'Unknown', so a slot has the same slot_key whichever side saw it first.
+    """
+    try:
+        data = json.loads(body.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise IngestError(f"Body is not JSON: {str(e)}")
+    if not isinstance(data, dict) or not isinstance(data.get('slots'), list):
+        raise IngestError("Expected an object with a 'slots' list")
+    if len(data['slots']) > MAX_SLOTS:
+        raise IngestError(f"More than {MAX_SLOTS} slots in one snapshot")
+
+    slots = []
+    for item in data['slots']:
+        if not isinstance(item, dict):
+            raise IngestError("Every slot must be an object")
+        slot = {field: _field_text(item, field) for field in SLOT_FIELDS if _field_text(item, field)}
+        if slot.get('date') or slot.get('time'):
+            slot.setdefault('location', UNKNOWN)
+            slots.append(slot)
+    return {'url': str(data.get('url') or ''), 'slots': slots}
+
+
+class IngestServer:
+    """Serves POST /ingest for the extension; each snapshot is passed to handler(slots, page_url).
+
+    handler returns how many slots were new and runs on the request's
+    thread, so the extension gets its answer once the alert is queued.
+    """
+
+    def __init__(self, handler: Callable[[List[Dict[str, str]], str], int], port: int = 0,
+                 host: str = '127.0.0.1', token: Optional[str] = None, hosts: Optional[List[str]] = None):
+        self.handler = handler
+        self.port = port
+        self.host = host
+        self.token = token
+        # PrairieTest hosts the snapshots may come from
+        self.hosts = set(hosts or [])
+        self.server = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], handler, hosts: Optional[List[str]] = None) -> 'IngestServer':
+        return cls(handler, port=config['ingest_port'], host=config['ingest_host'],
+                   token=config['ingest_token'] or None,
+                   hosts=hosts or [urlparse(config['prairie_url']).netloc])
+
+    def start(self):
+        if self.port:
+            handler_class = type('_BoundIngestHandler', (_IngestHandler,), {'ingest': self})
+            try:
+                self.server = ThreadingHTTPServer((self.host, self.port), handler_class)
+            except OSError as e:
+                logger.warning("Could not accept extension snapshots on %s:%s: %s", self.host, self.port, e)
+            else:
+                threading.Thread(target=self.server.serve_forever, name='ingest', daemon=True).start()
+                logger.info("Accepting extension snapshots at http://%s:%s%s", self.host, self.port, INGEST_PATH)
+        return self
+
+    def accept(self, body: bytes, token: Optional[str]) -> Dict[str, Any]:
+        """Check and hand over one request body; returns the JSON answer."""
+        if self.token and not hmac.compare_digest(token or '', self.token):
+            raise PermissionError("Wrong or missing X-Ingest-Token")
+        snapshot = parse_snapshot(body)
+        page_host = urlparse(snapshot['url']).netloc
+        if self.hosts and page_host not in self.hosts:
+            raise IngestError(f"Snapshot from {page_host or 'an unknown page'}, not a monitored PrairieTest host")
+        new = self.handler(snapshot['slots'], snapshot['url'])
+        return {'accepted': len(snapshot['slots']), 'new': new}
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class _IngestHandler(BaseHTTPRequestHandler):
+    ingest = None
+
+    def _reply(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == INGEST_PATH:
+            self._reply(200, {'ok': True})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if urlparse(self.path).path != INGEST_PATH:
+            self._reply(404, {'error': 'not found'})
+            return
+        # A JSON content type cannot be sent cross-origin without a preflight we never answer,
+        # so ordinary web pages cannot post snapshots
+        if self.headers.get('Content-Type', '').split(';')[0].strip() != 'application/json':
+            INGESTED.inc(result='rejected')
+            self._reply(415, {'error': 'expected application/json'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            INGESTED.inc(result='rejected')
+            self._reply(413, {'error': 'snapshot too large'})
+            return
+
+        try:
+            self._reply(200, self.ingest.accept(self.rfile.read(length), self.headers.get('X-Ingest-Token')))
+        except PermissionError as e:
+            INGESTED.inc(result='rejected')
+            self._reply(403, {'error': str(e)})
+        except IngestError as e:
+            INGESTED.inc(result='rejected')
+            logger.warning("Rejected an extension snapshot: %s", e)
+            self._reply(400, {'error': str(e)})
+        except Exception as e:
+            logger.error("Error handling an extension snapshot: %s", e)
+            self._reply(500, {'error': 'internal error'})
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,143 @@
+"""
+Logging for the PrairieTest monitor.
+Log calls only put records on a queue; a background listener writes them to
+a rotating log file and the console, as text or JSON lines, tagged with the
+ID of the check that produced them.
+"""
+
+import copy
+import json
+import queue
+import uuid
+import logging
+import logging.handlers
+import contextvars
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(check_tag)s%(message)s'
+
+# ID of the check the current thread or task is running (None outside a check)
+CHECK_ID = contextvars.ContextVar('check_id', default=None)
+
+_TRACEBACKS = logging.Formatter()
+
+_listener = None
+_queue_handler = None
+# Listeners started by configure_logging and not stopped yet
+_running = set()
+
+
+def start_check() -> str:
+    """Give the check starting in this thread or task a new correlation ID."""
+    check_id = uuid.uuid4().hex[:8]
+    CHECK_ID.set(check_id)
+    return check_id
+
+
+class CheckIdFilter(logging.Filter):
+    """Stamps records with the current check ID; added on the calling thread, before the queue."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        check_id = CHECK_ID.get()
+        record.check_id = check_id
+        record.check_tag = f"[{check_id}] " if check_id else ''
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'check_id': getattr(record, 'check_id', None),
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments and tracebacks may change or go away after the call, so render them here
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _TRACEBACKS.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _file_handler(config: Dict[str, Any]) -> logging.Handler:
+    path = config['log_file']
+    rotation = config['log_rotation']
+    if rotation == 'size':
+        return logging.handlers.RotatingFileHandler(
+            path, maxBytes=int(config['log_max_mb'] * 1024 * 1024),
+            backupCount=config['log_backup_count'], encoding='utf-8', delay=True
+        )
+    if rotation == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=config['log_rotate_when'], backupCount=config['log_backup_count'],
+            encoding='utf-8', delay=True
+        )
+    return logging.FileHandler(path, encoding='utf-8', delay=True)
+
+
+def configure_logging(config: Dict[str, Any]) -> logging.handlers.QueueListener:
+    """Install queue-based logging on the root logger; call once from the entry point.
+
+    Replaces any handlers configured before, so it is safe to call again.
+    """
+    global _listener, _queue_handler
+    stop_logging()
+
+    text_formatter = logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if config['log_file']:
+        file_handler = _file_handler(config)
+        file_handler.setFormatter(JsonFormatter() if config['log_format'] == 'json' else text_formatter)
+        handlers.append(file_handler)
+    console = logging.StreamHandler()
+    console.setFormatter(text_formatter)
+    handlers.append(console)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(CheckIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, str(config['log_level']).upper(), logging.INFO))
+
+    _queue_handler = queue_handler
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+    _running.add(_listener)
+    return _listener
+
+
+def stop_logging(listener: Optional[logging.handlers.QueueListener] = None):
+    """Write out every queued record and close the log file."""
+    global _listener, _queue_handler
+    listener = listener or _listener
+    if listener is None or listener not in _running:
+        return
+    _running.discard(listener)
+    if listener is _listener:
+        # Later records go to logging's last-resort stderr handler instead of a queue nobody reads
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener, _queue_handler = None, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
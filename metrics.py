@@ -0,0 +1,318 @@
+"""
+Metrics for the PrairieTest monitor.
+Counters, gauges and histograms kept in-process, served in the Prometheus
+text format from a local /metrics endpoint and optionally dumped as JSON.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, List, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond parses up to multi-minute alert delays
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def header(self, sample_name: Optional[str] = None) -> List[str]:
+        sample_name = sample_name or self.name
+        return [f"# HELP {sample_name} {self.documentation}", f"# TYPE {sample_name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header(f"{self.name}_total") + [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {value:g}" for key, value in items
+        ]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {','.join(key) or '': value for key, value in self.values.items()}
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = value
+
+    def render(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {value:g}"
+                                for key, value in items]
+
+
+class Histogram(_Metric):
+    """Distribution of observed durations in cumulative buckets."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'counts': [0] * len(self.buckets), 'count': 0, 'sum': 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][index] += 1
+                    break
+            state['count'] += 1
+            state['sum'] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of a with block, even if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self.lock:
+            items = sorted((key, dict(state, counts=list(state['counts']))) for key, state in self.values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state['sum']:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                ','.join(key) or '': {
+                    'count': state['count'],
+                    'sum': state['sum'],
+                    'mean': state['sum'] / state['count'] if state['count'] else 0.0,
+                    'buckets': dict(zip((f"{bound:g}" for bound in self.buckets), state['counts'])),
+                }
+                for key, state in self.values.items()
+            }
+
+
+class MetricsRegistry:
+    """Every metric the process exports."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'timestamp': time.time(),
+            'metrics': {metric.name: {'type': metric.kind, 'labels': list(metric.labelnames),
+                                      'values': metric.snapshot()}
+                        for metric in self.metrics},
+        }
+
+    def dump_json(self, path: str):
+        """Write a snapshot atomically, so readers never see a partial file."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'prairie_stage_seconds',
+    'Time spent in each stage of a check (driver_setup, login, fetch, parse, match, reserve_resolve, reserve, '
+    'notify).',
+    ('stage',)
+))
+ALERT_LATENCY_SECONDS = REGISTRY.register(Histogram(
+    'prairie_alert_latency_seconds',
+    'From the check start or extension snapshot that found a new slot to its alert being delivered.'
+))
+DETECTION_WINDOW_SECONDS = REGISTRY.register(Histogram(
+    'prairie_detection_window_seconds',
+    'Time between consecutive successful checks of an account (how long a new slot can go unseen).'
+))
+POLL_INTERVAL_SECONDS = REGISTRY.register(Gauge(
+    'prairie_poll_interval_seconds',
+    'Delay until the next check of an account, as chosen by its polling policy.',
+    ('account',)
+))
+CHECKS = REGISTRY.register(Counter(
+    'prairie_checks',
+    'Schedule checks by result (changed, unchanged or failed).',
+    ('result',)
+))
+ERRORS = REGISTRY.register(Counter(
+    'prairie_errors',
+    'Errors by stage.',
+    ('stage',)
+))
+SLOTS_SEEN = REGISTRY.register(Counter(
+    'prairie_slots_seen',
+    'Matching slots that were new to a watch.'
+))
+NOTIFICATIONS = REGISTRY.register(Counter(
+    'prairie_notifications',
+    'Alert emails by result (sent or failed).',
+    ('result',)
+))
+RESERVATION_LATENCY_SECONDS = REGISTRY.register(Histogram(
+    'prairie_reservation_latency_seconds',
+    'From the check start or extension snapshot that found a new slot to its reservation being confirmed.'
+))
+RESERVATIONS = REGISTRY.register(Counter(
+    'prairie_reservations',
+    'Automatic reservation attempts by result (reserved, dry_run, failed, no_target or capped).',
+    ('result',)
+))
+RECOVERIES = REGISTRY.register(Counter(
+    'prairie_recoveries',
+    'Automatic recovery actions (driver_restart, browser_recycle, relogin, session_reset, circuit_open, '
+    'browser_fallback).',
+    ('action',)
+))
+LEASES = REGISTRY.register(Counter(
+    'prairie_leases',
+    'Account lease events of a sharded worker (claimed, taken_over, released or lost).',
+    ('event',)
+))
+INGESTED = REGISTRY.register(Counter(
+    'prairie_ingest_snapshots',
+    'Schedule snapshots from the browser extension by result (new, seen, duplicate or rejected).',
+    ('result',)
+))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = self.registry.render_prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(self.registry.snapshot(), indent=2), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """Serves /metrics (and /metrics.json) locally and periodically dumps a JSON snapshot."""
+
+    def __init__(self, port: int = 0, host: str = '127.0.0.1', json_file: Optional[str] = None,
+                 json_interval: float = 15, registry: MetricsRegistry = REGISTRY):
+        self.port = port
+        self.host = host
+        self.json_file = json_file
+        self.json_interval = json_interval
+        self.registry = registry
+        self.server = None
+        self.stopping = threading.Event()
+        self.dump_thread = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'MetricsExporter':
+        return cls(port=config['metrics_port'], host=config['metrics_host'],
+                   json_file=config['metrics_json_file'] or None)
+
+    def start(self):
+        if self.port:
+            try:
+                self.server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Could not serve metrics on %s:%s: %s", self.host, self.port, e)
+            else:
+                threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True).start()
+                logger.info("Serving metrics at http://%s:%s/metrics", self.host, self.port)
+
+        if self.json_file:
+            self.dump_thread = threading.Thread(target=self._dump_loop, name='metrics-json', daemon=True)
+            self.dump_thread.start()
+        return self
+
+    def _dump_loop(self):
+        while not self.stopping.wait(self.json_interval):
+            self._dump()
+
+    def _dump(self):
+        try:
+            self.registry.dump_json(self.json_file)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", self.json_file, e)
+
+    def stop(self):
+        self.stopping.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.json_file:
+            self._dump()
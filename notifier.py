@@ -0,0 +1,225 @@
+"""
+Background email notifications for the PrairieTest monitor.
+A single worker thread owns a persistent SMTP connection, coalesces alerts
+that arrive close together and retries failed deliveries, so the polling
+loop never waits on mail I/O.
+"""
+
+import time
+import queue
+import smtplib
+import logging
+import threading
+from datetime import datetime
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from typing import Optional, List, Dict, Any, Callable
+
+from slot_state import slot_key
+from metrics import STAGE_SECONDS, ALERT_LATENCY_SECONDS, ERRORS, NOTIFICATIONS
+
+logger = logging.getLogger(__name__)
+
+# Sentinel that tells the worker to flush and exit
+_STOP = object()
+
+# Shown under a slot the monitor booked automatically (slot['reserved'])
+RESERVED_NOTES = {
+    'yes': "<br><strong>Reserved for you automatically.</strong>",
+    'dry run': "<br><em>Would have been reserved automatically (dry run).</em>",
+}
+
+
+def build_message(slots: List[Dict[str, str]], sender: str, recipient: str, prairie_url: str) -> MIMEMultipart:
+    """Build the HTML alert email for a list of slots."""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = f"🎉 PrairieTest Slot Available! - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+
+    # Create email body
+    body = f"""
+    <html>
+    <body>
+        <h2>🎉 PrairieTest Exam Slot Available!</h2>
+        <p>Good news! The following exam slots are now available:</p>
+        <ul>
+    """
+
+    for slot in slots:
+        reserved_note = RESERVED_NOTES.get(slot.get('reserved'), '')
+        body += f"""
+            <li>
+                <strong>Date:</strong> {slot.get('date', 'N/A')}<br>
+                <strong>Time:</strong> {slot.get('time', 'N/A')}<br>
+                <strong>Location:</strong> {slot.get('location', 'N/A')}{reserved_note}
+            </li>
+        """
+
+    body += f"""
+        </ul>
+        <p><a href="{prairie_url}">Click here to book your slot now!</a></p>
+        <p><small>This notification was sent by your PrairieTest Slot Monitor at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</small></p>
+    </body>
+    </html>
+    """
+
+    msg.attach(MIMEText(body, 'html'))
+    return msg
+
+
+class NotificationDispatcher:
+    """Queue-fed email sender with a persistent, re-authenticating SMTP connection."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.smtp_server = config['smtp_server']
+        self.smtp_port = config['smtp_port']
+        self.use_starttls = config['smtp_starttls']
+        self.sender = config['notification_email']
+        self.password = config['email_password']
+        self.coalesce_window = config['notify_coalesce_seconds']
+        self.idle_timeout = config['smtp_idle_timeout']
+        self.max_retries = config['notify_max_retries']
+        self.queue = queue.Queue()
+        self.server = None
+        self.last_used = 0.0
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the worker thread if it is not already running."""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='notifier', daemon=True)
+                self.thread.start()
+
+    def submit(self, slots: List[Dict[str, str]], recipient: str, prairie_url: str,
+               detected_at: Optional[float] = None,
+               on_undelivered: Optional[Callable[[List[Dict[str, str]]], None]] = None):
+        """Queue an alert; returns immediately.
+
+        detected_at is the wall-clock start of the check that found the slots
+        (or when the extension's snapshot arrived), used to measure how long
+        the alert took to go out. on_undelivered is called with the slots if
+        every attempt to send them fails, e.g. so they are alerted again.
+        """
+        self.start()
+        self.queue.put((list(slots), recipient, prairie_url, detected_at, on_undelivered))
+
+    def stop(self, timeout: float = 30):
+        """Deliver anything still queued, then close the connection."""
+        if self.thread and self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._close_if_idle()
+                continue
+
+            stopping = item is _STOP
+            batch = [] if stopping else [item]
+
+            # Coalesce anything else that arrives within the window into the same emails
+            deadline = time.monotonic() + (0 if stopping else self.coalesce_window)
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    extra = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is _STOP:
+                    stopping = True
+                    deadline = time.monotonic()
+                else:
+                    batch.append(extra)
+
+            self._deliver_batch(batch)
+
+            if stopping:
+                self._disconnect()
+                return
+
+    def _deliver_batch(self, batch):
+        """Send one email per recipient containing every distinct slot queued for them."""
+        grouped = {}
+        detected = {}
+        undelivered = {}
+        for slots, recipient, prairie_url, detected_at, on_undelivered in batch:
+            merged = grouped.setdefault((recipient, prairie_url), {})
+            if on_undelivered is not None:
+                undelivered.setdefault((recipient, prairie_url), []).append((on_undelivered, slots))
+            for slot in slots:
+                merged.setdefault(slot_key(slot), slot)
+            # A coalesced email is as late as its oldest alert
+            if detected_at is not None:
+                earliest = detected.get((recipient, prairie_url))
+                detected[(recipient, prairie_url)] = detected_at if earliest is None else min(earliest, detected_at)
+
+        for (recipient, prairie_url), merged in grouped.items():
+            slots = list(merged.values())
+            msg = build_message(slots, self.sender, recipient, prairie_url)
+            with STAGE_SECONDS.time(stage='notify'):
+                sent = self._send_with_retry(msg, recipient)
+            if sent:
+                NOTIFICATIONS.inc(result='sent')
+                detected_at = detected.get((recipient, prairie_url))
+                if detected_at is not None:
+                    ALERT_LATENCY_SECONDS.observe(max(0.0, time.time() - detected_at))
+                logger.info("Notification sent to %s for %s available slots", recipient, len(slots))
+            else:
+                NOTIFICATIONS.inc(result='failed')
+                for on_undelivered, queued_slots in undelivered.get((recipient, prairie_url), []):
+                    try:
+                        on_undelivered(queued_slots)
+                    except Exception as e:
+                        logger.error("Error handling an undelivered notification: %s", e)
+
+    def _send_with_retry(self, msg: MIMEMultipart, recipient: str) -> bool:
+        text = msg.as_string()
+        for attempt in range(self.max_retries):
+            try:
+                self._connection().sendmail(self.sender, recipient, text)
+                self.last_used = time.monotonic()
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                logger.warning("Error sending notification (attempt %s/%s): %s", attempt + 1, self.max_retries, e)
+                ERRORS.inc(stage='notify')
+                self._disconnect()
+                if attempt + 1 < self.max_retries:
+                    time.sleep(min(2 ** attempt, 60))
+
+        logger.error("Giving up on notification to %s after %s attempts", recipient, self.max_retries)
+        return False
+
+    def _connection(self) -> smtplib.SMTP:
+        """Return the open SMTP connection, reconnecting if it went idle or dropped."""
+        if self.server is not None and time.monotonic() - self.last_used > self.idle_timeout:
+            self._disconnect()
+
+        if self.server is None:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+            if self.use_starttls:
+                server.starttls()
+            if self.password:
+                server.login(self.sender, self.password)
+            self.server = server
+            self.last_used = time.monotonic()
+            logger.debug("Connected to SMTP server %s:%s", self.smtp_server, self.smtp_port)
+
+        return self.server
+
+    def _close_if_idle(self):
+        if self.server is not None and time.monotonic() - self.last_used > self.idle_timeout:
+            self._disconnect()
+
+    def _disconnect(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
@@ -0,0 +1,103 @@
+"""
+Unchanged-page detection for the PrairieTest monitor.
+Keeps the HTTP validators, a digest of the slot-relevant content and the
+parsed slots of the last response per URL, so an unchanged schedule is
+neither parsed nor matched again.
+"""
+
+import re
+import hashlib
+import logging
+from typing import Optional, List, Dict, Mapping
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Parts of a page that change on every request without the schedule changing
+_VOLATILE = re.compile(
+    r'<script\b.*?</script\s*>|<style\b.*?</style\s*>|<noscript\b.*?</noscript\s*>|<!--.*?-->'
+    r'|<meta\b[^>]*>|<input\b[^>]*type=["\']?hidden[^>]*>',
+    re.IGNORECASE | re.DOTALL
+)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def page_digest(text: str) -> str:
+    """Digest of a page with scripts, styles, comments, meta tags and hidden inputs removed."""
+    relevant = _WHITESPACE.sub(' ', _VOLATILE.sub('', text))
+    return hashlib.blake2b(relevant.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class _Entry:
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.body = None
+        self.digest = None
+        self.slots = None
+
+
+class PageCache:
+    """Last response per URL with hit/miss counters.
+
+    not_modified counts 304 responses to conditional requests, unchanged
+    counts responses whose content digest matched (parse and match skipped)
+    and changed counts responses that had to be parsed.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.stats = {'not_modified': 0, 'unchanged': 0, 'changed': 0}
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for the last response from url."""
+        entry = self.entries.get(url)
+        headers = {}
+        if entry and entry.body is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def response_text(self, url: str, response: requests.Response) -> str:
+        """The body of a response, or the cached body when it was a 304 Not Modified."""
+        return self.body(url, response.status_code, response.headers, response.text)
+
+    def body(self, url: str, status_code: int, headers: Mapping[str, str], text: str) -> str:
+        """Record a response's validators and return its body (the cached one for a 304)."""
+        entry = self.entries.setdefault(url, _Entry())
+        if status_code == 304 and entry.body is not None:
+            self.stats['not_modified'] += 1
+            return entry.body
+
+        entry.etag = headers.get('ETag')
+        entry.last_modified = headers.get('Last-Modified')
+        entry.body = text
+        return entry.body
+
+    def cached_slots(self, url: str, text: str) -> Optional[List[Dict[str, str]]]:
+        """The slots parsed from url last time if its relevant content has not changed."""
+        entry = self.entries.setdefault(url, _Entry())
+        digest = page_digest(text)
+        if entry.digest == digest and entry.slots is not None:
+            self.stats['unchanged'] += 1
+            return entry.slots
+
+        self.stats['changed'] += 1
+        entry.digest = digest
+        entry.slots = None
+        return None
+
+    def store(self, url: str, slots: List[Dict[str, str]]):
+        """Remember the slots parsed from the content last passed to cached_slots."""
+        self.entries.setdefault(url, _Entry()).slots = slots
+
+    def hit_rate(self) -> float:
+        checked = self.stats['unchanged'] + self.stats['changed']
+        return self.stats['unchanged'] / checked if checked else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.stats['unchanged']} unchanged, {self.stats['changed']} changed, "
+                f"{self.stats['not_modified']} not modified, {self.hit_rate():.0%} hit rate")
@@ -0,0 +1,101 @@
+"""
+Page readiness detection for the PrairieTest monitor.
+Polls the browser for concrete conditions (a slot container in the DOM, a
+specific XHR having finished, or the network going quiet) instead of
+sleeping for a fixed time after each navigation.
+"""
+
+import time
+import logging
+from typing import Optional, List, Tuple
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# Counts in-flight XHR/fetch requests; installed before any page script runs
+NETWORK_TRACKER_JS = """
+(function () {
+    if (window.__prairieNet) return;
+    var net = window.__prairieNet = {inflight: 0, last: Date.now()};
+    function started() { net.inflight++; net.last = Date.now(); }
+    function finished() { net.inflight = Math.max(0, net.inflight - 1); net.last = Date.now(); }
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        started();
+        this.addEventListener('loadend', finished);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            started();
+            return fetch.apply(this, arguments).finally(finished);
+        };
+    }
+})();
+"""
+
+# One round trip per poll: returns the name of the satisfied condition, or null
+READY_CHECK_JS = """
+var selector = arguments[0], idleMs = arguments[1], xhrPattern = arguments[2];
+if (selector && document.querySelector(selector)) return 'selector';
+if (document.readyState !== 'complete') return null;
+var entries = performance.getEntriesByType('resource');
+if (xhrPattern) {
+    for (var i = 0; i < entries.length; i++) {
+        var entry = entries[i];
+        if ((entry.initiatorType === 'xmlhttprequest' || entry.initiatorType === 'fetch')
+                && entry.name.indexOf(xhrPattern) !== -1 && entry.responseEnd > 0) {
+            return 'xhr';
+        }
+    }
+    return null;
+}
+var net = window.__prairieNet;
+if (net) {
+    return net.inflight === 0 && Date.now() - net.last >= idleMs ? 'network-idle' : null;
+}
+// No tracker (CDP unavailable): fall back to the resource timing entries
+var lastEnd = 0;
+for (var j = 0; j < entries.length; j++) lastEnd = Math.max(lastEnd, entries[j].responseEnd);
+return performance.now() - lastEnd >= idleMs ? 'network-idle' : null;
+"""
+
+
+def install_network_tracker(driver) -> bool:
+    """Inject the XHR/fetch tracker into every document the driver loads (Chrome only)."""
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': NETWORK_TRACKER_JS})
+        return True
+    except (AttributeError, WebDriverException) as e:
+        logger.debug("Network tracker unavailable, using resource timing for idle detection: %s", e)
+        return False
+
+
+class PageReadiness:
+    """Waits for a loaded page to be usable, polling at a short interval."""
+
+    def __init__(self, poll_interval: float = 0.1, idle_seconds: float = 0.5):
+        self.poll_interval = poll_interval
+        self.idle_seconds = idle_seconds
+
+    def wait(self, driver, timeout: float, selectors: Optional[List[str]] = None,
+             xhr_pattern: Optional[str] = None) -> Tuple[Optional[str], float]:
+        """Wait until any selector matches, or the xhr_pattern request finished
+        (the network went idle when no pattern is given).
+
+        Returns the satisfied condition ('selector', 'xhr' or 'network-idle'),
+        or None on timeout, and the seconds actually waited.
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        selector = ', '.join(selectors) if selectors else None
+        started = time.monotonic()
+        try:
+            condition = WebDriverWait(driver, timeout, poll_frequency=self.poll_interval).until(
+                lambda d: d.execute_script(READY_CHECK_JS, selector, int(self.idle_seconds * 1000), xhr_pattern)
+            )
+        except TimeoutException:
+            condition = None
+        return condition, time.monotonic() - started
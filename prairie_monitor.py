@@ -4,85 +4,600 @@ PrairieTest Slot Monitor
 Monitors PrairieTest for available exam slots and sends email notifications.
 """
 
-import os
+import json
 import time
 import logging
-import smtplib
-from datetime import datetime, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Optional, List, Dict, Any
+import threading
+from datetime import datetime
+from functools import partial
+from typing import Optional, List, Dict, Any, Mapping, Tuple
+from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-import schedule
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from selenium.common.exceptions import TimeoutException
 
-# Load environment variables
-load_dotenv()
+from config import load_config
+from scheduler import PreciseScheduler, IntervalPolicy, parse_burst_windows
+from adaptive_polling import AdaptiveIntervalPolicy, SlotReleaseHistory
+from slot_state import SlotStateStore, slot_key
+from slot_archive import SlotArchive
+from reserver import AutoReserver
+from notifier import NotificationDispatcher
+from slot_parser import create_parser, probe_selectors, SLOT_SELECTORS, FIELD_SELECTORS
+from selector_cache import SelectorCache
+from slot_matcher import SlotMatcher, WatchRule
+from session_store import SessionStore
+from page_readiness import PageReadiness
+from browser_factory import ChromeFactory, USER_AGENT
+from api_endpoints import capture_json_endpoints, slots_from_json
+from page_cache import PageCache
+from metrics import (MetricsExporter, STAGE_SECONDS, DETECTION_WINDOW_SECONDS, POLL_INTERVAL_SECONDS, CHECKS, ERRORS,
+                     RECOVERIES, INGESTED)
+from health import CircuitBreaker, driver_rss
+from logging_setup import configure_logging, stop_logging, start_check
+from ingest import IngestServer
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('prairie_monitor.log'),
-        logging.StreamHandler()
-    ]
-)
+# Handlers are installed by the entry point (configure_logging), not on import
 logger = logging.getLogger(__name__)
 
+# Path fragments that indicate we were bounced to a login/SSO page
+LOGIN_PATH_MARKERS = ('login', 'signin', 'sso', 'saml', 'oauth', 'shibboleth', 'idp')
+
+
+class FetchStatusError(Exception):
+    """Raised when the schedule page or a JSON endpoint answers with an HTTP error status."""
+    
+    def __init__(self, status_code: int, url: str, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code} from {url}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
 class PrairieTestMonitor:
-    def __init__(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None, browser_pool=None,
+                 notifier: Optional[NotificationDispatcher] = None):
         self.config = self._load_config()
+        if config:
+            self.config.update(config)
+        self.browser_pool = browser_pool
         self.driver = None
+        self.browser_factory = ChromeFactory.for_config(self.config)
+        self.session = None
         self.is_logged_in = False
         self.last_check = None
+        self.scheduler = None
+        self.interval_policy = self._interval_policy()
+        self.slot_parser = create_parser(self.config['parser_backend'])
+        self.selector_cache = SelectorCache.for_path(self.config['selector_cache_file'])
+        self.learned_parser = None
+        self.learned_parser_key = None
+        self.readiness = PageReadiness(self.config['ready_poll_interval'], self.config['network_idle_seconds'])
+        # Seconds spent waiting on the browser during the current check, per stage
+        self.wait_times = {}
+        # Unchanged schedules are neither parsed nor matched again
+        self.page_cache = PageCache()
+        self.schedule_unchanged = False
+        self.last_available = None
+        # Wall-clock start of the current and of the last successful check
+        self.check_started = None
+        self.last_success_started = None
+        self.metrics_exporter = None
+        # Checks and extension snapshots take turns with the browser, session and slot state
+        self.check_lock = threading.RLock()
+        self.ingest_server = None
+        # Monotonic time of the last extension snapshot, and its slot keys
+        self.last_ingest = None
+        self.last_ingest_keys = None
+        self.matcher = SlotMatcher([WatchRule.from_criteria(self.config['watch_name'], self.config)])
+        self.slot_state = SlotStateStore.for_path(self.config['slot_state_db'])
+        self.reserver = AutoReserver(self.config, self.slot_state)
+        self.archive = SlotArchive.for_config(self.config)
+        self.notifier = notifier or NotificationDispatcher(self.config)
+        self.owns_notifier = notifier is None
+        self.session_store = SessionStore(
+            self.config['session_dir'],
+            f"{self.config['prairie_url']}|{self.config['school_email']}",
+            key=self.config['session_encryption_key']
+        )
+        self.session_restore_attempted = False
+        self.restored_session = None
+        self.saved_cookies = None
+        # Checks served by the current browser, so leaky instances can be recycled
+        self.driver_checks = 0
+        # Set after a connection error; the HTTP session is rebuilt before the next check
+        self.session_broken = False
+        # Slots on the last browser-rendered schedule, whether the current page came over plain HTTP,
+        # and whether plain HTTP turned out to miss slots the page fills in with script
+        self.rendered_slots = None
+        self.fetched_over_http = False
+        self.http_blind = False
+        self.breaker = CircuitBreaker(
+            self.config['school_email'] or self._instance(),
+            failure_threshold=self.config['circuit_failure_threshold'],
+            reset_timeout=self.config['circuit_reset_seconds']
+        )
         
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from environment variables."""
-        return {
-            'prairie_url': os.getenv('PRAIRIE_TEST_URL', 'https://us.prairietest.com/'),
-            'school_email': os.getenv('SCHOOL_EMAIL'),
-            'school_password': os.getenv('SCHOOL_PASSWORD'),
-            'smtp_server': os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
-            'smtp_port': int(os.getenv('SMTP_PORT', '587')),
-            'notification_email': os.getenv('NOTIFICATION_EMAIL'),
-            'email_password': os.getenv('EMAIL_PASSWORD'),
-            'check_interval': int(os.getenv('CHECK_INTERVAL_MINUTES', '5')),
-            'desired_date': os.getenv('DESIRED_DATE'),
-            'desired_time': os.getenv('DESIRED_TIME'),
-            'desired_location': os.getenv('DESIRED_LOCATION'),
-            'headless': os.getenv('HEADLESS_MODE', 'true').lower() == 'true',
-            'timeout': int(os.getenv('BROWSER_TIMEOUT', '30'))
-        }
+        return load_config()
+    
+    def _create_driver(self):
+        """Create a Chrome WebDriver on a persistent (and, by default, lean) profile."""
+        return self.browser_factory.create()
     
     def _setup_driver(self):
-        """Initialize Chrome WebDriver with appropriate options."""
-        chrome_options = Options()
+        """Initialize the WebDriver, borrowing one from the shared pool if configured."""
+        with STAGE_SECONDS.time(stage='driver_setup'):
+            if self.browser_pool:
+                self.driver = self.browser_pool.acquire()
+                # A pooled browser comes back without cookies; carry the login over from the saved session
+                if self.is_logged_in and self.restored_session is None:
+                    self.restored_session = self.session_store.load()
+            else:
+                self.driver = self._create_driver()
+        self.driver_checks = 0
+    
+    def _restart_driver(self, reason: str = "Browser is not responding"):
+        """Replace a browser that died (or is being recycled) with a new one on the same profile (and pool slot)."""
+        logger.warning("%s, restarting it", reason)
+        self.driver_checks = 0
+        dead_driver, self.driver = self.driver, None
+        if self.browser_pool:
+            self.driver = self.browser_pool.replace(dead_driver)
+        else:
+            try:
+                dead_driver.quit()
+            except Exception:
+                pass
+            self.driver = self._create_driver()
+        
+        # The old browser's login went with it; reuse the saved session if there is one
+        self.restored_session = self.session_store.load()
+        self.is_logged_in = self.restored_session is not None
+    
+    def _health_check(self):
+        """Repair what earlier checks left broken: stale connections, a dead or bloated browser."""
+        if self.session_broken and self.session:
+            # Keep the cookies, they hold the login
+            cookies = self._session_cookie_dicts()
+            self.session.close()
+            self._setup_http_session()
+            self._load_session_cookies(cookies)
+            RECOVERIES.inc(action='session_reset')
+            logger.info("Rebuilt the HTTP session after a connection error")
+        self.session_broken = False
         
-        if self.config['headless']:
-            chrome_options.add_argument('--headless')
+        if not self.driver:
+            return
+        if not self.browser_factory.is_alive(self.driver):
+            RECOVERIES.inc(action='driver_restart')
+            self._restart_driver()
+            return
         
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36')
+        reason = self._recycle_reason()
+        if reason:
+            # Saved first, so the new browser reuses the login instead of going through SSO
+            if self.is_logged_in:
+                self._save_browser_session()
+            RECOVERIES.inc(action='browser_recycle')
+            self._restart_driver(reason)
+    
+    def _recycle_reason(self) -> Optional[str]:
+        """Why the current browser should be replaced by a fresh one (None if it should not)."""
+        max_checks = self.config['browser_recycle_checks']
+        if max_checks and self.driver_checks >= max_checks:
+            return f"Browser has served {self.driver_checks} checks"
+        
+        max_rss_mb = self.config['browser_max_rss_mb']
+        if max_rss_mb:
+            rss = driver_rss(self.driver)
+            if rss is not None and rss > max_rss_mb * 1024 * 1024:
+                return f"Browser is using {rss / (1024 * 1024):.0f} MB"
+        return None
+    
+    def _setup_http_session(self):
+        """Create a pooled keep-alive HTTP session for steady-state polling."""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        })
+    
+    def _load_session_cookies(self, cookies: List[Dict[str, Any]]):
+        """Replace the HTTP session's cookies with Selenium-style cookie dicts."""
+        if not self.session:
+            self._setup_http_session()
+        
+        self.session.cookies.clear()
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/'),
+                secure=cookie.get('secure', False)
+            )
+    
+    def _session_cookie_dicts(self) -> List[Dict[str, Any]]:
+        """The HTTP session's cookies as Selenium-style cookie dicts."""
+        return [
+            {'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path, 'secure': c.secure}
+            for c in self.session.cookies
+        ]
+    
+    def _export_cookies(self):
+        """Copy the authenticated browser cookies into the HTTP session."""
+        self._load_session_cookies(self.driver.get_cookies())
+        logger.info("Exported %s browser cookies to HTTP session", len(self.session.cookies))
+    
+    def _save_browser_session(self):
+        """Persist the browser's cookies and local storage for the next start."""
+        try:
+            local_storage = self.driver.execute_script(
+                "var items = {}; for (var i = 0; i < localStorage.length; i++) {"
+                " var key = localStorage.key(i); items[key] = localStorage.getItem(key); } return items;"
+            )
+            cookies = self.driver.get_cookies()
+            self.session_store.save(cookies, local_storage)
+            self.saved_cookies = {(c['name'], c['value']) for c in cookies}
+        except Exception as e:
+            logger.warning("Could not save session: %s", e)
+    
+    def _save_http_session(self):
+        """Persist the HTTP session's cookies if the server has changed them."""
+        current = {(c.name, c.value) for c in self.session.cookies}
+        if current == self.saved_cookies:
+            return
+        
+        saved = self.session_store.load() or {}
+        try:
+            self.session_store.save(self._session_cookie_dicts(), saved.get('local_storage'))
+            self.saved_cookies = current
+        except OSError as e:
+            logger.warning("Could not save session: %s", e)
+    
+    def _restore_session(self) -> bool:
+        """Reuse a saved login if one cheap request shows the server still accepts it."""
+        saved = self.session_store.load()
+        if not saved or not saved.get('cookies'):
+            return False
+        
+        self._load_session_cookies(saved['cookies'])
+        try:
+            response = self.session.get(self._schedule_url(), timeout=self.config['http_timeout'])
+        except requests.RequestException as e:
+            logger.warning("Could not validate saved session: %s", e)
+            return False
+        
+        if self._session_expired(response) or not response.ok:
+            logger.info("Saved session has expired, logging in again")
+            self.session_store.clear()
+            self.session.cookies.clear()
+            return False
+        
+        logger.info("Reusing saved PrairieTest session, skipping SSO login")
+        self.is_logged_in = True
+        self.restored_session = saved
+        self.saved_cookies = {(c['name'], c['value']) for c in saved['cookies']}
+        return True
+    
+    def _import_session_into_driver(self, saved: Dict[str, Any]):
+        """Load saved cookies and local storage into a fresh browser."""
+        self.driver.get(self.config['prairie_url'])
+        for cookie in saved.get('cookies', []):
+            try:
+                self.driver.add_cookie({key: value for key, value in cookie.items()
+                                        if key in ('name', 'value', 'domain', 'path', 'secure', 'expiry')})
+            except Exception as e:
+                logger.debug("Skipping cookie %s: %s", cookie.get('name'), e)
+        for key, value in (saved.get('local_storage') or {}).items():
+            self.driver.execute_script("localStorage.setItem(arguments[0], arguments[1]);", key, value)
+    
+    def _close_driver(self):
+        """Quit the browser, keeping the login state held by the HTTP session."""
+        if self.driver:
+            try:
+                if self.browser_pool:
+                    self.browser_pool.release(self.driver)
+                else:
+                    self.driver.quit()
+            except Exception as e:
+                logger.warning("Error closing browser: %s", e)
+            self.driver = None
+    
+    def _schedule_url(self) -> str:
+        """Return the URL of the PrairieTest scheduling page."""
+        return f"{self.config['prairie_url'].rstrip('/')}/schedule"
+    
+    def _session_expired(self, response: requests.Response) -> bool:
+        """Detect responses that mean the HTTP session has been logged out."""
+        return self._is_login_response(response.status_code, response.url, response.text)
+    
+    def _is_login_response(self, status_code: int, url: str, text: str) -> bool:
+        """Whether a response (status, final URL and body) is a login page rather than the schedule."""
+        if status_code in (401, 403):
+            return True
         
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        self.driver.implicitly_wait(10)
+        # Redirected away from PrairieTest (e.g. to the school SSO provider)
+        final_url = urlparse(url)
+        prairie_host = urlparse(self.config['prairie_url']).netloc
+        if final_url.netloc and final_url.netloc != prairie_host:
+            return True
         
+        path = final_url.path.lower()
+        if any(marker in path for marker in LOGIN_PATH_MARKERS):
+            return True
+        
+        # A password field on the schedule page means we got a login form instead
+        return "type=\"password\"" in text or "type='password'" in text
+    
+    def _response_body(self, url: str, status_code: int, final_url: str, headers: Mapping[str, str],
+                       text: str) -> Optional[str]:
+        """Check a polled response and return its body, the cached one for a 304 (None if the login is gone).
+        
+        Shared by the requests and aiohttp checks, so both treat logins and error statuses alike.
+        """
+        if self._is_login_response(status_code, final_url, text):
+            self._drop_session(f"Session expired (HTTP {status_code} at {final_url})")
+            return None
+        if status_code >= 400:
+            retry_after = headers.get('Retry-After', '')
+            raise FetchStatusError(status_code, url, float(retry_after) if retry_after.isdigit() else None)
+        return self.page_cache.body(url, status_code, headers, text)
+    
+    def _http_fetch_schedule(self) -> Optional[str]:
+        """Fetch the schedule page over the pooled HTTP session (None if the login is gone)."""
+        url = self._schedule_url()
+        with STAGE_SECONDS.time(stage='fetch'):
+            response = self.session.get(url, timeout=self.config['http_timeout'],
+                                        headers=self.page_cache.request_headers(url))
+        return self._response_body(url, response.status_code, response.url, response.headers, response.text)
+    
+    def _browser_fetch_schedule(self) -> Optional[str]:
+        """Fetch the schedule page through Selenium, logging in first if needed (and again if logged out)."""
+        if not self.driver:
+            self._setup_driver()
+        
+        try:
+            # A second pass only happens when the site sent the first one to the login page
+            for _ in range(2):
+                if self.is_logged_in and self.restored_session:
+                    self._import_session_into_driver(self.restored_session)
+                    self.restored_session = None
+                
+                if not self.is_logged_in:
+                    with STAGE_SECONDS.time(stage='login'):
+                        logged_in = self._login()
+                    if not logged_in:
+                        ERRORS.inc(stage='login')
+                        return None
+                    self._save_browser_session()
+                
+                self.driver_checks += 1
+                with STAGE_SECONDS.time(stage='fetch'):
+                    self.driver.get(self._schedule_url())
+                    
+                    # Wait until slots are rendered, the schedule XHR finished, or the network went quiet
+                    condition, waited = self.readiness.wait(
+                        self.driver,
+                        self.config['timeout'],
+                        selectors=SLOT_SELECTORS,
+                        xhr_pattern=self.config['ready_xhr_pattern']
+                    )
+                self.wait_times['schedule'] = waited
+                
+                page_source = self.driver.page_source
+                current_url = self.driver.current_url
+                if self._is_login_response(200, current_url, page_source):
+                    self._drop_session(f"Redirected to the login page ({current_url})")
+                    continue
+                
+                if condition is None:
+                    logger.warning("Schedule page not ready after %.1fs, parsing what has loaded", waited)
+                else:
+                    logger.debug("Schedule page ready after %.2fs (%s)", waited, condition)
+                
+                if self.config['fetch_mode'] == 'api':
+                    self._capture_api_endpoints()
+                
+                if self._polls_over_http():
+                    self._export_cookies()
+                return page_source
+            
+            logger.error("Still sent to the login page after logging in again")
+            ERRORS.inc(stage='login')
+            return None
+        finally:
+            # In HTTP and API mode the browser is only needed to log in; a pooled browser goes back
+            # after every check, or accounts polling through it would keep it from everyone else
+            if self._polls_over_http():
+                self._close_driver()
+            elif self.browser_pool and self.driver:
+                if self.is_logged_in:
+                    self._save_browser_session()
+                self._close_driver()
+    
+    def _fetch_schedule_page(self) -> Optional[str]:
+        """Return the schedule page HTML, preferring plain HTTP over the browser."""
+        if not self.is_logged_in and not self.session_restore_attempted:
+            self.session_restore_attempted = True
+            self._restore_session()
+        
+        self.fetched_over_http = False
+        if self._polls_over_http() and self.is_logged_in and self.session:
+            page_source = self._http_fetch_schedule()
+            if page_source is not None:
+                self._save_http_session()
+                self.fetched_over_http = True
+                return page_source
+        
+        return self._browser_fetch_schedule()
+    
+    def _polls_over_http(self) -> bool:
+        """Whether checks go over the HTTP session, using the browser only to log in."""
+        return self.config['fetch_mode'] in ('http', 'api') and not self.http_blind
+    
+    def _poll_urls(self) -> Tuple[List[str], bool]:
+        """The URLs a check polls and whether they answer in JSON: the captured endpoints, else the schedule page."""
+        endpoints = self.selector_cache.known(self._instance(), 'api_endpoints') \
+            if self.config['fetch_mode'] == 'api' else None
+        if endpoints:
+            return list(endpoints), True
+        return [self._schedule_url()], False
+    
+    def _slots_from_bodies(self, urls: List[str], bodies: List[str],
+                           from_json: bool = False) -> Optional[List[Dict[str, str]]]:
+        """Every slot in the polled bodies, parsing only those that changed since the last check.
+        
+        Sets schedule_unchanged. None when an endpoint stopped returning JSON: it
+        is forgotten, so the page is parsed until it is captured again.
+        """
+        slots_found = {}
+        unchanged = True
+        for url, body in zip(urls, bodies):
+            url_slots = self.page_cache.cached_slots(url, body)
+            if url_slots is None:
+                unchanged = False
+                try:
+                    with STAGE_SECONDS.time(stage='parse'):
+                        url_slots = slots_from_json(json.loads(body)) if from_json else self._parse_slots(body)
+                except ValueError:
+                    if not from_json:
+                        raise
+                    self.selector_cache.forget(self._instance(), 'api_endpoints')
+                    return None
+                self.page_cache.store(url, url_slots)
+            
+            for slot in url_slots:
+                slots_found.setdefault(slot_key(slot), slot)
+        
+        self.schedule_unchanged = unchanged
+        return list(slots_found.values())
+    
+    def _confirm_page_slots(self, slots_found: List[Dict[str, str]],
+                            over_http: bool) -> Optional[List[Dict[str, str]]]:
+        """Slots parsed from the schedule page, checked against what the browser last rendered (None on failure)."""
+        if not over_http:
+            self.rendered_slots = len(slots_found)
+        elif not slots_found and self.rendered_slots:
+            # An unrendered page shows no slots; make sure the schedule really is empty
+            return self._confirm_empty_http_page()
+        return slots_found
+    
+    def _confirm_empty_http_page(self) -> Optional[List[Dict[str, str]]]:
+        """Re-read a schedule that came back empty over HTTP, though the browser last saw slots, in the browser.
+        
+        If the rendered page has slots the site fills them in with script, so
+        plain HTTP polling cannot see them: checks use the browser from then on.
+        """
+        page_source = self._browser_fetch_schedule()
+        if page_source is None:
+            return None
+        with STAGE_SECONDS.time(stage='parse'):
+            slots_found = self._parse_slots(page_source)
+        self.rendered_slots = len(slots_found)
+        self.schedule_unchanged = False
+        if slots_found:
+            logger.warning("The schedule page has no slots over plain HTTP but %s in the browser, "
+                           "checking through the browser from now on (FETCH_MODE=browser skips this)",
+                           len(slots_found))
+            RECOVERIES.inc(action='browser_fallback')
+            self.http_blind = True
+        return slots_found
+    
+    def _drop_session(self, reason: str):
+        """Forget a login the server no longer accepts so the next fetch goes through the browser."""
+        logger.warning("%s, logging in again through the browser", reason)
+        RECOVERIES.inc(action='relogin')
+        self.is_logged_in = False
+        self.restored_session = None
+        self.session_store.clear()
+    
+    def _capture_api_endpoints(self):
+        """Remember the JSON endpoints the schedule page just loaded its data from."""
+        instance = self._instance()
+        endpoints = capture_json_endpoints(self.driver, instance)
+        if endpoints:
+            self.selector_cache.record(instance, 'api_endpoints', endpoints)
+        elif not self.selector_cache.known(instance, 'api_endpoints'):
+            logger.warning("No JSON schedule endpoints seen, parsing the rendered page instead")
+    
+    def _fetch_api_slots(self) -> Optional[List[Dict[str, str]]]:
+        """Poll the captured JSON endpoints directly (None when there are none or the login is gone)."""
+        if not self.is_logged_in and not self.session_restore_attempted:
+            self.session_restore_attempted = True
+            self._restore_session()
+        
+        urls, from_json = self._poll_urls()
+        if not from_json or not (self.is_logged_in and self.session):
+            return None
+        
+        bodies = []
+        for url in urls:
+            with STAGE_SECONDS.time(stage='fetch'):
+                response = self.session.get(url, timeout=self.config['http_timeout'],
+                                            headers={'Accept': 'application/json',
+                                                     **self.page_cache.request_headers(url)})
+            body = self._response_body(url, response.status_code, response.url, response.headers, response.text)
+            if body is None:
+                return None
+            bodies.append(body)
+        
+        self._save_http_session()
+        return self._slots_from_bodies(urls, bodies, from_json=True)
+        
+    def _wait_for_css(self, selector: str, timeout: float):
+        """Wait up to timeout seconds for an element matching a CSS selector."""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=self.config['ready_poll_interval']).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+            )
+        except TimeoutException:
+            return None
+    
+    def _find_first(self, group: str, candidates: List[str], timeout: float, forget_stale: bool = True):
+        """Find the element for a selector group, trying the selector that worked last time first.
+        
+        With forget_stale=False a miss keeps the cached selector, for groups where nothing matching
+        says more about the page (a failed login) than about the selector.
+        """
+        started = time.monotonic()
+        try:
+            return self._probe_selectors(group, candidates, timeout, forget_stale)
+        finally:
+            self.wait_times[group] = self.wait_times.get(group, 0) + time.monotonic() - started
+    
+    def _probe_selectors(self, group: str, candidates: List[str], timeout: float, forget_stale: bool = True):
+        # The cached selector and the fallback share one deadline, so a stale entry never doubles the wait
+        deadline = time.monotonic() + timeout
+        instance = self._instance()
+        known = self.selector_cache.known(instance, group)
+        if known in candidates:
+            element = self._wait_for_css(known, timeout)
+            if element is not None:
+                return element
+            if forget_stale:
+                self.selector_cache.forget(instance, group)
+        
+        # One wait for any candidate, then pick the first matching one in fallback order; whatever the
+        # cached wait used up comes out of this one, and a zero timeout still checks once
+        if self._wait_for_css(', '.join(candidates), max(0.0, deadline - time.monotonic())) is None:
+            return None
+        for selector in candidates:
+            element = self.driver.execute_script("return document.querySelector(arguments[0]);", selector)
+            if element is not None:
+                self.selector_cache.record(instance, group, selector)
+                return element
+        return None
+    
     def _login(self) -> bool:
         """Handle SSO login to PrairieTest."""
         try:
@@ -90,8 +605,6 @@ class PrairieTestMonitor:
             self.driver.get(self.config['prairie_url'])
             
             # Wait for login form or SSO redirect
-            wait = WebDriverWait(self.driver, self.config['timeout'])
-            
             # Look for login elements (these selectors may need adjustment based on actual site)
             login_selectors = [
                 "input[type='email']",
@@ -100,14 +613,7 @@ class PrairieTestMonitor:
                 "input[placeholder*='email']"
             ]
             
-            email_input = None
-            for selector in login_selectors:
-                try:
-                    email_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                    break
-                except TimeoutException:
-                    continue
-            
+            email_input = self._find_first('login.email', login_selectors, self.config['timeout'])
             if not email_input:
                 logger.error("Could not find email input field")
                 return False
@@ -123,14 +629,7 @@ class PrairieTestMonitor:
                 "input[id*='password']"
             ]
             
-            password_input = None
-            for selector in password_selectors:
-                try:
-                    password_input = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    break
-                except NoSuchElementException:
-                    continue
-            
+            password_input = self._find_first('login.password', password_selectors, self.config['timeout'])
             if not password_input:
                 logger.error("Could not find password input field")
                 return False
@@ -142,30 +641,19 @@ class PrairieTestMonitor:
             login_button_selectors = [
                 "button[type='submit']",
                 "input[type='submit']",
-                "button:contains('Login')",
-                "button:contains('Sign In')",
                 ".login-button",
                 "#login-button"
             ]
             
-            login_button = None
-            for selector in login_selectors:
-                try:
-                    login_button = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    break
-                except NoSuchElementException:
-                    continue
-            
+            login_button = self._find_first('login.submit', login_button_selectors, 0)
             if login_button:
                 login_button.click()
             else:
                 # Try pressing Enter on password field
+                from selenium.webdriver.common.keys import Keys
                 password_input.send_keys(Keys.RETURN)
             
             # Wait for successful login (look for dashboard or user info)
-            time.sleep(3)
-            
-            # Check if login was successful
             success_indicators = [
                 ".dashboard",
                 ".user-info",
@@ -174,208 +662,322 @@ class PrairieTestMonitor:
                 ".welcome"
             ]
             
-            for indicator in success_indicators:
-                try:
-                    self.driver.find_element(By.CSS_SELECTOR, indicator)
-                    logger.info("Successfully logged in to PrairieTest")
-                    self.is_logged_in = True
-                    return True
-                except NoSuchElementException:
-                    continue
+            if self._find_first('login.success', success_indicators, self.config['timeout'], forget_stale=False):
+                logger.info("Successfully logged in to PrairieTest")
+                self.is_logged_in = True
+                return True
             
             logger.error("Login failed - could not verify successful login")
             return False
             
         except Exception as e:
-            logger.error(f"Login error: {str(e)}")
+            logger.error("Login error: %s", e)
             return False
     
-    def _check_available_slots(self) -> List[Dict[str, str]]:
-        """Check for available exam slots."""
-        try:
-            if not self.is_logged_in:
-                if not self._login():
-                    return []
-            
-            # Navigate to scheduling page (adjust URL as needed)
-            schedule_url = f"{self.config['prairie_url']}schedule" if not self.config['prairie_url'].endswith('/') else f"{self.config['prairie_url']}schedule"
-            self.driver.get(schedule_url)
-            
-            # Wait for page to load
-            time.sleep(3)
-            
-            # Parse the page for available slots
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            
-            available_slots = []
-            
-            # Look for slot elements (these selectors will need adjustment)
-            slot_selectors = [
-                ".slot",
-                ".time-slot",
-                ".available-slot",
-                "[data-slot]",
-                ".calendar-slot"
-            ]
-            
-            for selector in slot_selectors:
-                slots = soup.select(selector)
-                for slot in slots:
-                    slot_info = self._extract_slot_info(slot)
-                    if slot_info and self._is_desired_slot(slot_info):
-                        available_slots.append(slot_info)
-            
-            logger.info(f"Found {len(available_slots)} available slots")
-            return available_slots
-            
-        except Exception as e:
-            logger.error(f"Error checking slots: {str(e)}")
-            return []
+    def _check_available_slots(self) -> Optional[List[Dict[str, str]]]:
+        """Check for available exam slots matching the configured criteria (None if the check failed)."""
+        slots = self._fetch_slots()
+        if slots is None:
+            return None
+        
+        if self.schedule_unchanged and self.last_available is not None:
+            return self.last_available
+        
+        with STAGE_SECONDS.time(stage='match'):
+            available_slots = [slot for slot in slots if self._is_desired_slot(slot)]
+        logger.info("Found %s available slots", len(available_slots))
+        self.last_available = available_slots
+        return available_slots
     
-    def _extract_slot_info(self, slot_element) -> Optional[Dict[str, str]]:
-        """Extract slot information from HTML element."""
+    def _fetch_slots(self) -> Optional[List[Dict[str, str]]]:
+        """Fetch the schedule page and return every slot on it, unfiltered (None if the fetch failed)."""
+        if not self._begin_fetch():
+            return None
+        
         try:
-            # Extract date, time, and location from slot element
-            # This will need customization based on actual HTML structure
-            date_elem = slot_element.select_one('.date, .slot-date, [data-date]')
-            time_elem = slot_element.select_one('.time, .slot-time, [data-time]')
-            location_elem = slot_element.select_one('.location, .slot-location, [data-location]')
+            self._health_check()
+            use_api = self.config['fetch_mode'] == 'api'
+            slots_found = self._fetch_api_slots() if use_api else None
+            
+            if slots_found is None:
+                page_source = self._fetch_schedule_page()
+                if self.wait_times:
+                    details = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.wait_times.items())
+                    logger.info("Waited %.2fs on the browser (%s)", sum(self.wait_times.values()), details)
+                if page_source is None:
+                    self._record_failed_check()
+                    return None
+                
+                # A browser pass captures the endpoints; reading them keeps slot text the same as later checks
+                if use_api:
+                    slots_found = self._fetch_api_slots()
+                if slots_found is None:
+                    slots_found = self._confirm_page_slots(
+                        self._slots_from_bodies([self._schedule_url()], [page_source]), self.fetched_over_http
+                    )
+                    if slots_found is None:
+                        self._record_failed_check()
+                        return None
+            
+            self._record_successful_check(slots_found)
+            return slots_found
             
-            if date_elem and time_elem:
-                return {
-                    'date': date_elem.get_text(strip=True),
-                    'time': time_elem.get_text(strip=True),
-                    'location': location_elem.get_text(strip=True) if location_elem else 'Unknown'
-                }
         except Exception as e:
-            logger.error(f"Error extracting slot info: {str(e)}")
+            self._record_fetch_error(e)
+            return None
+    
+    def _begin_fetch(self) -> bool:
+        """Reset the per-check state and stamp check_started; False while the circuit breaker holds checks back."""
+        self.wait_times = {}
+        self.schedule_unchanged = False
+        if not self.breaker.allow():
+            logger.info("Skipping check after repeated failures, next try in %.0fs", self.breaker.remaining())
+            return False
         
-        return None
+        self.check_started = time.time()
+        return True
+    
+    def _record_successful_check(self, slots_found: List[Dict[str, str]]):
+        """Count a completed check and the window in which a new slot could have gone unseen."""
+        CHECKS.inc(result='unchanged' if self.schedule_unchanged else 'changed')
+        if self.last_success_started is not None:
+            DETECTION_WINDOW_SECONDS.observe(self.check_started - self.last_success_started)
+        self.last_success_started = self.check_started
+        self.breaker.record_success()
+        self.interval_policy.record_success(slots_found)
+        if self.archive is not None:
+            try:
+                self.archive.record(slots_found, self.check_started, unchanged=self.schedule_unchanged)
+            except OSError as e:
+                logger.warning("Could not archive the schedule: %s", e)
+    
+    def _record_failed_check(self):
+        CHECKS.inc(result='failed')
+        ERRORS.inc(stage='fetch')
+        self.breaker.record_failure()
+        self.interval_policy.record_error()
+    
+    def _record_fetch_error(self, error: Exception):
+        """Count a check that raised, whatever raised it, backing off as an error status asks."""
+        logger.error("Error checking slots: %s", str(error) or type(error).__name__)
+        CHECKS.inc(result='failed')
+        ERRORS.inc(stage='fetch')
+        self.breaker.record_failure()
+        if isinstance(error, requests.ConnectionError):
+            self.session_broken = True
+        if isinstance(error, FetchStatusError):
+            self.interval_policy.record_error(error.status_code, error.retry_after)
+        else:
+            self.interval_policy.record_error()
+    
+    def _instance(self) -> str:
+        """Key for per-instance learned state (the PrairieTest host)."""
+        return urlparse(self.config['prairie_url']).netloc
+    
+    def _parse_slots(self, page_source: str) -> List[Dict[str, str]]:
+        """Parse with the selectors learned for this instance, re-probing when they stop matching."""
+        instance = self._instance()
+        learned = self.selector_cache.known(instance, 'slot_parser')
+        
+        if learned:
+            if self.learned_parser is None or self.learned_parser_key != learned:
+                self.learned_parser = create_parser(
+                    self.config['parser_backend'],
+                    slot_selectors=learned['slots'],
+                    field_selectors={field: learned.get(field) or selectors
+                                     for field, selectors in FIELD_SELECTORS.items()},
+                    guard_selectors=SLOT_SELECTORS
+                )
+                self.learned_parser_key = learned
+            slots_found = self.learned_parser.parse(page_source)
+            if not self.learned_parser.stale:
+                return slots_found
+            self.selector_cache.forget(instance, 'slot_parser')
+        
+        # Full probe: every fallback selector
+        slots_found = self.slot_parser.parse(page_source)
+        if slots_found:
+            self.selector_cache.record(instance, 'slot_parser', probe_selectors(page_source))
+        return slots_found
     
     def _is_desired_slot(self, slot_info: Dict[str, str]) -> bool:
-        """Check if slot matches desired criteria."""
-        if not self.config['desired_date'] and not self.config['desired_time']:
-            return True  # Accept any slot if no specific criteria
-        
-        # Check date
-        if self.config['desired_date']:
-            slot_date = slot_info.get('date', '')
-            if self.config['desired_date'] not in slot_date:
-                return False
+        """Check if slot matches the configured criteria."""
+        return bool(self.matcher.match(slot_info))
+    
+    def _reserve_slots(self, new_slots: List[Dict[str, str]], watch: Optional[str] = None,
+                       detected_at: Optional[float] = None) -> List[Dict[str, str]]:
+        """Book new matching slots when auto-reserve is on; returns the slots with booked ones marked for the alert."""
+        booked = {slot_key(slot) for slot in self.reserver.reserve(self, watch or self.config['watch_name'], new_slots,
+                                                                   detected_at=detected_at)}
+        if not booked:
+            return new_slots
         
-        # Check time
-        if self.config['desired_time']:
-            slot_time = slot_info.get('time', '')
-            if self.config['desired_time'] not in slot_time:
-                return False
+        note = 'dry run' if self.reserver.dry_run else 'yes'
+        # Copies: the same slot dicts are cached for later checks and other watches
+        return [dict(slot, reserved=note) if slot_key(slot) in booked else slot for slot in new_slots]
+    
+    def _send_notification(self, available_slots: List[Dict[str, str]], recipient: Optional[str] = None,
+                           detected_at: Optional[float] = None, watch: Optional[str] = None):
+        """Queue an email notification about available slots on the background dispatcher.
         
-        # Check location
-        if self.config['desired_location']:
-            slot_location = slot_info.get('location', '')
-            if self.config['desired_location'].lower() not in slot_location.lower():
+        detected_at is when the slots were seen; by default the start of the last check.
+        If the email cannot be delivered the slots are forgotten, so the next check alerts again.
+        """
+        recipient = recipient or self.config['notification_email']
+        self.notifier.submit(available_slots, recipient, self.config['prairie_url'],
+                             detected_at=detected_at or self.check_started,
+                             on_undelivered=partial(self.slot_state.forget, watch or self.config['watch_name']))
+        logger.info("Notification queued for %s available slots", len(available_slots))
+    
+    def check_and_notify(self) -> bool:
+        """Main method to check for slots and send notifications; returns whether the check completed."""
+        start_check()
+        with self.check_lock:
+            try:
+                logger.info("Checking for available PrairieTest slots...")
+                return self._finish_check(self._check_available_slots())
+            except Exception as e:
+                logger.error("Error in check_and_notify: %s", e)
                 return False
+    
+    def _finish_check(self, available_slots: Optional[List[Dict[str, str]]]) -> bool:
+        """Diff and alert on what a check found, with check_lock held; returns whether the check completed."""
+        if available_slots is None:
+            logger.warning("Check failed, keeping the previous slot snapshot")
+            return False
+        
+        if self.schedule_unchanged:
+            logger.info("Schedule unchanged, nothing to match (%s)", self.page_cache.summary())
+            self.last_check = datetime.now()
+            return True
+        
+        new_slots, gone_slots = self.slot_state.diff(self.config['watch_name'], available_slots,
+                                                     observed_at=self.check_started)
+        
+        if new_slots:
+            logger.info("Found %s new available slots!", len(new_slots))
+            self._send_notification(self._reserve_slots(new_slots))
+        elif available_slots:
+            logger.info("No new slots (%s already notified)", len(available_slots))
+        else:
+            logger.info("No available slots found")
+        
+        if gone_slots:
+            logger.info("%s previously available slots are gone", len(gone_slots))
         
+        self.last_check = datetime.now()
         return True
     
-    def _send_notification(self, available_slots: List[Dict[str, str]]):
-        """Send email notification about available slots."""
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = self.config['notification_email']
-            msg['To'] = self.config['notification_email']
-            msg['Subject'] = f"🎉 PrairieTest Slot Available! - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            
-            # Create email body
-            body = f"""
-            <html>
-            <body>
-                <h2>🎉 PrairieTest Exam Slot Available!</h2>
-                <p>Good news! The following exam slots are now available:</p>
-                <ul>
-            """
-            
-            for slot in available_slots:
-                body += f"""
-                    <li>
-                        <strong>Date:</strong> {slot.get('date', 'N/A')}<br>
-                        <strong>Time:</strong> {slot.get('time', 'N/A')}<br>
-                        <strong>Location:</strong> {slot.get('location', 'N/A')}
-                    </li>
-                """
-            
-            body += f"""
-                </ul>
-                <p><a href="{self.config['prairie_url']}">Click here to book your slot now!</a></p>
-                <p><small>This notification was sent by your PrairieTest Slot Monitor at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</small></p>
-            </body>
-            </html>
-            """
-            
-            msg.attach(MIMEText(body, 'html'))
-            
-            # Send email
-            server = smtplib.SMTP(self.config['smtp_server'], self.config['smtp_port'])
-            server.starttls()
-            server.login(self.config['notification_email'], self.config['email_password'])
-            text = msg.as_string()
-            server.sendmail(self.config['notification_email'], self.config['notification_email'], text)
-            server.quit()
-            
-            logger.info(f"Notification sent for {len(available_slots)} available slots")
-            
-        except Exception as e:
-            logger.error(f"Error sending notification: {str(e)}")
+    def ingest_slots(self, slots: List[Dict[str, str]], page_url: str = '') -> int:
+        """Match and alert on a schedule snapshot from the browser extension; returns how many slots were new."""
+        received = time.time()
+        with self.check_lock:
+            if not self._fresh_snapshot(slots):
+                return 0
+            
+            with STAGE_SECONDS.time(stage='match'):
+                matching = [slot for slot in slots if self._is_desired_slot(slot)]
+            # Only added: the extension may see part of the schedule, so slots are retired by checks alone
+            new_slots = self.slot_state.add(self.config['watch_name'], matching)
+            if not new_slots:
+                INGESTED.inc(result='seen')
+                return 0
+            
+            INGESTED.inc(result='new')
+            logger.info("Extension found %s new available slots on %s", len(new_slots), page_url or 'PrairieTest')
+            # Reservation forms are read from a fetched page, so check the schedule before booking
+            checked = self._check_available_slots() if self.reserver.enabled else None
+            self._send_notification(self._reserve_slots(new_slots, detected_at=received), detected_at=received)
+            if self.reserver.enabled:
+                # The rest of that check, or the next one would find the page unchanged and skip its diff
+                self._finish_check(checked)
+            return len(new_slots)
     
-    def check_and_notify(self):
-        """Main method to check for slots and send notifications."""
-        try:
-            logger.info("Checking for available PrairieTest slots...")
-            
-            if not self.driver:
-                self._setup_driver()
-            
-            available_slots = self._check_available_slots()
-            
-            if available_slots:
-                logger.info(f"Found {len(available_slots)} available slots!")
-                self._send_notification(available_slots)
-            else:
-                logger.info("No available slots found")
-            
-            self.last_check = datetime.now()
-            
-        except Exception as e:
-            logger.error(f"Error in check_and_notify: {str(e)}")
+    def _fresh_snapshot(self, slots: List[Dict[str, str]]) -> bool:
+        """Note that the extension is reporting; False when the snapshot repeats the last one."""
+        self.last_ingest = time.monotonic()
+        keys = frozenset(slot_key(slot) for slot in slots)
+        if keys == self.last_ingest_keys:
+            INGESTED.inc(result='duplicate')
+            return False
+        self.last_ingest_keys = keys
+        return True
+    
+    def ingest_live(self) -> bool:
+        """Whether the extension has sent a snapshot recently enough to stand in for frequent checks."""
+        return self.last_ingest is not None and \
+            time.monotonic() - self.last_ingest < self.config['ingest_fresh_seconds']
+    
+    def _next_delay(self) -> float:
+        """Delay until the next check, stretched to INGEST_POLL_INTERVAL_SECONDS while the extension reports."""
+        delay = self.interval_policy.next_delay()
+        if self.ingest_live():
+            delay = max(delay, self.config['ingest_poll_interval'])
+        POLL_INTERVAL_SECONDS.set(delay, account=self.config['school_email'] or '')
+        return delay
+    
+    def _interval_policy(self) -> IntervalPolicy:
+        """Build the check cadence from the interval, jitter and burst window settings."""
+        burst_windows = parse_burst_windows(self.config['burst_windows'])
+        
+        if self.config['adaptive_polling']:
+            return AdaptiveIntervalPolicy(
+                self.config['check_interval_seconds'],
+                history=SlotReleaseHistory.for_path(self.config['slot_history_file']),
+                min_interval=self.config['min_check_interval'],
+                max_interval=self.config['max_check_interval'],
+                jitter=self.config['check_jitter'],
+                burst_windows=burst_windows,
+                max_backoff=self.config['max_backoff']
+            )
+        
+        return IntervalPolicy(
+            self.config['check_interval_seconds'],
+            jitter=self.config['check_jitter'],
+            burst_windows=burst_windows
+        )
     
     def start_monitoring(self):
         """Start the monitoring service."""
-        logger.info("Starting PrairieTest slot monitor...")
-        logger.info(f"Checking every {self.config['check_interval']} minutes")
-        logger.info(f"Looking for slots on {self.config['desired_date']} at {self.config['desired_time']}")
+        policy = self.interval_policy
         
-        # Schedule the monitoring job
-        schedule.every(self.config['check_interval']).minutes.do(self.check_and_notify)
+        logger.info("Starting PrairieTest slot monitor...")
+        logger.info("Checking every %g seconds", policy.interval)
+        if policy.burst_windows:
+            logger.info("Burst windows: %s", ', '.join(map(repr, policy.burst_windows)))
+        logger.info("Looking for slots on %s at %s", self.config['desired_date'], self.config['desired_time'])
         
-        # Run initial check
-        self.check_and_notify()
+        self.metrics_exporter = MetricsExporter.from_config(self.config).start()
+        self.ingest_server = IngestServer.from_config(self.config, self.ingest_slots).start()
         
-        # Keep the script running
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute for scheduled tasks
+        # Run an initial check, then each next one as soon as it is due
+        self.scheduler = PreciseScheduler()
+        self.scheduler.add_job('check_and_notify', self.check_and_notify, self._next_delay)
+        self.scheduler.run_forever()
     
     def cleanup(self):
         """Clean up resources."""
-        if self.driver:
-            self.driver.quit()
+        if self.scheduler:
+            self.scheduler.stop()
+        if self.owns_notifier:
+            self.notifier.stop()
+        self._close_driver()
+        if self.session:
+            self.session.close()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        if self.ingest_server:
+            self.ingest_server.stop()
         logger.info("Monitor stopped")
 
 if __name__ == "__main__":
     monitor = PrairieTestMonitor()
+    configure_logging(monitor.config)
     
     try:
         monitor.start_monitoring()
     except KeyboardInterrupt:
         logger.info("Received interrupt signal, stopping monitor...")
     finally:
-        monitor.cleanup() 
\ No newline at end of file
+        monitor.cleanup()
+        stop_logging()
\ No newline at end of file
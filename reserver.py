@@ -0,0 +1,288 @@
+"""
+Automatic reservations for the PrairieTest monitor.
+Books a newly matched slot in the same check that found it. The reservation
+link or form is read from the page (or JSON) the check already fetched, so
+booking is one request on the authenticated HTTP session or, in browser
+mode, one fetch() inside the logged-in page: no navigation and no clicking.
+"""
+
+import re
+import json
+import time
+import logging
+from typing import Optional, List, Dict, Any
+from urllib.parse import urljoin, urlparse
+
+from lxml import etree
+
+from slot_parser import LxmlSlotParser, SLOT_SELECTORS, FIELD_SELECTORS
+from slot_state import slot_key
+from api_endpoints import json_slot
+from metrics import STAGE_SECONDS, RESERVATION_LATENCY_SECONDS, RESERVATIONS, ERRORS
+
+logger = logging.getLogger(__name__)
+
+# JSON keys that hold a slot's reservation URL, and its ID for RESERVE_URL_TEMPLATE
+RESERVE_URL_KEYS = ('reserve_url', 'reserveUrl', 'reservation_url', 'reservationUrl',
+                    'book_url', 'bookUrl', 'booking_url', 'bookingUrl')
+SLOT_ID_KEYS = ('id', 'slot_id', 'slotId', 'uuid')
+
+# Buttons and forms inside a slot element that book it; plain links are not followed,
+# since a GET to a slot's page is not a booking
+RESERVE_HINT = re.compile(r'reserv|book|sign.?up|register', re.IGNORECASE)
+
+# Input types that are not sent with a form unless clicked or checked
+_UNSENT_INPUTS = {'submit', 'button', 'image', 'reset', 'file'}
+
+# Runs inside the logged-in page, so the browser's own cookies and origin are used
+_BROWSER_FETCH = """
+var url = arguments[0], done = arguments[arguments.length - 1];
+var options = {method: arguments[1], credentials: 'same-origin', redirect: 'follow'};
+if (arguments[2]) { options.body = new URLSearchParams(arguments[2]); }
+fetch(url, options)
+    .then(function (r) { return r.text().then(function (t) { done([r.status, r.url, r.redirected, t]); }); })
+    .catch(function (e) { done([0, url, false, String(e)]); });
+"""
+
+
+class ReserveTarget:
+    """The request that books one slot."""
+
+    def __init__(self, url: str, method: str = 'POST', data: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.method = method.upper()
+        self.data = data or {}
+
+    def __repr__(self):
+        return f"{self.method} {self.url}"
+
+
+def _form_target(form, base_url: str) -> ReserveTarget:
+    data = {}
+    for field in form.iter('input', 'select', 'textarea'):
+        name = field.get('name')
+        input_type = (field.get('type') or 'text').lower()
+        if not name or input_type in _UNSENT_INPUTS:
+            continue
+        if input_type in ('checkbox', 'radio') and field.get('checked') is None:
+            continue
+        data[name] = field.get('value', '')
+    return ReserveTarget(urljoin(base_url, form.get('action') or ''), form.get('method') or 'GET', data)
+
+
+def target_from_element(slot_element, base_url: str) -> Optional[ReserveTarget]:
+    """The reservation request of a slot element (lxml), from its first reserve form or button."""
+    for element in slot_element.iter():
+        if not isinstance(element.tag, str):
+            continue
+        if element.get('data-reserve-url'):
+            return ReserveTarget(urljoin(base_url, element.get('data-reserve-url')),
+                                 element.get('data-reserve-method') or 'POST')
+
+        hint = f"{element.get('class', '')} {element.get('id', '')} {element.text or ''}"
+        if element.tag == 'form' and (RESERVE_HINT.search(element.get('action') or '') or RESERVE_HINT.search(hint)):
+            return _form_target(element, base_url)
+        if element.get('data-url') and RESERVE_HINT.search(hint):
+            return ReserveTarget(urljoin(base_url, element.get('data-url')), element.get('data-method') or 'POST')
+    return None
+
+
+def targets_from_html(html: str, base_url: str, slot_selectors: Optional[List[str]] = None,
+                      field_selectors: Optional[Dict[str, List[str]]] = None) -> Dict[str, ReserveTarget]:
+    """Reservation requests by slot key for every slot on a schedule page that has one."""
+    if not html or not html.strip():
+        return {}
+    document = etree.fromstring(html, etree.HTMLParser())
+    if document is None:
+        return {}
+
+    parser = LxmlSlotParser(slot_selectors, field_selectors)
+    targets = {}
+    for element in parser.slot_xpath(document):
+        slot = parser.extract_slot_info(element)
+        if slot is None:
+            continue
+        target = target_from_element(element, base_url)
+        if target is not None:
+            targets.setdefault(slot_key(slot), target)
+    return targets
+
+
+def targets_from_json(data: Any, base_url: str, url_template: Optional[str] = None) -> Dict[str, ReserveTarget]:
+    """Reservation requests by slot key for every slot in a JSON document with a reserve URL (or an ID)."""
+    targets = {}
+    pending = [data]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, dict):
+            slot = json_slot(node)
+            if slot is None:
+                pending.extend(node.values())
+                continue
+            url = next((node[key] for key in RESERVE_URL_KEYS if isinstance(node.get(key), str)), None)
+            if url is None and url_template:
+                slot_id = next((node[key] for key in SLOT_ID_KEYS if node.get(key) not in (None, '')), None)
+                if slot_id is not None:
+                    url = url_template.format(id=slot_id)
+            if url:
+                targets.setdefault(slot_key(slot), ReserveTarget(urljoin(base_url, url)))
+    return targets
+
+
+def describe(slot: Dict[str, str]) -> str:
+    return f"{slot.get('date')} {slot.get('time')} at {slot.get('location')}"
+
+
+class AutoReserver:
+    """Books a watch's new matching slots on its monitor's login, up to a per-watch cap.
+
+    Reservation targets are resolved once per fetched page (or JSON
+    response) and shared by every watch checked against it.
+    """
+
+    def __init__(self, config: Dict[str, Any], slot_state):
+        self.enabled = config['auto_reserve']
+        self.dry_run = config['auto_reserve_dry_run']
+        self.max_per_watch = config['auto_reserve_max_per_watch']
+        self.url_template = config['auto_reserve_url_template'] or None
+        # A booking counts when its request is redirected to a confirmation path,
+        # or (only if a pattern is configured) when its own response body matches
+        self.confirm_path = re.compile(config['auto_reserve_confirm_path'], re.IGNORECASE)
+        pattern = config['auto_reserve_confirm_pattern']
+        self.confirm = re.compile(pattern, re.IGNORECASE) if pattern else None
+        self.timeout = config['http_timeout']
+        self.slot_state = slot_state
+        # url -> (body they were resolved from, targets); hidden form tokens change without the digest
+        self.resolved = {}
+
+    def reserve(self, monitor, watch: str, slots: List[Dict[str, str]],
+                detected_at: Optional[float] = None) -> List[Dict[str, str]]:
+        """Book slots for a watch in order until its cap is reached; returns the slots booked (or that would be).
+
+        detected_at is when the slots were seen, for the latency metric; by
+        default the start of the monitor's last check.
+        """
+        if not self.enabled or not slots:
+            return []
+        detected_at = detected_at or monitor.check_started
+
+        remaining = self.max_per_watch - self.slot_state.reservation_count(watch)
+        if remaining <= 0:
+            RESERVATIONS.inc(result='capped')
+            logger.info("[%s] Already holds %s reservation(s), not booking more", watch, self.max_per_watch)
+            return []
+
+        targets = self.targets(monitor)
+        booked = []
+        for slot in slots:
+            if len(booked) >= remaining:
+                break
+            target = targets.get(slot_key(slot))
+            if target is None:
+                RESERVATIONS.inc(result='no_target')
+                logger.warning("[%s] No reservation link found for %s", watch, describe(slot))
+                continue
+
+            if self.dry_run:
+                RESERVATIONS.inc(result='dry_run')
+                logger.info("[%s] Dry run: would reserve %s with %r", watch, describe(slot), target)
+                booked.append(slot)
+                continue
+
+            started = time.perf_counter()
+            if self._book(monitor, target):
+                RESERVATIONS.inc(result='reserved')
+                self.slot_state.record_reservation(watch, slot)
+                detected = time.time() - detected_at if detected_at else None
+                if detected is not None:
+                    RESERVATION_LATENCY_SECONDS.observe(detected)
+                logger.info("[%s] Reserved %s in %.0f ms (%.2fs after it was seen)", watch, describe(slot),
+                            (time.perf_counter() - started) * 1000, detected or 0.0)
+                booked.append(slot)
+            else:
+                RESERVATIONS.inc(result='failed')
+                ERRORS.inc(stage='reserve')
+        return booked
+
+    def targets(self, monitor) -> Dict[str, ReserveTarget]:
+        """Reservation targets from the bodies the monitor's last check fetched."""
+        instance = monitor._instance()
+        endpoints = monitor.selector_cache.known(instance, 'api_endpoints') \
+            if monitor.config['fetch_mode'] == 'api' else None
+        learned = monitor.selector_cache.known(instance, 'slot_parser') or {}
+
+        targets = {}
+        for url in [monitor._schedule_url()] + list(endpoints or []):
+            entry = monitor.page_cache.entries.get(url)
+            if entry is None or entry.body is None:
+                continue
+            cached = self.resolved.get(url)
+            if cached is None or cached[0] is not entry.body:
+                with STAGE_SECONDS.time(stage='reserve_resolve'):
+                    cached = (entry.body, self._resolve(url, entry.body, endpoints, learned))
+                self.resolved[url] = cached
+            for key, target in cached[1].items():
+                targets.setdefault(key, target)
+        return targets
+
+    def _resolve(self, url: str, body: str, endpoints, learned: Dict[str, List[str]]) -> Dict[str, ReserveTarget]:
+        if endpoints and url in endpoints:
+            try:
+                return targets_from_json(json.loads(body), url, self.url_template)
+            except ValueError:
+                return {}
+        return targets_from_html(
+            body, url,
+            slot_selectors=learned.get('slots') or SLOT_SELECTORS,
+            field_selectors={field: learned.get(field) or selectors for field, selectors in FIELD_SELECTORS.items()}
+        )
+
+    def _book(self, monitor, target: ReserveTarget) -> bool:
+        """Send the reservation request and check its own response confirms it."""
+        try:
+            with STAGE_SECONDS.time(stage='reserve'):
+                if monitor.driver is not None and not monitor._polls_over_http():
+                    # fetch() cannot stop at a redirect and still read it, so it reports where the redirect led
+                    status, final_url, redirected, text = monitor.driver.execute_async_script(
+                        _BROWSER_FETCH, target.url, target.method, target.data or None
+                    )
+                    redirect_to = final_url if redirected else None
+                    if redirected:
+                        status, text = 303, ''
+                elif monitor.session is not None:
+                    response = monitor.session.request(
+                        target.method, target.url, timeout=self.timeout,
+                        data=target.data if target.method != 'GET' else None,
+                        params=target.data if target.method == 'GET' else None,
+                        headers={'Referer': monitor._schedule_url()}, allow_redirects=False
+                    )
+                    status, text = response.status_code, response.text
+                    redirect_to = urljoin(target.url, response.headers['Location']) \
+                        if response.is_redirect else None
+                    final_url = redirect_to or target.url
+                else:
+                    logger.error("No logged-in browser or HTTP session to reserve with")
+                    return False
+        except Exception as e:
+            logger.error("Error reserving with %r: %s", target, e)
+            return False
+
+        if status == 403:
+            # A full slot, a closed window or a rejected CSRF token, not a logout: keep the session
+            logger.error("Reservation refused: HTTP 403 at %s", target.url)
+            return False
+        if monitor._is_login_response(status, final_url, text):
+            monitor._drop_session(f"Logged out while reserving (HTTP {status} at {final_url})")
+            return False
+        if not 200 <= status < 400:
+            logger.error("Reservation refused: HTTP %s at %s", status, target.url)
+            return False
+        if redirect_to is not None and self.confirm_path.search(urlparse(redirect_to).path):
+            return True
+        if redirect_to is None and self.confirm is not None and self.confirm.search(text):
+            return True
+        logger.error("No confirmation after reserving with %r (HTTP %s%s)", target, status,
+                     f", redirected to {redirect_to}" if redirect_to else '')
+        return False
@@ -0,0 +1,182 @@
+"""
+Precise check scheduler for the PrairieTest monitor.
+Heap-based, second-resolution scheduling with jitter, burst windows and
+no overlapping runs of the same job.
+"""
+
+import heapq
+import random
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BurstWindow:
+    """A daily time range during which checks run at a tighter cadence."""
+
+    def __init__(self, start: str, end: str, interval: float):
+        self.start = datetime.strptime(start, '%H:%M').time()
+        self.end = datetime.strptime(end, '%H:%M').time()
+        self.interval = interval
+
+    def contains(self, moment: datetime) -> bool:
+        """Check if a moment falls inside the window (windows may wrap midnight)."""
+        current = moment.time()
+        if self.start <= self.end:
+            return self.start <= current < self.end
+        return current >= self.start or current < self.end
+
+    def seconds_until_start(self, moment: datetime) -> float:
+        """Seconds from a moment until the window next opens."""
+        start = datetime.combine(moment.date(), self.start)
+        if start <= moment:
+            start += timedelta(days=1)
+        return (start - moment).total_seconds()
+
+    def __repr__(self):
+        return f"{self.start:%H:%M}-{self.end:%H:%M}@{self.interval:g}s"
+
+
+def parse_burst_windows(spec: Optional[str], strict: bool = False) -> List[BurstWindow]:
+    """Parse a spec like "20:55-21:15@10,07:58-08:05@15" into burst windows.
+
+    Invalid windows are logged and skipped, or raise ValueError when strict.
+    """
+    windows = []
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            span, interval = part.split('@')
+            start, end = span.split('-')
+            windows.append(BurstWindow(start.strip(), end.strip(), float(interval)))
+        except ValueError:
+            if strict:
+                raise ValueError(f"Invalid burst window: {part}") from None
+            logger.error("Ignoring invalid burst window: %s", part)
+    return windows
+
+
+class IntervalPolicy:
+    """Decides how long to wait before the next check."""
+
+    def __init__(self, interval: float, jitter: float = 0, burst_windows: Optional[List[BurstWindow]] = None):
+        self.interval = interval
+        self.jitter = jitter
+        self.burst_windows = burst_windows or []
+        self.current_interval = interval
+
+    def base_interval(self, moment: datetime) -> float:
+        """The interval in force at a moment, before jitter."""
+        for window in self.burst_windows:
+            if window.contains(moment):
+                return min(window.interval, self.interval)
+        return self.interval
+
+    def next_delay(self, moment: Optional[datetime] = None) -> float:
+        """Seconds until the next check, never sleeping past the start of a burst window."""
+        moment = moment or datetime.now()
+        self.current_interval = self.base_interval(moment)
+        return self._finish_delay(self.current_interval, moment)
+
+    def _finish_delay(self, delay: float, moment: datetime, allow_burst_wakeup: bool = True) -> float:
+        """Apply jitter and, unless told otherwise, wake up for the next burst window."""
+        if self.jitter:
+            delay += random.uniform(-self.jitter, self.jitter)
+
+        if allow_burst_wakeup:
+            for window in self.burst_windows:
+                if not window.contains(moment):
+                    delay = min(delay, window.seconds_until_start(moment))
+        return max(delay, 0.1)
+
+    def record_success(self, slots: List[Dict[str, str]]):
+        """Hook for policies that learn from each successful check."""
+
+    def record_error(self, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        """Hook for policies that react to failed checks."""
+
+
+class _Job:
+    def __init__(self, name: str, func: Callable[[], None], next_delay: Callable[[], float]):
+        self.name = name
+        self.func = func
+        self.next_delay = next_delay
+
+
+class PreciseScheduler:
+    """Runs jobs at second resolution from a heap of monotonic due times.
+
+    A job is only rescheduled once its current run has finished, so a slow
+    check delays its own next run instead of overlapping with it. When an
+    executor is given, jobs run on it and the scheduler thread only dispatches.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self._heap = []
+        self._counter = 0
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def add_job(self, name: str, func: Callable[[], None], next_delay: Callable[[], float],
+                run_immediately: bool = True):
+        """Schedule a job whose delay between runs comes from next_delay()."""
+        job = _Job(name, func, next_delay)
+        self._push(job, 0 if run_immediately else next_delay())
+        return job
+
+    def _push(self, job: _Job, delay: float):
+        with self._condition:
+            self._counter += 1
+            heapq.heappush(self._heap, (time.monotonic() + delay, self._counter, job))
+            self._condition.notify()
+
+    def _run_job(self, job: _Job, due: float):
+        started = time.monotonic()
+        lateness = started - due
+        if lateness > 1:
+            logger.warning("Job %s started %.1fs late", job.name, lateness)
+
+        try:
+            job.func()
+        except Exception as e:
+            logger.error("Error in scheduled job %s: %s", job.name, e)
+        finally:
+            elapsed = time.monotonic() - started
+            delay = job.next_delay()
+            logger.debug("Job %s took %.2fs, next run in %.1fs", job.name, elapsed, delay)
+            if not self._stopped:
+                self._push(job, delay)
+
+    def run_forever(self):
+        """Dispatch jobs as they become due until stop() is called."""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._heap:
+                        timeout = self._heap[0][0] - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        self._condition.wait(timeout)
+                    else:
+                        self._condition.wait()
+                if self._stopped:
+                    return
+                due, _, job = heapq.heappop(self._heap)
+
+            if self.executor:
+                self.executor.submit(self._run_job, job, due)
+            else:
+                self._run_job(job, due)
+
+    def stop(self):
+        """Stop dispatching; jobs already running are allowed to finish."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
@@ -0,0 +1,82 @@
+"""
+Selector probe cache for the PrairieTest monitor.
+Remembers which of the fallback selectors actually matched on a PrairieTest
+instance so later runs can try those first instead of probing every one.
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Union
+
+logger = logging.getLogger(__name__)
+
+# One selector, a list of them (api_endpoints) or the parser's per-field selectors (slot_parser)
+Selectors = Union[str, List[str], Dict[str, Any]]
+
+
+class SelectorCache:
+    """Known-good selectors per instance and selector group, persisted as JSON."""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self._load()
+
+    @classmethod
+    def for_path(cls, path: str) -> 'SelectorCache':
+        """Share one cache per file between all monitors in the process."""
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read selector cache %s: %s", self.path, e)
+
+    def _save(self):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write selector cache %s: %s", self.path, e)
+
+    def known(self, instance: str, group: str) -> Optional[Selectors]:
+        """The selector (or selectors) that last matched for a group, if any."""
+        with self.lock:
+            return self.entries.get(instance, {}).get(group)
+
+    def record(self, instance: str, group: str, selectors: Selectors):
+        """Remember what matched; logs when it replaces a different known-good value."""
+        with self.lock:
+            groups = self.entries.setdefault(instance, {})
+            previous = groups.get(group)
+            if previous == selectors:
+                return
+            if previous is not None:
+                logger.warning("Learned %s on %s went stale: %r replaced by %r",
+                               group, instance, previous, selectors)
+            else:
+                logger.info("Learned %s on %s: %r", group, instance, selectors)
+            groups[group] = selectors
+            self._save()
+
+    def forget(self, instance: str, group: str):
+        """Drop a known-good value that stopped matching."""
+        with self.lock:
+            if self.entries.get(instance, {}).pop(group, None) is not None:
+                logger.warning("Learned %s on %s went stale, probing again", group, instance)
+                self._save()
@@ -0,0 +1,74 @@
+"""
+Persisted login sessions for the PrairieTest monitor.
+Stores the authenticated cookies and local storage of an account on disk so a
+restart can reuse them instead of going through SSO again.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import logging
+from typing import Optional, List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = ValueError
+
+
+class SessionStore:
+    """One account's session state in a permission-restricted (optionally encrypted) file."""
+
+    def __init__(self, directory: str, account: str, key: Optional[str] = None):
+        account_hash = hashlib.sha256(account.encode('utf-8')).hexdigest()[:16]
+        self.directory = directory
+        self.path = os.path.join(directory, f"{account_hash}.json")
+        self.fernet = None
+
+        if key:
+            if Fernet is None:
+                logger.warning("SESSION_ENCRYPTION_KEY is set but the cryptography package is not installed; "
+                               "session files are stored unencrypted (owner read/write only)")
+            else:
+                self.fernet = Fernet(key.encode('utf-8'))
+
+    def save(self, cookies: List[Dict[str, Any]], local_storage: Optional[Dict[str, str]] = None):
+        """Write the session, readable and writable by the owner only."""
+        payload = json.dumps({'cookies': cookies, 'local_storage': local_storage or {}}).encode('utf-8')
+        if self.fernet:
+            payload = self.fernet.encrypt(payload)
+
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        # mkstemp creates the file 0600 with a unique name, so concurrent saves cannot collide
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Read the saved session, or None if there is no usable one."""
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path, 'rb') as f:
+                payload = f.read()
+            if self.fernet:
+                payload = self.fernet.decrypt(payload)
+            return json.loads(payload.decode('utf-8'))
+        except (OSError, ValueError, InvalidToken) as e:
+            logger.warning("Ignoring unreadable saved session %s: %s", self.path, e)
+            return None
+
+    def clear(self):
+        """Forget the saved session."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
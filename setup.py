@@ -35,7 +35,6 @@ def check_dependencies():
         import requests
         import beautifulsoup4
         import selenium
-        import schedule
         import dotenv
         print("✅ All dependencies are available!")
     except ImportError as e:
@@ -0,0 +1,360 @@
+"""
+Sharded deployment for the PrairieTest monitor.
+The coordinator publishes the watches of a watches file to a shared lease
+store. Any number of workers, on one machine or several, lease accounts from
+it, renew their leases with heartbeats and take over the accounts of workers
+that stop. One lease covers every watch of an account, so each schedule is
+still fetched by one worker at a time, and requests for an account are
+spaced out across all workers.
+"""
+
+import os
+import json
+import math
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Callable
+
+from watch_supervisor import Watch, WatchSupervisor
+from metrics import LEASES
+
+logger = logging.getLogger(__name__)
+
+
+def account_id(account_key) -> str:
+    """Lease name of an account key: its PrairieTest URL and login."""
+    return '|'.join(part or '' for part in account_key)
+
+
+def _watches(definitions: str) -> List[Watch]:
+    return [Watch.from_definition(definition, index) for index, definition in enumerate(json.loads(definitions))]
+
+
+class LeaseStore:
+    """Account leases, worker heartbeats and per-account request spacing in one SQLite file.
+
+    Every node opens the same file. Writes run in IMMEDIATE transactions, so
+    claims and request reservations are atomic across processes. A lease
+    whose worker has not renewed it within ttl seconds can be claimed by
+    any other worker.
+    """
+
+    def __init__(self, path: str, ttl: float = 30):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # Autocommit; transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA busy_timeout=30000')
+        with self._transaction():
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS leases (
+                    account TEXT PRIMARY KEY,
+                    watches TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    worker TEXT,
+                    expires_at REAL NOT NULL DEFAULT 0
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker TEXT PRIMARY KEY,
+                    capacity INTEGER NOT NULL,
+                    heartbeat REAL NOT NULL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS request_spacing (
+                    account TEXT PRIMARY KEY,
+                    next_allowed REAL NOT NULL
+                )
+            ''')
+
+    @contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
+    def publish(self, watches: List[Watch]) -> Dict[str, int]:
+        """Make the store hold exactly these watches, grouped into one lease per account."""
+        grouped = {}
+        for watch in watches:
+            grouped.setdefault(account_id(watch.account_key), []).append(watch.definition())
+        published = {account: json.dumps(definitions, sort_keys=True) for account, definitions in grouped.items()}
+
+        counts = {'added': 0, 'updated': 0, 'removed': 0}
+        with self._transaction():
+            current = dict(self.conn.execute('SELECT account, watches FROM leases').fetchall())
+            for account, definitions in published.items():
+                if account not in current:
+                    self.conn.execute('INSERT INTO leases (account, watches) VALUES (?, ?)', (account, definitions))
+                    counts['added'] += 1
+                elif current[account] != definitions:
+                    # Holders see the new version on their next heartbeat and reload the watches
+                    self.conn.execute('UPDATE leases SET watches = ?, version = version + 1 WHERE account = ?',
+                                      (definitions, account))
+                    counts['updated'] += 1
+            for account in set(current) - set(published):
+                self.conn.execute('DELETE FROM leases WHERE account = ?', (account,))
+                self.conn.execute('DELETE FROM request_spacing WHERE account = ?', (account,))
+                counts['removed'] += 1
+        return counts
+
+    def heartbeat(self, worker: str, capacity: int):
+        with self._transaction():
+            self.conn.execute('INSERT OR REPLACE INTO workers (worker, capacity, heartbeat) VALUES (?, ?, ?)',
+                              (worker, capacity, time.time()))
+
+    def fair_share(self, worker: str, capacity: int) -> int:
+        """How many accounts this worker should hold: an even split between live workers, up to its capacity."""
+        with self.lock:
+            total = self.conn.execute('SELECT COUNT(*) FROM leases').fetchone()[0]
+            live = self.conn.execute('SELECT COUNT(*) FROM workers WHERE heartbeat > ? OR worker = ?',
+                                     (time.time() - self.ttl, worker)).fetchone()[0]
+        return min(capacity, math.ceil(total / max(live, 1)))
+
+    def renew(self, worker: str) -> Dict[str, int]:
+        """Extend every lease the worker still holds; returns them with their watch versions."""
+        with self._transaction():
+            self.conn.execute('UPDATE leases SET expires_at = ? WHERE worker = ? AND expires_at >= ?',
+                              (time.time() + self.ttl, worker, time.time()))
+            rows = self.conn.execute('SELECT account, version FROM leases WHERE worker = ? AND expires_at >= ?',
+                                     (worker, time.time())).fetchall()
+        return dict(rows)
+
+    def claim(self, worker: str, limit: int) -> List[Dict[str, Any]]:
+        """Lease up to limit unheld or expired accounts: [{'account', 'version', 'watches'}, ...]."""
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._transaction():
+            rows = self.conn.execute(
+                'SELECT account, version, watches, worker FROM leases WHERE worker IS NULL OR expires_at < ? '
+                'ORDER BY expires_at LIMIT ?', (now, limit)
+            ).fetchall()
+            for account, _, _, previous in rows:
+                self.conn.execute('UPDATE leases SET worker = ?, expires_at = ? WHERE account = ?',
+                                  (worker, now + self.ttl, account))
+                if previous and previous != worker:
+                    LEASES.inc(event='taken_over')
+                    logger.info("Took over %s from %s", account, previous)
+        LEASES.inc(len(rows), event='claimed')
+        return [{'account': account, 'version': version, 'watches': _watches(definitions)}
+                for account, version, definitions, _ in rows]
+
+    def release(self, worker: str, accounts: List[str]):
+        """Give up leases so other workers can claim them at once."""
+        with self._transaction():
+            self.conn.executemany('UPDATE leases SET worker = NULL, expires_at = 0 WHERE account = ? AND worker = ?',
+                                  [(account, worker) for account in accounts])
+        LEASES.inc(len(accounts), event='released')
+
+    def retire(self, worker: str):
+        """Forget a worker that stopped, so it no longer counts toward the fair share."""
+        with self._transaction():
+            self.conn.execute('DELETE FROM workers WHERE worker = ?', (worker,))
+
+    def holds(self, worker: str, account: str) -> bool:
+        with self.lock:
+            row = self.conn.execute('SELECT 1 FROM leases WHERE account = ? AND worker = ? AND expires_at >= ?',
+                                    (account, worker, time.time())).fetchone()
+        return row is not None
+
+    def reserve_request(self, account: str, spacing: float) -> float:
+        """Book the next schedule request for an account across all workers.
+
+        Returns 0 when the request may go now (and spaces the next one
+        spacing seconds later), otherwise how many seconds to wait.
+        """
+        if spacing <= 0:
+            return 0.0
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute('SELECT next_allowed FROM request_spacing WHERE account = ?', (account,)).fetchone()
+            if row is not None and row[0] > now:
+                return row[0] - now
+            self.conn.execute('INSERT OR REPLACE INTO request_spacing (account, next_allowed) VALUES (?, ?)',
+                              (account, now + spacing))
+        return 0.0
+
+    def status(self) -> Dict[str, Any]:
+        """Leases and workers, for the coordinator."""
+        now = time.time()
+        with self.lock:
+            leases = self.conn.execute('SELECT account, version, worker, expires_at FROM leases ORDER BY account')
+            leases = [{'account': account, 'version': version,
+                       'worker': worker if worker and expires_at >= now else None,
+                       'expires_in': round(expires_at - now, 1) if worker else None}
+                      for account, version, worker, expires_at in leases.fetchall()]
+            workers = self.conn.execute('SELECT worker, capacity, heartbeat FROM workers ORDER BY worker')
+            workers = [{'worker': worker, 'capacity': capacity, 'live': heartbeat > now - self.ttl,
+                        'last_heartbeat': round(now - heartbeat, 1)}
+                       for worker, capacity, heartbeat in workers.fetchall()]
+        return {'leases': leases, 'workers': workers}
+
+    def close(self):
+        self.conn.close()
+
+
+class ShardWorker:
+    """Leases accounts from a LeaseStore and checks them with a WatchSupervisor until stopped.
+
+    Heartbeats every third of the lease TTL renew the leases, pick up
+    changed watches, hand back accounts above the worker's fair share and
+    claim more when it is below. A check only runs while the lease is
+    held and after the account's request has been reserved in the store.
+    """
+
+    def __init__(self, store: LeaseStore, worker_id: Optional[str] = None, capacity: Optional[int] = None,
+                 monitor_hook: Optional[Callable[[Any], None]] = None):
+        self.store = store
+        self.supervisor = WatchSupervisor([])
+        self.config = self.supervisor.config
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.capacity = capacity or self.config['worker_capacity']
+        self.request_spacing = self.config['account_rate_limit_seconds']
+        # Called with each new account monitor, e.g. to log it in some other way
+        self.monitor_hook = monitor_hook
+        self.heartbeat_interval = store.ttl / 3
+        self.lock = threading.Lock()
+        # account -> (account key, watch version)
+        self.accounts = {}
+        # account -> monotonic time its next check is due
+        self.due = {}
+        self.running = set()
+        # Accounts whose lease was lost mid-check, dropped once the check finishes
+        self.lost = set()
+        self.stopping = threading.Event()
+
+    def run(self):
+        """Lease, check and heartbeat until stop() is called."""
+        logger.info("Worker %s leasing from %s (capacity %s accounts)", self.worker_id, self.store.path, self.capacity)
+        self.supervisor.metrics_exporter.start()
+        next_heartbeat = 0.0
+        while not self.stopping.is_set():
+            now = time.monotonic()
+            if now >= next_heartbeat:
+                try:
+                    self._heartbeat()
+                except sqlite3.Error as e:
+                    logger.error("Heartbeat failed: %s", e)
+                next_heartbeat = now + self.heartbeat_interval
+            self._dispatch_due()
+
+            with self.lock:
+                waiting = [due for account, due in self.due.items() if account not in self.running]
+            self.stopping.wait(max(0.05, min([next_heartbeat] + waiting) - time.monotonic()))
+
+    def _heartbeat(self):
+        self.store.heartbeat(self.worker_id, self.capacity)
+        held = self.store.renew(self.worker_id)
+
+        with self.lock:
+            accounts = dict(self.accounts)
+        for account, (_, version) in accounts.items():
+            if account not in held:
+                logger.warning("Lost the lease on %s, no longer checking it", account)
+                LEASES.inc(event='lost')
+                with self.lock:
+                    checking = account in self.running
+                    if checking:
+                        self.lost.add(account)
+                if not checking:
+                    self._drop(account)
+            elif held[account] != version and account not in self.running:
+                logger.info("Watches for %s changed, reloading them", account)
+                self._drop(account)
+                self.store.release(self.worker_id, [account])
+
+        share = self.store.fair_share(self.worker_id, self.capacity)
+        with self.lock:
+            idle = sorted(account for account in self.accounts if account not in self.running)
+            held_count = len(self.accounts)
+        if held_count > share:
+            # Another worker joined: hand back the extra accounts that are not mid-check
+            surplus = idle[share - held_count:]
+            for account in surplus:
+                self._drop(account)
+            self.store.release(self.worker_id, surplus)
+            logger.info("Handed back %s accounts to rebalance (fair share %s)", len(surplus), share)
+        elif held_count < share:
+            for lease in self.store.claim(self.worker_id, share - held_count):
+                self._adopt(lease)
+
+    def _adopt(self, lease: Dict[str, Any]):
+        account_key = self.supervisor.add_account(lease['watches'])
+        if self.monitor_hook:
+            self.monitor_hook(self.supervisor.monitors[account_key])
+        with self.lock:
+            self.accounts[lease['account']] = (account_key, lease['version'])
+            self.due[lease['account']] = time.monotonic()
+        logger.info("Leased %s (%s watches)", lease['account'], len(lease['watches']))
+
+    def _drop(self, account: str):
+        with self.lock:
+            entry = self.accounts.pop(account, None)
+            self.due.pop(account, None)
+            self.lost.discard(account)
+        if entry is not None:
+            self.supervisor.remove_account(entry[0])
+
+    def _dispatch_due(self):
+        now = time.monotonic()
+        with self.lock:
+            due = [account for account, when in self.due.items() if when <= now and account not in self.running]
+        for account in due:
+            wait = self.store.reserve_request(account, self.request_spacing)
+            with self.lock:
+                if wait > 0:
+                    # Another worker checked this account moments ago (a lease handover)
+                    self.due[account] = now + wait
+                    continue
+                self.running.add(account)
+            self.supervisor.executor.submit(self._check, account)
+
+    def _check(self, account: str):
+        with self.lock:
+            account_key, _ = self.accounts.get(account, (None, None))
+        try:
+            # Fencing: a worker that stalled past its lease must not check alongside the new holder
+            if account_key is None or not self.store.holds(self.worker_id, account):
+                return
+            self.supervisor.check_account(account_key)
+        except Exception as e:
+            logger.error("Error checking %s: %s", account, e)
+        finally:
+            monitor = self.supervisor.monitors.get(account_key)
+            delay = monitor._next_delay() if monitor is not None else 0
+            with self.lock:
+                self.running.discard(account)
+                lost = account in self.lost
+                if account in self.accounts and not lost:
+                    self.due[account] = time.monotonic() + delay
+            if lost:
+                self._drop(account)
+
+    def stop(self):
+        self.stopping.set()
+
+    def cleanup(self):
+        """Hand every lease back, so other workers take over without waiting for them to expire."""
+        with self.lock:
+            accounts = list(self.accounts)
+        try:
+            self.store.release(self.worker_id, accounts)
+            self.store.retire(self.worker_id)
+        except sqlite3.Error as e:
+            logger.warning("Could not release leases: %s", e)
+        self.supervisor.cleanup()
+        self.store.close()
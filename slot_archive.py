@@ -0,0 +1,392 @@
+"""
+Slot history archive for the PrairieTest monitor.
+Appends every change to an account's schedule (slots appearing and
+disappearing) to compact column files and answers questions about past
+availability from them, reading one block of events at a time.
+"""
+
+import os
+import json
+import time
+import array
+import bisect
+import hashlib
+import logging
+import threading
+from datetime import date, datetime
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+
+from adaptive_polling import hour_of_week, HOURS_PER_WEEK
+from slot_state import slot_key
+from slot_matcher import WatchRule, parse_slot_date, parse_slot_time
+
+logger = logging.getLogger(__name__)
+
+# Events read (and held in memory) at a time by queries
+BLOCK = 8192
+
+# Stored for a date or time the matcher could not parse
+UNKNOWN = -1
+
+
+def archive_directory(root: str, prairie_url: str, email: Optional[str]) -> str:
+    """One archive per account: the PrairieTest host plus a hash of the login."""
+    host = (prairie_url.split('://', 1)[-1].split('/', 1)[0] or 'prairietest').replace(':', '_')
+    account_hash = hashlib.sha256((email or '').encode('utf-8')).hexdigest()[:8]
+    return os.path.join(root, f"{host}-{account_hash}")
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class SlotArchive:
+    """Append-only history of one account's schedule.
+
+    times.u32     unix time of each event (non-decreasing)
+    deltas.i32    +n: slot n-1 appeared, -n: slot n-1 disappeared
+    coverage.u32  (start, end) pairs of time during which the monitor was checking
+    slots.jsonl   the slot dictionary, appended to as slots are first seen: a string
+                  line adds a location, a list line adds a slot as [date as a day
+                  ordinal, start and end as minutes after midnight, location index,
+                  original date text, original time text]
+
+    Only changes are stored, so an unchanged schedule costs nothing but an
+    extended coverage interval. Columns are in the machine's byte order.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str, max_gap: float = 600):
+        self.directory = directory
+        # Checks further apart than this leave a hole in the coverage
+        self.max_gap = max_gap
+        self.lock = threading.Lock()
+        self.locations = []
+        self.location_ids = {}
+        self.columns = {name: [] for name in ('date', 'start', 'end', 'location', 'date_text', 'time_text')}
+        self.slot_ids = {}
+        # Dictionary lines not yet written; they are written before any event using them
+        self.pending_lines = []
+        # Criteria -> match mask by slot ID, extended as slots are added
+        self.masks = {}
+        self.count = 0
+        self.last_time = 0
+        # Time of the first event of each BLOCK-sized block, for seeking
+        self.block_starts = []
+        self.open_slots = set()
+        self.coverage = array.array('I')
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def for_config(cls, config: Dict[str, Any]) -> Optional['SlotArchive']:
+        """Share one archive per account directory between monitors (None when SLOT_ARCHIVE_DIR is empty)."""
+        if not config['slot_archive_dir']:
+            return None
+        directory = archive_directory(config['slot_archive_dir'], config['prairie_url'], config['school_email'])
+        max_gap = 2 * max(config['check_interval_seconds'], config['max_check_interval'])
+        with cls._instances_lock:
+            if directory not in cls._instances:
+                cls._instances[directory] = cls(directory, max_gap=max_gap)
+            return cls._instances[directory]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        dictionary_path = self._path('slots.jsonl')
+        if os.path.exists(dictionary_path):
+            with open(dictionary_path, 'rb') as f:
+                lines = f.read().split(b'\n')
+            # Anything after the last newline is a line cut short by a crash
+            if lines[-1]:
+                with open(dictionary_path, 'r+b') as f:
+                    f.truncate(os.path.getsize(dictionary_path) - len(lines[-1]))
+            for line in lines[:-1]:
+                entry = json.loads(line)
+                if isinstance(entry, str):
+                    self.location_ids[entry] = len(self.locations)
+                    self.locations.append(entry)
+                    continue
+                for name, value in zip(self.columns, entry):
+                    self.columns[name].append(value)
+                self.slot_ids[slot_key(self.slot(len(self.columns['date']) - 1))] = len(self.columns['date']) - 1
+
+        # A crash between the two appends leaves one column longer; drop the unmatched tail
+        sizes = [os.path.getsize(self._path(name)) // 4 if os.path.exists(self._path(name)) else 0
+                 for name in ('times.u32', 'deltas.i32')]
+        self.count = min(sizes)
+        if sizes[0] != sizes[1]:
+            logger.warning("Slot archive %s was not closed cleanly, dropping %s unmatched events",
+                           self.directory, abs(sizes[0] - sizes[1]))
+            for name in ('times.u32', 'deltas.i32'):
+                with open(self._path(name), 'r+b') as f:
+                    f.truncate(self.count * 4)
+
+        for times, deltas in self._blocks(0, self.count):
+            self.block_starts.append(times[0])
+            self.last_time = times[-1]
+            for delta in deltas:
+                if delta > 0:
+                    self.open_slots.add(delta - 1)
+                else:
+                    self.open_slots.discard(-delta - 1)
+
+        if os.path.exists(self._path('coverage.u32')):
+            with open(self._path('coverage.u32'), 'rb') as f:
+                self.coverage.frombytes(f.read())
+            del self.coverage[len(self.coverage) // 2 * 2:]
+
+    def _save_dictionary(self):
+        with open(self._path('slots.jsonl'), 'a') as f:
+            f.write(''.join(line + '\n' for line in self.pending_lines))
+        self.pending_lines = []
+
+    def slot(self, slot_id: int) -> Dict[str, str]:
+        """A slot dict as the parsers produce it."""
+        return {
+            'date': self.columns['date_text'][slot_id],
+            'time': self.columns['time_text'][slot_id],
+            'location': self.locations[self.columns['location'][slot_id]],
+        }
+
+    def _slot_id(self, slot: Dict[str, str]) -> int:
+        key = slot_key(slot)
+        slot_id = self.slot_ids.get(key)
+        if slot_id is not None:
+            return slot_id
+
+        location = slot.get('location') or ''
+        location_id = self.location_ids.get(location)
+        if location_id is None:
+            location_id = self.location_ids[location] = len(self.locations)
+            self.locations.append(location)
+            self.pending_lines.append(json.dumps(location))
+        slot_date = parse_slot_date(slot.get('date') or '')
+        slot_time = parse_slot_time(slot.get('time') or '')
+
+        slot_id = self.slot_ids[key] = len(self.columns['date'])
+        self.columns['date'].append(slot_date.toordinal() if slot_date else UNKNOWN)
+        self.columns['start'].append(slot_time[0] if slot_time else UNKNOWN)
+        self.columns['end'].append(slot_time[1] if slot_time else UNKNOWN)
+        self.columns['location'].append(location_id)
+        self.columns['date_text'].append(slot.get('date') or '')
+        self.columns['time_text'].append(slot.get('time') or '')
+        self.pending_lines.append(json.dumps([values[slot_id] for values in self.columns.values()],
+                                             separators=(',', ':')))
+        return slot_id
+
+    def record(self, slots: List[Dict[str, str]], timestamp: Optional[float] = None, unchanged: bool = False):
+        """Archive what a successful check saw; unchanged checks only extend the coverage."""
+        with self.lock:
+            timestamp = max(int(timestamp if timestamp is not None else time.time()), self.last_time)
+            if not unchanged:
+                current = {self._slot_id(slot) for slot in slots}
+                self._append(timestamp, sorted(current - self.open_slots), sorted(self.open_slots - current))
+            self._cover(timestamp)
+
+    def record_changes(self, added: List[Dict[str, str]], removed: List[Dict[str, str]],
+                       timestamp: Optional[float] = None):
+        """Archive known changes directly (imports and synthetic data), without diffing a full check."""
+        with self.lock:
+            timestamp = max(int(timestamp if timestamp is not None else time.time()), self.last_time)
+            self._append(timestamp, [self._slot_id(slot) for slot in added],
+                         [self._slot_id(slot) for slot in removed])
+            self._cover(timestamp)
+
+    def _append(self, timestamp: int, added: List[int], removed: List[int]):
+        if not added and not removed:
+            return
+        # The dictionary goes first, so events never refer to slots that were not saved
+        if self.pending_lines:
+            self._save_dictionary()
+
+        deltas = array.array('i', [slot_id + 1 for slot_id in added] + [-slot_id - 1 for slot_id in removed])
+        with open(self._path('deltas.i32'), 'ab') as f:
+            deltas.tofile(f)
+        with open(self._path('times.u32'), 'ab') as f:
+            (array.array('I', [timestamp]) * len(deltas)).tofile(f)
+
+        first_block = (self.count + BLOCK - 1) // BLOCK
+        self.count += len(deltas)
+        self.block_starts.extend([timestamp] * ((self.count + BLOCK - 1) // BLOCK - first_block))
+        self.last_time = timestamp
+        self.open_slots.update(added)
+        self.open_slots.difference_update(removed)
+
+    def _cover(self, timestamp: int):
+        """Extend the last coverage interval to timestamp, or start a new one after a gap."""
+        if self.coverage and timestamp - self.coverage[-1] <= self.max_gap:
+            self.coverage[-1] = timestamp
+            offset = (len(self.coverage) - 1) * 4
+            pair = self.coverage[-1:]
+        else:
+            self.coverage.extend((timestamp, timestamp))
+            offset = (len(self.coverage) - 2) * 4
+            pair = self.coverage[-2:]
+        mode = 'r+b' if os.path.exists(self._path('coverage.u32')) else 'wb'
+        with open(self._path('coverage.u32'), mode) as f:
+            f.seek(offset)
+            pair.tofile(f)
+
+    def _blocks(self, first: int, last: int) -> Iterator[Tuple[array.array, array.array]]:
+        """(times, deltas) for events first..last-1, BLOCK events at a time."""
+        if first >= last:
+            return
+        with open(self._path('times.u32'), 'rb') as times_file, open(self._path('deltas.i32'), 'rb') as deltas_file:
+            times_file.seek(first * 4)
+            deltas_file.seek(first * 4)
+            position = first
+            while position < last:
+                size = min(BLOCK - position % BLOCK, last - position)
+                times, deltas = array.array('I'), array.array('i')
+                times.frombytes(times_file.read(size * 4))
+                deltas.frombytes(deltas_file.read(size * 4))
+                yield times, deltas
+                position += size
+
+    def events(self, start: Optional[float] = None, end: Optional[float] = None) \
+            -> Iterator[Tuple[array.array, array.array]]:
+        """(times, deltas) blocks of the events with start <= time < end."""
+        with self.lock:
+            count = self.count
+            block_starts = list(self.block_starts)
+        first = 0
+        if start is not None:
+            first = max(0, bisect.bisect_left(block_starts, start) - 1) * BLOCK
+        for times, deltas in self._blocks(first, count):
+            low = bisect.bisect_left(times, start) if start is not None and times[0] < start else 0
+            high = bisect.bisect_left(times, end) if end is not None and times[-1] >= end else len(times)
+            if low < high:
+                yield (times[low:high], deltas[low:high]) if (low, high) != (0, len(times)) else (times, deltas)
+            if high < len(times):
+                return
+
+    def mask(self, criteria: Optional[Dict[str, Any]] = None) -> bytearray:
+        """1 for every slot ID that matches DESIRED_*-style criteria (all of them without criteria)."""
+        with self.lock:
+            size = len(self.columns['date'])
+        if not criteria or not any(criteria.values()):
+            return bytearray(b'\x01' * size)
+
+        key = tuple(sorted((name, value) for name, value in criteria.items() if value))
+        with self.lock:
+            rule, result = self.masks.get(key) or (WatchRule.from_criteria('history', criteria), bytearray())
+            # Slot IDs only ever grow, so only slots added since the last query are matched
+            for slot_id in range(len(result), size):
+                day, start = self.columns['date'][slot_id], self.columns['start'][slot_id]
+                slot_date = date.fromordinal(day) if day != UNKNOWN else None
+                slot_time = (start, self.columns['end'][slot_id]) if start != UNKNOWN else None
+                result.append(rule.matches(self.slot(slot_id), slot_date, slot_time))
+            self.masks[key] = (rule, result)
+            return bytearray(result)
+
+    def releases(self, criteria: Optional[Dict[str, Any]] = None, start: Optional[float] = None,
+                 end: Optional[float] = None) -> Dict[str, Any]:
+        """When matching slots appeared: a count per hour of the week (local time) and in total."""
+        mask = self.mask(criteria)
+        by_hour = [0] * HOURS_PER_WEEK
+        hour_cache = {}
+        for times, deltas in self.events(start, end):
+            for moment, delta in zip(times, deltas):
+                if delta > 0 and mask[delta - 1]:
+                    # Events cluster in time, so most hours are already known
+                    hour_start = moment - moment % 3600
+                    hour = hour_cache.get(hour_start)
+                    if hour is None:
+                        hour = hour_cache[hour_start] = hour_of_week(datetime.fromtimestamp(moment))
+                    by_hour[hour] += 1
+        return {'total': sum(by_hour), 'by_hour_of_week': by_hour}
+
+    def open_at(self, moment: float, criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+        """The matching slots that were open at a moment."""
+        mask = self.mask(criteria)
+        open_ids = set()
+        for _, deltas in self.events(None, moment + 1):
+            for delta in deltas:
+                if delta > 0:
+                    open_ids.add(delta - 1)
+                else:
+                    open_ids.discard(-delta - 1)
+        with self.lock:
+            order = {slot_id: (self.columns['date'][slot_id], self.columns['start'][slot_id]) for slot_id in open_ids}
+        return [self.slot(slot_id) for slot_id in sorted(open_ids, key=order.get) if mask[slot_id]]
+
+    def series(self, start: float, end: float, step: float,
+               criteria: Optional[Dict[str, Any]] = None) -> List[Tuple[int, int]]:
+        """(time, matching slots open) every step seconds from start to end."""
+        mask = self.mask(criteria)
+        points = []
+        open_count = 0
+        next_point = start
+        for times, deltas in self.events(None, end):
+            for moment, delta in zip(times, deltas):
+                while moment > next_point and next_point < end:
+                    points.append((int(next_point), open_count))
+                    next_point += step
+                slot_id = delta - 1 if delta > 0 else -delta - 1
+                if mask[slot_id]:
+                    open_count += 1 if delta > 0 else -1
+        while next_point < end:
+            points.append((int(next_point), open_count))
+            next_point += step
+        return points
+
+    def durations(self, criteria: Optional[Dict[str, Any]] = None, start: Optional[float] = None,
+                  end: Optional[float] = None) -> Dict[str, Any]:
+        """How long matching slots that appeared between start and end stayed open, in seconds."""
+        mask = self.mask(criteria)
+        opened = {}
+        durations = []
+        for times, deltas in self.events(start, None):
+            for moment, delta in zip(times, deltas):
+                if delta > 0:
+                    if mask[delta - 1] and (end is None or moment < end):
+                        opened[delta - 1] = moment
+                else:
+                    appeared = opened.pop(-delta - 1, None)
+                    if appeared is not None:
+                        durations.append(moment - appeared)
+            if end is not None and not opened and times[-1] >= end:
+                break
+        durations.sort()
+        if not durations:
+            return {'count': 0, 'still_open': len(opened)}
+        return {
+            'count': len(durations),
+            'still_open': len(opened),
+            'mean': sum(durations) / len(durations),
+            'median': _percentile(durations, 0.5),
+            'p90': _percentile(durations, 0.9),
+            'max': durations[-1],
+        }
+
+    def coverage_seconds(self, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        """Seconds between start and end during which the monitor was checking."""
+        with self.lock:
+            coverage = self.coverage[:]
+        total = 0
+        for index in range(0, len(coverage), 2):
+            low = max(coverage[index], start if start is not None else 0)
+            high = min(coverage[index + 1], end if end is not None else coverage[index + 1])
+            total += max(0, high - low)
+        return total
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            first = self.block_starts[0] if self.block_starts else None
+            return {
+                'directory': self.directory,
+                'events': self.count,
+                'slots': len(self.columns['date']),
+                'locations': len(self.locations),
+                'open_now': len(self.open_slots),
+                'first_event': first,
+                'last_event': self.last_time or None,
+                'coverage_intervals': len(self.coverage) // 2,
+                'bytes': sum(os.path.getsize(self._path(name)) for name in
+                             ('times.u32', 'deltas.i32', 'coverage.u32', 'slots.jsonl')
+                             if os.path.exists(self._path(name))),
+            }
@@ -0,0 +1,325 @@
+"""
+Slot matching for the PrairieTest monitor.
+Parses slot date and time strings once and matches them against any number
+of compiled watch rules through a date-bucketed, time-sorted index.
+"""
+
+import re
+import bisect
+import logging
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional, List, Dict, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%m/%d/%Y',
+    '%m/%d/%y',
+    '%a, %b %d, %Y',
+    '%A, %B %d, %Y',
+    '%a %b %d %Y',
+    '%b %d, %Y',
+    '%B %d, %Y',
+    '%d %b %Y',
+    '%d %B %Y',
+]
+
+# Formats without a year are assumed to be in the current year
+DATE_FORMATS_NO_YEAR = ['%a, %b %d', '%A, %B %d', '%b %d', '%B %d', '%m/%d']
+
+WEEKDAYS = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+
+# Longest rule date range that is expanded into per-day index buckets
+MAX_EXPANDED_DAYS = 400
+
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_TIME = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m\.?|(\d{1,2}):(\d{2})', re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def parse_slot_date(text: str) -> Optional[date]:
+    """Parse a slot's date text, e.g. '2024-01-15' or 'Mon, Jan 15, 2024'."""
+    text = (text or '').strip()
+    if not text:
+        return None
+
+    iso = _ISO_DATE.search(text)
+    if iso:
+        try:
+            return datetime.strptime(iso.group(0), '%Y-%m-%d').date()
+        except ValueError:
+            return None
+
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+
+    for fmt in DATE_FORMATS_NO_YEAR:
+        try:
+            parsed = datetime.strptime(f"{text} {date.today().year}", f"{fmt} %Y")
+            return parsed.date()
+        except ValueError:
+            continue
+
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_slot_time(text: str) -> Optional[Tuple[int, int]]:
+    """Parse a slot's time text into (start, end) minutes after midnight.
+
+    Handles '21:00', '9:00 PM', '9pm' and ranges like '9:00 - 10:30 PM'.
+    A single time gives start == end.
+    """
+    matches = list(_TIME.finditer(text or ''))
+    if not matches:
+        return None
+
+    times = []
+    for match in matches[:2]:
+        if match.group(1) is not None:
+            hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3).lower()
+        else:
+            hour, minute, meridiem = int(match.group(4)), int(match.group(5)), None
+        times.append([hour, minute, meridiem])
+
+    # '9:00 - 10:30 PM': the start shares the end's meridiem (but '11:00 - 1:00 PM' does not)
+    if len(times) == 2 and times[0][2] is None and times[1][2] is not None and times[0][0] <= 12:
+        start_hour, end_hour = times[0][0] % 12, times[1][0] % 12
+        if start_hour <= end_hour:
+            times[0][2] = times[1][2]
+
+    minutes = []
+    for hour, minute, meridiem in times:
+        if meridiem == 'p' and hour < 12:
+            hour += 12
+        elif meridiem == 'a' and hour == 12:
+            hour = 0
+        if hour > 23 or minute > 59:
+            return None
+        minutes.append(hour * 60 + minute)
+
+    return minutes[0], minutes[-1]
+
+
+def _parse_date_spec(spec: str) -> Tuple[Optional[set], Optional[Tuple[date, date]]]:
+    """Parse '2024-01-15', '2024-01-15,2024-01-17' or '2024-01-15..2024-01-20'."""
+    dates, date_range = set(), None
+    for part in spec.split(','):
+        part = part.strip()
+        if '..' in part:
+            start, end = (parse_slot_date(p) for p in part.split('..', 1))
+            if not start or not end:
+                raise ValueError(f"Invalid date range: {part}")
+            date_range = (start, end)
+        elif part:
+            parsed = parse_slot_date(part)
+            if not parsed:
+                raise ValueError(f"Invalid date: {part}")
+            dates.add(parsed)
+    return dates or None, date_range
+
+
+def _parse_time_spec(spec: str) -> Tuple[int, int]:
+    """Parse '21:00' (exact start) or '19:00-22:00' (start within range)."""
+    if '-' in spec:
+        start, end = (parse_slot_time(p) for p in spec.split('-', 1))
+        if not start or not end:
+            raise ValueError(f"Invalid time range: {spec}")
+        return start[0], end[0]
+    parsed = parse_slot_time(spec)
+    if not parsed:
+        raise ValueError(f"Invalid time: {spec}")
+    return parsed[0], parsed[0]
+
+
+def criteria_problems(criteria: Dict[str, Any]) -> List[str]:
+    """Criteria from_criteria could only match as text, or not use at all."""
+    problems = []
+    date_spec = (criteria.get('desired_date') or '').strip()
+    if date_spec:
+        try:
+            _parse_date_spec(date_spec)
+        except ValueError as e:
+            problems.append(f"DESIRED_DATE: {str(e)} (it would be matched as text)")
+
+    time_spec = (criteria.get('desired_time') or '').strip()
+    if time_spec:
+        try:
+            _parse_time_spec(time_spec)
+        except ValueError as e:
+            problems.append(f"DESIRED_TIME: {str(e)} (it would be matched as text)")
+
+    weekday_spec = (criteria.get('desired_weekdays') or '').strip()
+    days = [day.strip() for day in weekday_spec.split(',') if day.strip()]
+    unknown = [day for day in days if day.lower()[:3] not in WEEKDAYS]
+    if unknown:
+        problems.append(f"DESIRED_WEEKDAYS: unknown day {', '.join(unknown)} (it would be ignored)")
+    return problems
+
+
+class WatchRule:
+    """Compiled slot criteria: dates or a date range, weekdays, a start-time window and locations."""
+
+    def __init__(self, name: str, dates: Optional[set] = None, date_range: Optional[Tuple[date, date]] = None,
+                 weekdays: Optional[set] = None, time_range: Optional[Tuple[int, int]] = None,
+                 locations: Optional[List[str]] = None, raw_date: Optional[str] = None,
+                 raw_time: Optional[str] = None):
+        self.name = name
+        self.dates = dates
+        self.date_range = date_range
+        self.weekdays = weekdays
+        self.time_range = time_range
+        self.locations = [location.lower() for location in locations or []]
+        # Substring fallbacks for criteria that could not be parsed
+        self.raw_date = raw_date
+        self.raw_time = raw_time
+
+    @classmethod
+    def from_criteria(cls, name: str, criteria: Dict[str, Any]) -> 'WatchRule':
+        """Compile DESIRED_DATE / DESIRED_TIME / DESIRED_LOCATION / DESIRED_WEEKDAYS style criteria."""
+        dates = date_range = weekdays = time_range = raw_date = raw_time = None
+
+        date_spec = (criteria.get('desired_date') or '').strip()
+        if date_spec:
+            try:
+                dates, date_range = _parse_date_spec(date_spec)
+            except ValueError:
+                logger.warning("[%s] Could not parse date '%s', matching it as text", name, date_spec)
+                raw_date = date_spec
+
+        time_spec = (criteria.get('desired_time') or '').strip()
+        if time_spec:
+            try:
+                time_range = _parse_time_spec(time_spec)
+            except ValueError:
+                logger.warning("[%s] Could not parse time '%s', matching it as text", name, time_spec)
+                raw_time = time_spec
+
+        weekday_spec = (criteria.get('desired_weekdays') or '').strip()
+        if weekday_spec:
+            weekdays = set()
+            for day in (day.strip() for day in weekday_spec.split(',')):
+                if day.lower()[:3] in WEEKDAYS:
+                    weekdays.add(WEEKDAYS[day.lower()[:3]])
+                elif day:
+                    logger.warning("[%s] Unknown weekday '%s', ignoring it", name, day)
+            # Nothing recognised: match every day rather than none
+            weekdays = weekdays or None
+
+        location_spec = criteria.get('desired_location') or ''
+        locations = [location.strip() for location in location_spec.split('|') if location.strip()]
+
+        return cls(name, dates=dates, date_range=date_range, weekdays=weekdays, time_range=time_range,
+                   locations=locations, raw_date=raw_date, raw_time=raw_time)
+
+    def index_dates(self) -> Optional[List[date]]:
+        """The dates this rule can match, or None if it must be checked for every date."""
+        if self.date_range:
+            start, end = self.date_range
+            if (end - start).days > MAX_EXPANDED_DAYS:
+                return None
+            expanded = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+            return sorted(set(expanded) | (self.dates or set()))
+        if self.dates:
+            return sorted(self.dates)
+        return None
+
+    def matches(self, slot: Dict[str, str], slot_date: Optional[date], slot_time: Optional[Tuple[int, int]]) -> bool:
+        """Full check of a slot whose date and time have already been parsed."""
+        if self.dates or self.date_range:
+            if slot_date is None:
+                return False
+            in_dates = bool(self.dates) and slot_date in self.dates
+            in_range = bool(self.date_range) and self.date_range[0] <= slot_date <= self.date_range[1]
+            if not (in_dates or in_range):
+                return False
+        if self.raw_date and self.raw_date not in slot.get('date', ''):
+            return False
+
+        if self.weekdays is not None and (slot_date is None or slot_date.weekday() not in self.weekdays):
+            return False
+
+        if self.time_range:
+            if slot_time is None or not self.time_range[0] <= slot_time[0] <= self.time_range[1]:
+                return False
+        if self.raw_time and self.raw_time not in slot.get('time', ''):
+            return False
+
+        if self.locations:
+            slot_location = slot.get('location', '').lower()
+            if not any(location in slot_location for location in self.locations):
+                return False
+
+        return True
+
+
+class _TimeBucket:
+    """Rules sorted by the start of their time window, plus rules with no time window."""
+
+    def __init__(self):
+        self.starts = []
+        self.timed = []
+        self.untimed = []
+
+    def add(self, rule: WatchRule):
+        if rule.time_range:
+            position = bisect.bisect_right(self.starts, rule.time_range[0])
+            self.starts.insert(position, rule.time_range[0])
+            self.timed.insert(position, rule)
+        else:
+            self.untimed.append(rule)
+
+    def candidates(self, slot_time: Optional[Tuple[int, int]]):
+        """Rules whose time window could contain the slot's start time."""
+        yield from self.untimed
+        if slot_time is None:
+            return
+        for rule in self.timed[:bisect.bisect_right(self.starts, slot_time[0])]:
+            if rule.time_range[1] >= slot_time[0]:
+                yield rule
+
+
+class SlotMatcher:
+    """Index of compiled watch rules.
+
+    Rules are bucketed by the dates they accept and, inside each bucket,
+    sorted by start time, so matching a slot only looks at rules that
+    could possibly accept its date and time.
+    """
+
+    def __init__(self, rules: List[WatchRule]):
+        self.rules = list(rules)
+        self.by_date = {}
+        self.any_date = _TimeBucket()
+
+        for rule in self.rules:
+            dates = rule.index_dates()
+            if dates is None:
+                self.any_date.add(rule)
+            else:
+                for rule_date in dates:
+                    self.by_date.setdefault(rule_date, _TimeBucket()).add(rule)
+
+    def match(self, slot: Dict[str, str]) -> List[WatchRule]:
+        """Every rule that accepts a slot."""
+        slot_date = parse_slot_date(slot.get('date', ''))
+        slot_time = parse_slot_time(slot.get('time', ''))
+
+        candidates = list(self.any_date.candidates(slot_time))
+        if slot_date in self.by_date:
+            candidates.extend(self.by_date[slot_date].candidates(slot_time))
+
+        return [rule for rule in candidates if rule.matches(slot, slot_date, slot_time)]
+
+    def match_all(self, slots: List[Dict[str, str]]) -> Dict[str, List[Dict[str, str]]]:
+        """Matching slots for every rule, keyed by rule name."""
+        matched = {rule.name: [] for rule in self.rules}
+        for slot in slots:
+            for rule in self.match(slot):
+                matched[rule.name].append(slot)
+        return matched
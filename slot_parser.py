@@ -0,0 +1,275 @@
+"""
+Schedule page parsers for the PrairieTest monitor.
+Turn schedule page HTML into slot dicts ({'date', 'time', 'location'}).
+"""
+
+import re
+import logging
+from typing import Optional, List, Dict, Iterable
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Look for slot elements (these selectors will need adjustment)
+SLOT_SELECTORS = [
+    ".slot",
+    ".time-slot",
+    ".available-slot",
+    "[data-slot]",
+    ".calendar-slot"
+]
+
+# Field selectors, searched for inside each slot element
+FIELD_SELECTORS = {
+    'date': ['.date', '.slot-date', '[data-date]'],
+    'time': ['.time', '.slot-time', '[data-time]'],
+    'location': ['.location', '.slot-location', '[data-location]'],
+}
+
+# Elements whose text is never part of a slot's visible text
+NON_TEXT_TAGS = {'script', 'style', 'template'}
+
+_SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+|\[[\w-]+(?:=["\']?[^"\'\]]*["\']?)?\])*)$')
+_SELECTOR_PART = re.compile(r'\.([\w-]+)|\[([\w-]+)(?:=["\']?([^"\'\]]*)["\']?)?\]')
+
+
+def _selector_to_xpath_predicate(selector: str) -> str:
+    """Translate a simple CSS selector (tag, .class, [attr], [attr=value]) to an XPath predicate."""
+    match = _SIMPLE_SELECTOR.match(selector.strip())
+    if not match:
+        raise ValueError(f"Unsupported selector for the lxml parser: {selector}")
+
+    tag, rest = match.groups()
+    conditions = [f"self::{tag.lower()}"] if tag else []
+    for class_name, attribute, value in _SELECTOR_PART.findall(rest):
+        if class_name:
+            conditions.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')")
+        elif value:
+            conditions.append(f"@{attribute}='{value}'")
+        else:
+            conditions.append(f"@{attribute}")
+    return ' and '.join(conditions) or 'true()'
+
+
+def _any_selector_predicate(selectors: Iterable[str]) -> str:
+    """XPath predicate matching elements that match any of the selectors."""
+    return ' or '.join(f"({_selector_to_xpath_predicate(selector)})" for selector in selectors)
+
+
+class _FieldMatcher:
+    """Checks elements against a field's selectors without another tree walk."""
+
+    def __init__(self, selectors: Iterable[str]):
+        self.rules = []
+        for selector in selectors:
+            match = _SIMPLE_SELECTOR.match(selector.strip())
+            if not match:
+                raise ValueError(f"Unsupported selector for the lxml parser: {selector}")
+            tag, rest = match.groups()
+            self.rules.append((tag.lower() if tag else None, _SELECTOR_PART.findall(rest)))
+
+    def matches(self, element) -> bool:
+        classes = None
+        for tag, parts in self.rules:
+            if tag and element.tag != tag:
+                continue
+            for class_name, attribute, value in parts:
+                if class_name:
+                    if classes is None:
+                        classes = element.get('class', '').split()
+                    if class_name not in classes:
+                        break
+                elif element.get(attribute) is None or (value and element.get(attribute) != value):
+                    break
+            else:
+                return True
+        return False
+
+
+def _element_text(element) -> str:
+    """Visible text of an element, each piece stripped and joined (like get_text(strip=True))."""
+    parts = []
+
+    def collect(node):
+        if node.text and node.tag not in NON_TEXT_TAGS:
+            parts.append(node.text.strip())
+        for child in node:
+            if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+                collect(child)
+            if child.tail:
+                parts.append(child.tail.strip())
+
+    collect(element)
+    return ''.join(parts)
+
+
+class LxmlSlotParser:
+    """Single-parse slot extractor.
+
+    One lxml parse, one precompiled XPath that matches any slot selector
+    (so each element is returned once, in document order), and one walk
+    of each slot's descendants that picks up date, time and location together.
+    """
+
+    def __init__(self, slot_selectors: Optional[List[str]] = None,
+                 field_selectors: Optional[Dict[str, List[str]]] = None,
+                 guard_selectors: Optional[List[str]] = None):
+        self.slot_selectors = list(slot_selectors or SLOT_SELECTORS)
+        self.slot_xpath = etree.XPath(f"//*[{_any_selector_predicate(self.slot_selectors)}]")
+        self.field_matchers = {field: _FieldMatcher(selectors)
+                               for field, selectors in (field_selectors or FIELD_SELECTORS).items()}
+        # A narrowed parser counts matches of the full selector list to notice when it misses slots
+        self.guard_xpath = etree.XPath(f"count(//*[{_any_selector_predicate(guard_selectors)}])") \
+            if guard_selectors else None
+        self.stale = False
+        # Plain etree elements skip lxml.html's per-element class lookup
+        self.html_parser = etree.HTMLParser()
+
+    def parse(self, html: str) -> List[Dict[str, str]]:
+        """Return every slot on the page."""
+        if not html or not html.strip():
+            return []
+
+        document = etree.fromstring(html, self.html_parser)
+        if document is None:
+            return []
+
+        elements = self.slot_xpath(document)
+        slots = []
+        for element in elements:
+            slot_info = self.extract_slot_info(element)
+            if slot_info:
+                slots.append(slot_info)
+
+        if self.guard_xpath is not None:
+            self.stale = len(slots) < len(elements) or self.guard_xpath(document) > len(elements)
+        return slots
+
+    def extract_slot_info(self, slot_element) -> Optional[Dict[str, str]]:
+        """Find the first date, time and location descendants in one walk."""
+        found = {}
+        pending = dict(self.field_matchers)
+
+        for element in slot_element.iterdescendants():
+            if not isinstance(element.tag, str):
+                continue
+            for field, matcher in list(pending.items()):
+                if matcher.matches(element):
+                    found[field] = element
+                    del pending[field]
+            if not pending:
+                break
+
+        if 'date' in found and 'time' in found:
+            return {
+                'date': _element_text(found['date']),
+                'time': _element_text(found['time']),
+                'location': _element_text(found['location']) if 'location' in found else 'Unknown'
+            }
+        return None
+
+
+class SoupSlotParser:
+    """BeautifulSoup parser: one select() per slot selector, select_one() per field."""
+
+    def __init__(self, slot_selectors: Optional[List[str]] = None,
+                 field_selectors: Optional[Dict[str, List[str]]] = None,
+                 guard_selectors: Optional[List[str]] = None):
+        self.slot_selectors = list(slot_selectors or SLOT_SELECTORS)
+        self.field_selectors = {field: ', '.join(selectors)
+                                for field, selectors in (field_selectors or FIELD_SELECTORS).items()}
+        self.guard_selector = ', '.join(guard_selectors) if guard_selectors else None
+        self.stale = False
+
+    def parse(self, html: str) -> List[Dict[str, str]]:
+        """Return every slot on the page."""
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+
+        slots = []
+        seen = set()
+        for selector in self.slot_selectors:
+            for slot in soup.select(selector):
+                # An element matching several selectors is still one slot
+                if id(slot) in seen:
+                    continue
+                seen.add(id(slot))
+                slot_info = self.extract_slot_info(slot)
+                if slot_info:
+                    slots.append(slot_info)
+
+        if self.guard_selector:
+            self.stale = len(slots) < len(seen) or len(soup.select(self.guard_selector)) > len(seen)
+        return slots
+
+    def extract_slot_info(self, slot_element) -> Optional[Dict[str, str]]:
+        """Extract slot information from HTML element."""
+        try:
+            # Extract date, time, and location from slot element
+            # This will need customization based on actual HTML structure
+            date_elem = slot_element.select_one(self.field_selectors['date'])
+            time_elem = slot_element.select_one(self.field_selectors['time'])
+            location_elem = slot_element.select_one(self.field_selectors['location'])
+
+            if date_elem and time_elem:
+                return {
+                    'date': date_elem.get_text(strip=True),
+                    'time': time_elem.get_text(strip=True),
+                    'location': location_elem.get_text(strip=True) if location_elem else 'Unknown'
+                }
+        except Exception as e:
+            logger.error("Error extracting slot info: %s", e)
+
+        return None
+
+
+PARSERS = {
+    'lxml': LxmlSlotParser,
+    'soup': SoupSlotParser,
+}
+
+
+def create_parser(backend: str, slot_selectors: Optional[List[str]] = None,
+                  field_selectors: Optional[Dict[str, List[str]]] = None,
+                  guard_selectors: Optional[List[str]] = None):
+    """Build the parser for a backend name ('lxml' or 'soup').
+
+    A parser narrowed to learned selectors should get the full slot selector
+    list as guard_selectors; its stale flag is then set after any parse in
+    which it may have missed slots.
+    """
+    try:
+        parser_class = PARSERS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend: {backend}")
+    return parser_class(slot_selectors, field_selectors, guard_selectors)
+
+
+def probe_selectors(html: str) -> Dict[str, List[str]]:
+    """Report which slot selectors, and which field selectors inside slots, match a page.
+
+    Returns {'slots': [...], 'date': [...], 'time': [...], 'location': [...]},
+    each list in the original fallback order.
+    """
+    matched = {'slots': [], **{field: [] for field in FIELD_SELECTORS}}
+    if not html or not html.strip():
+        return matched
+
+    document = etree.fromstring(html, etree.HTMLParser())
+    if document is None:
+        return matched
+
+    for selector in SLOT_SELECTORS:
+        if document.xpath(f"//*[{_selector_to_xpath_predicate(selector)}]"):
+            matched['slots'].append(selector)
+
+    if matched['slots']:
+        slot_predicate = _any_selector_predicate(matched['slots'])
+        for field, selectors in FIELD_SELECTORS.items():
+            for selector in selectors:
+                if document.xpath(f"//*[{slot_predicate}]//*[{_selector_to_xpath_predicate(selector)}]"):
+                    matched[field].append(selector)
+
+    return matched
@@ -0,0 +1,158 @@
+"""
+Persistent slot state for the PrairieTest monitor.
+Remembers which slots each watch has already seen so that only new slots
+trigger notifications, across restarts.
+"""
+
+import re
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, List, Dict, Tuple
+
+from metrics import SLOTS_SEEN
+
+logger = logging.getLogger(__name__)
+
+
+def slot_key(slot: Dict[str, str]) -> str:
+    """Stable identity for a slot: normalised date, time and location.
+
+    A missing or empty field reads as 'unknown', the text the parsers and the
+    extension put in a field they could not read, so both give a slot one key.
+    """
+    return '|'.join(
+        re.sub(r'\s+', ' ', (slot.get(field) or '').strip().lower()) or 'unknown'
+        for field in ('date', 'time', 'location')
+    )
+
+
+class SlotStateStore:
+    """SQLite snapshot of the slots each watch saw on its last successful check."""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS seen_slots (
+                watch TEXT NOT NULL,
+                slot_key TEXT NOT NULL,
+                date TEXT,
+                time TEXT,
+                location TEXT,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (watch, slot_key)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS reservations (
+                watch TEXT NOT NULL,
+                slot_key TEXT NOT NULL,
+                date TEXT,
+                time TEXT,
+                location TEXT,
+                reserved_at REAL NOT NULL,
+                PRIMARY KEY (watch, slot_key)
+            )
+        ''')
+        self.conn.commit()
+
+    @classmethod
+    def for_path(cls, path: str) -> 'SlotStateStore':
+        """Share one store per database file between all monitors in the process."""
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def diff(self, watch: str, slots: List[Dict[str, str]],
+             observed_at: Optional[float] = None) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        """Replace a watch's snapshot with the given slots and return (added, removed).
+
+        Slots first seen after observed_at (when the given slots were fetched)
+        are kept even if missing: the snapshot is older than the news.
+        """
+        current = {slot_key(slot): slot for slot in slots}
+
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT slot_key, date, time, location, first_seen FROM seen_slots WHERE watch = ?', (watch,)
+            ).fetchall()
+            previous = {row[0]: {'date': row[1], 'time': row[2], 'location': row[3]} for row in rows}
+            newer = {row[0] for row in rows if observed_at is not None and row[4] > observed_at}
+
+            added = [slot for key, slot in current.items() if key not in previous]
+            removed = [slot for key, slot in previous.items() if key not in current and key not in newer]
+
+            if added or removed:
+                now = time.time()
+                with self.conn:
+                    self.conn.executemany(
+                        'INSERT INTO seen_slots (watch, slot_key, date, time, location, first_seen) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        [(watch, slot_key(slot), slot.get('date'), slot.get('time'), slot.get('location'), now)
+                         for slot in added]
+                    )
+                    self.conn.executemany(
+                        'DELETE FROM seen_slots WHERE watch = ? AND slot_key = ?',
+                        [(watch, slot_key(slot)) for slot in removed]
+                    )
+                SLOTS_SEEN.inc(len(added))
+
+        return added, removed
+
+    def add(self, watch: str, slots: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Add slots to a watch's snapshot without removing any; returns those that were new.
+
+        For partial views of the schedule (the browser extension): only a full
+        check through diff() can tell that a slot is gone.
+        """
+        current = {slot_key(slot): slot for slot in slots}
+
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT slot_key FROM seen_slots WHERE watch = ?', (watch,)
+            ).fetchall()
+            previous = {row[0] for row in rows}
+
+            added = [slot for key, slot in current.items() if key not in previous]
+            if added:
+                now = time.time()
+                with self.conn:
+                    self.conn.executemany(
+                        'INSERT INTO seen_slots (watch, slot_key, date, time, location, first_seen) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        [(watch, slot_key(slot), slot.get('date'), slot.get('time'), slot.get('location'), now)
+                         for slot in added]
+                    )
+                SLOTS_SEEN.inc(len(added))
+
+        return added
+
+    def forget(self, watch: str, slots: List[Dict[str, str]]):
+        """Drop slots from a watch's snapshot, so the next check finds them new (their alert never went out)."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'DELETE FROM seen_slots WHERE watch = ? AND slot_key = ?',
+                [(watch, slot_key(slot)) for slot in slots]
+            )
+
+    def reservation_count(self, watch: str) -> int:
+        """How many slots have been reserved automatically for a watch."""
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM reservations WHERE watch = ?', (watch,)).fetchone()[0]
+
+    def record_reservation(self, watch: str, slot: Dict[str, str]):
+        """Remember a confirmed reservation, so the per-watch cap holds across restarts."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO reservations (watch, slot_key, date, time, location, reserved_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (watch, slot_key(slot), slot.get('date'), slot.get('time'), slot.get('location'), time.time())
+            )
@@ -50,7 +50,8 @@ def test_email_connection():
         password = os.getenv('EMAIL_PASSWORD')
         
         server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
+        if os.getenv('SMTP_STARTTLS', 'true').lower() == 'true':
+            server.starttls()
         server.login(email, password)
         server.quit()
         
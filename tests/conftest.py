@@ -0,0 +1,190 @@
+"""
+Shared fixtures: the repository root on sys.path, a local SMTP stand-in,
+the mock PrairieTest from benchmarks/ and monitors logged in to it.
+"""
+
+import os
+import sys
+import threading
+import socketserver
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_prairietest import MockPrairieTest
+
+
+class SmtpStandIn:
+    """Plain SMTP server that keeps every message in memory.
+
+    fail_data makes that many DATA commands answer 451, as a server under
+    load would. Every command received is logged, so a test can see whether
+    the client tried STARTTLS or AUTH.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.commands = []
+        self.connections = 0
+        self.fail_data = 0
+        self.lock = threading.Lock()
+        handler = type('_BoundSmtpHandler', (_SmtpHandler,), {'stand_in': self})
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name='smtp-stand-in', daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    stand_in = None
+
+    def _reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        stand_in = self.stand_in
+        with stand_in.lock:
+            stand_in.connections += 1
+        self._reply("220 localhost SMTP stand-in")
+        envelope = {}
+        for raw in self.rfile:
+            line = raw.decode('utf-8').rstrip('\r\n')
+            verb = line.split(' ', 1)[0].upper()
+            with stand_in.lock:
+                stand_in.commands.append(verb)
+            if verb == 'EHLO':
+                self._reply("250-localhost")
+                self._reply("250 8BITMIME")
+            elif verb in ('HELO', 'RSET', 'NOOP'):
+                envelope = {} if verb == 'RSET' else envelope
+                self._reply("250 OK")
+            elif verb == 'MAIL':
+                envelope = {'from': line.split(':', 1)[1].strip(' <>'), 'to': []}
+                self._reply("250 OK")
+            elif verb == 'RCPT':
+                envelope['to'].append(line.split(':', 1)[1].strip(' <>'))
+                self._reply("250 OK")
+            elif verb == 'DATA':
+                with stand_in.lock:
+                    failing = stand_in.fail_data > 0
+                    stand_in.fail_data -= failing
+                if failing:
+                    self._reply("451 Try again later")
+                    continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for body_line in self.rfile:
+                    if body_line in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(body_line[1:] if body_line.startswith(b'..') else body_line)
+                with stand_in.lock:
+                    stand_in.messages.append(dict(envelope, data=b''.join(data)))
+                self._reply("250 OK")
+            elif verb == 'QUIT':
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+@pytest.fixture
+def smtp_server():
+    stand_in = SmtpStandIn()
+    yield stand_in
+    stand_in.stop()
+
+
+@pytest.fixture
+def mock_prairietest():
+    mock = MockPrairieTest(slot_count=20)
+    mock.base_url = mock.start()
+    yield mock
+    mock.stop()
+
+
+TARGET_TIME = "9:00 PM"
+TARGET_LOCATION = "Target Hall"
+
+
+class CollectingNotifier:
+    """Keeps alerts in memory instead of emailing them."""
+
+    def __init__(self):
+        self.alerts = []
+        self.detected = []
+
+    def submit(self, slots, recipient, prairie_url, detected_at=None, on_undelivered=None):
+        self.alerts.append(list(slots))
+        self.detected.append(detected_at)
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def make_monitor(mock_prairietest, tmp_path):
+    """Factory for monitors logged in to the mock over HTTP, watching for the target slots.
+
+    Keyword arguments override the config; every monitor made is cleaned up
+    after the test.
+    """
+    from prairie_monitor import PrairieTestMonitor
+
+    monitors = []
+
+    def make(mode: str = 'http', notifier=None, **overrides):
+        config = dict(
+            prairie_url=mock_prairietest.base_url,
+            fetch_mode=mode,
+            desired_date=None,
+            desired_time=TARGET_TIME,
+            desired_location=TARGET_LOCATION,
+            desired_weekdays=None,
+            auto_reserve=True,
+            auto_reserve_dry_run=False,
+            auto_reserve_url_template='',
+            adaptive_polling=False,
+            metrics_port=0,
+            circuit_failure_threshold=0,
+            slot_state_db=str(tmp_path / 'slot_state.db'),
+            slot_archive_dir='',
+            slot_history_file=str(tmp_path / 'slot_history.json'),
+            selector_cache_file=str(tmp_path / 'selector_cache.json'),
+            session_dir=str(tmp_path / 'sessions'),
+        )
+        config.update(overrides)
+        monitor = PrairieTestMonitor(config=config, notifier=notifier or CollectingNotifier())
+        monitors.append(monitor)
+
+        # Stands in for the browser login (and, in api mode, the endpoint capture)
+        monitor._setup_http_session()
+        monitor.session.post(f"{mock_prairietest.base_url}login",
+                             data={'email': mock_prairietest.email, 'password': mock_prairietest.password})
+        monitor.is_logged_in = True
+        monitor.session_restore_attempted = True
+        if mode == 'api':
+            monitor.selector_cache.record(monitor._instance(), 'api_endpoints',
+                                          [f"{mock_prairietest.base_url}api/slots"])
+        return monitor
+
+    yield make
+    for monitor in monitors:
+        monitor.cleanup()
+
+
+@pytest.fixture
+def release_target(mock_prairietest):
+    """Opens a new slot the watch wants, on its own date so it is new to the watch; returns its id."""
+    def release(round_number: int) -> int:
+        slot_date = (date(2024, 7, 1) + timedelta(days=round_number)).isoformat()
+        slot_id = mock_prairietest.add_slot(slot_date, TARGET_TIME, TARGET_LOCATION)
+        mock_prairietest.release(slot_id)
+        return slot_id
+
+    return release
@@ -0,0 +1,61 @@
+"""The asyncio monitor against the mock PrairieTest, next to the sync checks it shares its steps with."""
+
+import asyncio
+
+import pytest
+
+from async_monitor import AsyncPrairieTestMonitor
+
+
+class CollectingSink:
+    def __init__(self):
+        self.alerts = []
+
+    async def send(self, slots, recipient, prairie_url, detected_at=None, on_undelivered=None):
+        self.alerts.append(list(slots))
+
+
+def run(watcher: AsyncPrairieTestMonitor, scenario):
+    """Run a coroutine against the async monitor, closing its client afterwards."""
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            if watcher.http is not None:
+                await watcher.http.close()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize('mode', ['http', 'api'])
+def test_new_slot_is_alerted_once(make_monitor, release_target, mode):
+    sink = CollectingSink()
+    watcher = AsyncPrairieTestMonitor(make_monitor(mode, auto_reserve=False), sinks=[sink])
+
+    async def scenario():
+        await watcher.check_and_notify()
+        release_target(0)
+        await watcher.check_and_notify()
+        await watcher.check_and_notify()
+
+    run(watcher, scenario)
+    assert [len(alert) for alert in sink.alerts] == [1]
+    assert watcher.monitor.breaker.failures == 0
+
+
+@pytest.mark.parametrize('path', ['sync', 'async'])
+def test_a_parser_error_counts_as_a_failed_check(make_monitor, tmp_path, monkeypatch, path):
+    monitor = make_monitor(auto_reserve=False, adaptive_polling=True)
+    watcher = AsyncPrairieTestMonitor(monitor, sinks=[CollectingSink()])
+
+    def broken_parser(page_source):
+        raise RuntimeError("parser broke")
+
+    monkeypatch.setattr(monitor, '_parse_slots', broken_parser)
+    if path == 'sync':
+        assert monitor._fetch_slots() is None
+    else:
+        assert run(watcher, watcher.fetch_slots) is None
+
+    assert monitor.breaker.failures == 1
+    assert monitor.interval_policy.consecutive_errors == 1
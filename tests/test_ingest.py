@@ -0,0 +1,70 @@
+"""Extension snapshots and scheduled checks sharing one slot state."""
+
+import json
+import time
+
+import pytest
+
+from conftest import TARGET_TIME
+from ingest import parse_snapshot
+
+
+def snapshot(url: str, slots) -> bytes:
+    return json.dumps({'url': url, 'slots': slots}).encode('utf-8')
+
+
+@pytest.mark.parametrize('location', ['Target Hall', ''])
+def test_slot_ingested_then_polled_is_alerted_once(make_monitor, mock_prairietest, location):
+    monitor = make_monitor(auto_reserve=False, desired_location=None)
+    assert monitor.check_and_notify()
+
+    slot_id = mock_prairietest.add_slot('2024-07-01', TARGET_TIME, location)
+    mock_prairietest.release(slot_id)
+    # What the content script sends for that slot: "Unknown" where it could not read a field
+    seen = {'date': '2024-07-01', 'time': TARGET_TIME, 'location': location or 'Unknown'}
+    slots = parse_snapshot(snapshot(mock_prairietest.base_url, [seen]))['slots']
+
+    assert monitor.ingest_slots(slots, mock_prairietest.base_url) == 1
+    assert monitor.check_and_notify()
+    assert monitor.check_and_notify()
+    assert len(monitor.notifier.alerts) == 1
+
+
+def test_unreadable_fields_are_shaped_like_the_parsers():
+    slots = parse_snapshot(snapshot('https://us.prairietest.com/', [
+        {'date': '2024-07-01', 'time': '9:00 PM', 'location': 'Unknown'},
+        {'date': '2024-07-02', 'time': '9:00 PM'},
+        {'date': 'Unknown', 'time': 'Unknown', 'location': 'Main'},
+    ]))['slots']
+
+    assert slots == [{'date': '2024-07-01', 'time': '9:00 PM', 'location': 'Unknown'},
+                     {'date': '2024-07-02', 'time': '9:00 PM', 'location': 'Unknown'}]
+
+
+def test_ingest_alert_is_stamped_with_the_snapshot_arrival(make_monitor, mock_prairietest):
+    monitor = make_monitor(auto_reserve=False, desired_location=None)
+    assert monitor.check_and_notify()
+    last_check = monitor.check_started
+
+    slot = {'date': '2024-07-01', 'time': TARGET_TIME, 'location': 'Main'}
+    before = time.time()
+    assert monitor.ingest_slots([slot], mock_prairietest.base_url) == 1
+    assert monitor.notifier.detected[-1] >= before > last_check
+
+
+def test_ingest_that_books_leaves_the_next_check_in_step(make_monitor, mock_prairietest, release_target):
+    monitor = make_monitor()
+    assert monitor.check_and_notify()
+
+    seen, unseen = release_target(0), release_target(1)
+    # The extension only had the first slot on screen
+    slot = mock_prairietest.slots[seen]
+    assert monitor.ingest_slots([{'date': slot.date, 'time': slot.time, 'location': slot.location}],
+                                mock_prairietest.base_url) == 1
+    assert monitor.check_and_notify()
+
+    # The slot seen first is booked first; the cap of one leaves the other alerted only
+    assert mock_prairietest.slots[seen].reserved_by is not None
+    assert mock_prairietest.slots[unseen].reserved_by is None
+    alerted = [alerted_slot['date'] for alert in monitor.notifier.alerts for alerted_slot in alert]
+    assert sorted(alerted) == sorted([slot.date, mock_prairietest.slots[unseen].date])
@@ -0,0 +1,126 @@
+"""NotificationDispatcher against a local SMTP stand-in."""
+
+import email
+from functools import partial
+
+from notifier import NotificationDispatcher
+from slot_state import SlotStateStore
+from metrics import NOTIFICATIONS
+
+SLOT_A = {'date': '2024-03-01', 'time': '9:00 PM', 'location': 'Main Testing Center'}
+SLOT_B = {'date': '2024-03-02', 'time': '10:00 AM', 'location': 'CBTF Grainger'}
+
+
+def make_dispatcher(smtp_server, **overrides) -> NotificationDispatcher:
+    config = dict(
+        smtp_server='127.0.0.1',
+        smtp_port=smtp_server.port,
+        smtp_starttls=False,
+        notification_email='monitor@example.edu',
+        email_password='',
+        notify_coalesce_seconds=0.5,
+        smtp_idle_timeout=60,
+        notify_max_retries=3,
+    )
+    config.update(overrides)
+    return NotificationDispatcher(config)
+
+
+def html_body(message) -> str:
+    parsed = email.message_from_bytes(message['data'])
+    return parsed.get_payload()[0].get_payload(decode=True).decode('utf-8')
+
+
+def failed_count() -> float:
+    return NOTIFICATIONS.snapshot().get('failed', 0)
+
+
+def test_alerts_within_the_window_are_coalesced_per_recipient(smtp_server):
+    dispatcher = make_dispatcher(smtp_server)
+    dispatcher.submit([SLOT_A], 'student@example.edu', 'https://us.prairietest.com/')
+    dispatcher.submit([SLOT_B, SLOT_A], 'student@example.edu', 'https://us.prairietest.com/')
+    dispatcher.submit([SLOT_B], 'other@example.edu', 'https://us.prairietest.com/')
+    dispatcher.stop()
+
+    by_recipient = {message['to'][0]: message for message in smtp_server.messages}
+    assert sorted(by_recipient) == ['other@example.edu', 'student@example.edu']
+    body = html_body(by_recipient['student@example.edu'])
+    # One email with both slots, each listed once
+    assert body.count('Main Testing Center') == 1
+    assert body.count('CBTF Grainger') == 1
+    assert 'Main Testing Center' not in html_body(by_recipient['other@example.edu'])
+    # Both emails went over one connection
+    assert smtp_server.connections == 1
+
+
+def test_a_temporary_failure_is_retried_on_a_new_connection(smtp_server):
+    smtp_server.fail_data = 1
+    dispatcher = make_dispatcher(smtp_server, notify_coalesce_seconds=0)
+    dispatcher.submit([SLOT_A], 'student@example.edu', 'https://us.prairietest.com/')
+    dispatcher.stop()
+
+    assert len(smtp_server.messages) == 1
+    assert smtp_server.commands.count('DATA') == 2
+    assert smtp_server.connections == 2
+
+
+def test_delivery_gives_up_after_max_retries(smtp_server):
+    smtp_server.fail_data = 10
+    failed_before = failed_count()
+    dispatcher = make_dispatcher(smtp_server, notify_coalesce_seconds=0, notify_max_retries=2)
+    dispatcher.submit([SLOT_A], 'student@example.edu', 'https://us.prairietest.com/')
+    dispatcher.stop()
+
+    assert smtp_server.messages == []
+    assert smtp_server.commands.count('DATA') == 2
+    assert failed_count() == failed_before + 1
+
+
+def test_undelivered_slots_are_alerted_again_on_the_next_check(smtp_server, tmp_path):
+    store = SlotStateStore(str(tmp_path / 'slot_state.db'))
+    # The check that found the slot marks it seen before the email goes out
+    assert store.diff('watch', [SLOT_A, SLOT_B]) == ([SLOT_A, SLOT_B], [])
+
+    smtp_server.fail_data = 10
+    dispatcher = make_dispatcher(smtp_server, notify_coalesce_seconds=0, notify_max_retries=2)
+    dispatcher.submit([SLOT_A], 'student@example.edu', 'https://us.prairietest.com/',
+                      on_undelivered=partial(store.forget, 'watch'))
+    dispatcher.stop()
+
+    assert smtp_server.messages == []
+    assert store.diff('watch', [SLOT_A, SLOT_B]) == ([SLOT_A], [])
+
+
+def test_delivered_slots_are_not_alerted_again(smtp_server, tmp_path):
+    store = SlotStateStore(str(tmp_path / 'slot_state.db'))
+    store.diff('watch', [SLOT_A])
+
+    dispatcher = make_dispatcher(smtp_server, notify_coalesce_seconds=0)
+    dispatcher.submit([SLOT_A], 'student@example.edu', 'https://us.prairietest.com/',
+                      on_undelivered=partial(store.forget, 'watch'))
+    dispatcher.stop()
+
+    assert len(smtp_server.messages) == 1
+    assert store.diff('watch', [SLOT_A]) == ([], [])
+
+
+def test_starttls_false_sends_without_tls_or_login(smtp_server):
+    dispatcher = make_dispatcher(smtp_server, notify_coalesce_seconds=0)
+    dispatcher.submit([SLOT_A], 'student@example.edu', 'https://us.prairietest.com/')
+    dispatcher.stop()
+
+    assert len(smtp_server.messages) == 1
+    assert 'STARTTLS' not in smtp_server.commands
+    assert 'AUTH' not in smtp_server.commands
+
+
+def test_starttls_true_is_not_skipped_when_the_server_lacks_it(smtp_server):
+    failed_before = failed_count()
+    dispatcher = make_dispatcher(smtp_server, smtp_starttls=True, notify_coalesce_seconds=0, notify_max_retries=1)
+    dispatcher.submit([SLOT_A], 'student@example.edu', 'https://us.prairietest.com/')
+    dispatcher.stop()
+
+    # The stand-in does not offer STARTTLS, so nothing may be sent in the clear
+    assert smtp_server.messages == []
+    assert 'MAIL' not in smtp_server.commands
+    assert failed_count() == failed_before + 1
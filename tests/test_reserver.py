@@ -0,0 +1,70 @@
+"""Auto-reserve end to end against the mock PrairieTest."""
+
+import pytest
+
+from reserver import targets_from_html
+
+
+@pytest.fixture(params=['http', 'api'])
+def reserving(request, make_monitor):
+    """A logged-in monitor that reserves the target slots, after a first check of the schedule."""
+    monitor = make_monitor(request.param)
+    assert monitor.check_and_notify()
+    return monitor, monitor.notifier
+
+
+def test_new_matching_slot_is_reserved_and_alerted(reserving, mock_prairietest, release_target):
+    monitor, notifier = reserving
+    slot_id = release_target(0)
+    monitor.check_and_notify()
+
+    assert mock_prairietest.slots[slot_id].reserved_by is not None
+    assert notifier.alerts[-1][0]['reserved'] == 'yes'
+    assert monitor.slot_state.reservation_count(monitor.config['watch_name']) == 1
+
+
+def test_no_booking_beyond_the_cap(reserving, mock_prairietest, release_target):
+    monitor, notifier = reserving
+    monitor.reserver.max_per_watch = 1
+    first, second = release_target(0), release_target(1)
+    monitor.check_and_notify()
+    third = release_target(2)
+    monitor.check_and_notify()
+
+    booked = [slot_id for slot_id in (first, second, third) if mock_prairietest.slots[slot_id].reserved_by]
+    assert len(booked) == 1
+    # The capped slot is still alerted, just not booked
+    assert notifier.alerts[-1][0].get('reserved') is None
+
+
+def test_dry_run_books_nothing(reserving, mock_prairietest, release_target):
+    monitor, notifier = reserving
+    monitor.reserver.dry_run = True
+    slot_id = release_target(0)
+    monitor.check_and_notify()
+
+    assert mock_prairietest.slots[slot_id].reserved_by is None
+    assert notifier.alerts[-1][0]['reserved'] == 'dry run'
+    assert monitor.slot_state.reservation_count(monitor.config['watch_name']) == 0
+
+
+def test_refused_booking_keeps_the_session(reserving, mock_prairietest, release_target):
+    monitor, notifier = reserving
+    # A full slot, a closed window or a stale CSRF token all come back as 403
+    mock_prairietest.reserve = lambda token, slot_id, csrf=None: 403
+    slot_id = release_target(0)
+    monitor.check_and_notify()
+
+    assert mock_prairietest.slots[slot_id].reserved_by is None
+    assert notifier.alerts[-1][0].get('reserved') is None
+    assert monitor.is_logged_in
+    assert monitor.slot_state.reservation_count(monitor.config['watch_name']) == 0
+
+
+def test_plain_links_are_not_reservation_targets():
+    page = """<html><body><div class="slot">
+      <span class="date">2024-03-01</span><span class="time">9:00 PM</span><span class="location">Main</span>
+      <a href="/reservations/7/details">Reservation details</a>
+    </div></body></html>"""
+
+    assert targets_from_html(page, 'https://us.prairietest.com/') == {}
@@ -0,0 +1,188 @@
+"""Lease store and sharded workers: expiry, takeover, fencing and request spacing."""
+
+import time
+import threading
+
+import pytest
+
+from sharding import LeaseStore, ShardWorker
+from watch_supervisor import Watch
+
+# Long enough for a slow machine to get through a round of heartbeats
+TTL = 1.0
+
+
+def watches(base_url: str, count: int):
+    # Nothing on the mock is at 23:59, so checks never alert
+    return [Watch.from_definition({'name': f"watch-{index}", 'prairie_url': base_url,
+                                   'school_email': f"student{index}@example.edu", 'desired_time': '23:59'}, index)
+            for index in range(count)]
+
+
+def owners(store: LeaseStore):
+    return {lease['account']: lease['worker'] for lease in store.status()['leases']}
+
+
+@pytest.fixture
+def worker_env(monkeypatch, tmp_path):
+    """Keep the workers' state files in tmp_path and their servers off."""
+    for name, value in (('METRICS_PORT', '0'), ('INGEST_PORT', '0'), ('SLOT_ARCHIVE_DIR', ''),
+                        ('ACCOUNT_RATE_LIMIT_SECONDS', '0'), ('ADAPTIVE_POLLING', 'false'),
+                        ('SLOT_STATE_DB', str(tmp_path / 'slot_state.db')),
+                        ('SLOT_HISTORY_FILE', str(tmp_path / 'slot_history.json')),
+                        ('SELECTOR_CACHE_FILE', str(tmp_path / 'selector_cache.json')),
+                        ('SESSION_DIR', str(tmp_path / 'sessions'))):
+        monkeypatch.setenv(name, value)
+    return str(tmp_path / 'leases.db')
+
+
+def make_worker(store_path: str, worker_id: str, mock) -> ShardWorker:
+    def log_in(monitor):
+        # Stands in for the browser login, as in benchmarks/bench_workers.py
+        monitor._setup_http_session()
+        monitor.session.post(f"{mock.base_url}login", data={'email': mock.email, 'password': mock.password},
+                             allow_redirects=False)
+        monitor.is_logged_in = True
+        monitor.session_restore_attempted = True
+
+    return ShardWorker(LeaseStore(store_path, ttl=TTL), worker_id=worker_id, monitor_hook=log_in)
+
+
+def test_expired_lease_has_exactly_one_new_owner(tmp_path):
+    path = str(tmp_path / 'leases.db')
+    coordinator, first, second = LeaseStore(path, ttl=TTL), LeaseStore(path, ttl=TTL), LeaseStore(path, ttl=TTL)
+    coordinator.publish(watches('https://us.prairietest.com/', 3))
+
+    assert len(first.claim('a', 10)) == 3
+    # Held leases cannot be claimed
+    assert second.claim('b', 10) == []
+
+    time.sleep(TTL + 0.1)
+    assert len(second.claim('b', 10)) == 3
+    assert set(owners(coordinator).values()) == {'b'}
+    # The old holder finds out on its next renewal and is fenced out
+    assert first.renew('a') == {}
+    assert not any(first.holds('a', account) for account in owners(coordinator))
+    for store in (coordinator, first, second):
+        store.close()
+
+
+def test_request_spacing_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / 'leases.db')
+    first, second = LeaseStore(path), LeaseStore(path)
+
+    assert first.reserve_request('acct', 5) == 0
+    assert 4 < second.reserve_request('acct', 5) <= 5
+    assert second.reserve_request('other', 5) == 0
+    first.close()
+    second.close()
+
+
+def test_republished_watches_bump_the_version(tmp_path):
+    store = LeaseStore(str(tmp_path / 'leases.db'))
+    published = watches('https://us.prairietest.com/', 2)
+    assert store.publish(published) == {'added': 2, 'updated': 0, 'removed': 0}
+    assert store.publish(published) == {'added': 0, 'updated': 0, 'removed': 0}
+
+    published[0].criteria['desired_time'] = '21:00'
+    assert store.publish(published[:1]) == {'added': 0, 'updated': 1, 'removed': 1}
+    assert [lease['version'] for lease in store.status()['leases']] == [2]
+    store.close()
+
+
+def test_workers_split_accounts_and_take_over_a_dead_worker(worker_env, mock_prairietest):
+    coordinator = LeaseStore(worker_env, ttl=TTL)
+    coordinator.publish(watches(mock_prairietest.base_url, 4))
+    first = make_worker(worker_env, 'a', mock_prairietest)
+    second = make_worker(worker_env, 'b', mock_prairietest)
+    try:
+        first._heartbeat()
+        assert len(first.accounts) == 4
+
+        # A second worker joins: the first hands back its surplus, the second claims it
+        second._heartbeat()
+        first._heartbeat()
+        second._heartbeat()
+        assert len(first.accounts) == 2 and len(second.accounts) == 2
+        assert set(owners(coordinator).values()) == {'a', 'b'}
+
+        # The first worker stalls past its TTL; the second takes over everything
+        time.sleep(TTL + 0.1)
+        second._heartbeat()
+        second._heartbeat()
+        assert set(owners(coordinator).values()) == {'b'}
+        assert len(second.accounts) == 4
+
+        # Fencing: the stalled worker's pending check must not reach the site
+        stale = next(iter(first.accounts))
+        requests_before = len(mock_prairietest.request_log)
+        first._check(stale)
+        assert len(mock_prairietest.request_log) == requests_before
+        second._check(stale)
+        assert len(mock_prairietest.request_log) == requests_before + 1
+
+        # On its next heartbeat the stalled worker drops the accounts it lost
+        first._heartbeat()
+        assert first.accounts == {}
+        assert set(owners(coordinator).values()) == {'b'}
+    finally:
+        first.cleanup()
+        second.cleanup()
+        coordinator.close()
+
+
+def test_clean_stop_hands_leases_back_at_once(worker_env, mock_prairietest):
+    coordinator = LeaseStore(worker_env, ttl=60)
+    coordinator.publish(watches(mock_prairietest.base_url, 2))
+    worker = make_worker(worker_env, 'a', mock_prairietest)
+    worker._heartbeat()
+    assert set(owners(coordinator).values()) == {'a'}
+
+    worker.cleanup()
+    assert set(owners(coordinator).values()) == {None}
+    assert coordinator.status()['workers'] == []
+    coordinator.close()
+
+
+def test_lease_lost_mid_check_is_dropped_when_the_check_finishes(worker_env, mock_prairietest):
+    coordinator = LeaseStore(worker_env, ttl=TTL)
+    coordinator.publish(watches(mock_prairietest.base_url, 1))
+    first = make_worker(worker_env, 'a', mock_prairietest)
+    second = make_worker(worker_env, 'b', mock_prairietest)
+    try:
+        first._heartbeat()
+        account = next(iter(first.accounts))
+        account_key = first.accounts[account][0]
+        monitor = first.supervisor.monitors[account_key]
+
+        # The check stalls on the site until the lease has moved to the second worker
+        checking, finish = threading.Event(), threading.Event()
+        check_account = first.supervisor.check_account
+
+        def stalled_check(key):
+            checking.set()
+            finish.wait(10)
+            return check_account(key)
+
+        first.supervisor.check_account = stalled_check
+        first.running.add(account)
+        check = threading.Thread(target=first._check, args=(account,))
+        check.start()
+        assert checking.wait(10)
+        time.sleep(TTL + 0.1)
+        second._heartbeat()
+        assert set(owners(coordinator).values()) == {'b'}
+
+        # The monitor stays in place while the check still uses it
+        first._heartbeat()
+        assert first.supervisor.monitors.get(account_key) is monitor
+
+        finish.set()
+        check.join(10)
+        assert first.accounts == {}
+        assert account_key not in first.supervisor.monitors
+        assert account not in first.due
+    finally:
+        first.cleanup()
+        second.cleanup()
+        coordinator.close()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+PrairieTest Watch Supervisor
+Runs many watches (account plus slot criteria) concurrently from one process,
+sharing a bounded pool of browsers and one schedule fetch per account.
+"""
+
+import sys
+import json
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from typing import Optional, List, Dict, Any, Callable
+
+from config import load_config
+from prairie_monitor import PrairieTestMonitor
+from browser_factory import ChromeFactory
+from notifier import NotificationDispatcher
+from slot_matcher import SlotMatcher, WatchRule
+from scheduler import PreciseScheduler
+from metrics import MetricsExporter, STAGE_SECONDS, INGESTED
+from logging_setup import configure_logging, stop_logging, start_check
+from ingest import IngestServer, IngestError
+
+logger = logging.getLogger(__name__)
+
+# Watch keys that configure the account rather than the slot criteria
+ACCOUNT_KEYS = ('prairie_url', 'school_email', 'school_password')
+CRITERIA_KEYS = ('desired_date', 'desired_time', 'desired_location', 'desired_weekdays')
+
+
+class BrowserPool:
+    """Bounded pool of WebDriver instances shared by all accounts.
+
+    Browsers are only borrowed to log in (or to fall back when an HTTP
+    session expires, or for a check of a page only the browser renders) and
+    go back after each check, so a small pool serves any number of watches.
+    """
+
+    def __init__(self, size: int, driver_factory: Callable[[], Any]):
+        self.size = size
+        self.driver_factory = driver_factory
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Borrow a browser, blocking until one is free."""
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop()
+            driver = self.driver_factory()
+            with self._lock:
+                self._all.append(driver)
+            logger.info("Browser pool started browser %s/%s", len(self._all), self.size)
+            return driver
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, driver):
+        """Return a browser to the pool, dropping the previous account's cookies."""
+        try:
+            driver.delete_all_cookies()
+            with self._lock:
+                self._idle.append(driver)
+        except Exception as e:
+            # A browser that cannot be cleaned is not safe to hand to another account
+            logger.warning("Discarding broken pooled browser: %s", e)
+            self._discard(driver)
+        finally:
+            self._slots.release()
+
+    def replace(self, driver):
+        """Swap a borrowed browser that died for a new one, keeping the caller's slot."""
+        self._discard(driver)
+        try:
+            new_driver = self.driver_factory()
+        except Exception:
+            # The caller no longer holds a browser, so it will not release the slot
+            self._slots.release()
+            raise
+        with self._lock:
+            self._all.append(new_driver)
+        return new_driver
+
+    def _discard(self, driver):
+        """Quit a browser and forget about it."""
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """Quit every browser owned by the pool."""
+        with self._lock:
+            drivers, self._all, self._idle = self._all, [], []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+class Watch:
+    """One account plus the slot criteria a user wants to be alerted about."""
+
+    def __init__(self, name: str, account: Dict[str, Any], criteria: Dict[str, Any],
+                 notification_email: Optional[str] = None):
+        self.name = name
+        self.account = account
+        self.criteria = criteria
+        self.notification_email = notification_email
+
+    @property
+    def account_key(self):
+        """Watches with the same key share one login and one schedule fetch."""
+        return (self.account.get('prairie_url'), self.account.get('school_email'))
+
+    @classmethod
+    def from_definition(cls, definition: Dict[str, Any], index: int = 0) -> 'Watch':
+        """A watch from one object of a watches file."""
+        return cls(
+            name=definition.get('name', f"watch-{index + 1}"),
+            account={key: definition[key] for key in ACCOUNT_KEYS if definition.get(key)},
+            criteria={key: definition.get(key) for key in CRITERIA_KEYS},
+            notification_email=definition.get('notification_email')
+        )
+
+    def definition(self) -> Dict[str, Any]:
+        """The watches file object this watch was loaded from (unset keys left out)."""
+        definition = dict(self.account, name=self.name)
+        definition.update({key: value for key, value in self.criteria.items() if value})
+        if self.notification_email:
+            definition['notification_email'] = self.notification_email
+        return definition
+
+
+def load_watches(path: str) -> List[Watch]:
+    """Load watch definitions from a JSON file (a list of objects)."""
+    with open(path, 'r') as f:
+        definitions = json.load(f)
+    return [Watch.from_definition(definition, index) for index, definition in enumerate(definitions)]
+
+
+class WatchSupervisor:
+    def __init__(self, watches: List[Watch], max_browsers: Optional[int] = None,
+                 max_workers: Optional[int] = None):
+        self.config = load_config()
+        self.watches = watches
+        self.max_workers = max_workers or self.config['max_workers']
+        self.monitors = {}
+        self.matchers = {}
+        self.watches_by_account = {}
+
+        # The pool only creates browsers on demand, from the profiles every monitor shares
+        self.browser_pool = BrowserPool(max_browsers or self.config['max_browsers'],
+                                        ChromeFactory.for_config(self.config).create)
+        # One mail connection serves every watch, and alerts to the same person are coalesced
+        self.notifier = NotificationDispatcher(self.config)
+
+        by_account = {}
+        for watch in watches:
+            by_account.setdefault(watch.account_key, []).append(watch)
+        for account_watches in by_account.values():
+            self.add_account(account_watches)
+
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='watch')
+        self.scheduler = PreciseScheduler(executor=self.executor)
+        self.metrics_exporter = MetricsExporter.from_config(self.config)
+        self.ingest_server = IngestServer.from_config(
+            self.config, self.ingest_slots,
+            hosts=sorted({urlparse(monitor.config['prairie_url']).netloc for monitor in self.monitors.values()})
+        )
+
+    def add_account(self, account_watches: List[Watch]):
+        """Start monitoring the watches of one account; returns its account key."""
+        account_key = account_watches[0].account_key
+        self.watches_by_account[account_key] = list(account_watches)
+        # Accounts poll over HTTP (or the captured JSON endpoints) and only borrow a browser to log in
+        fetch_mode = 'api' if self.config['fetch_mode'] == 'api' else 'http'
+        config = dict(account_watches[0].account, fetch_mode=fetch_mode)
+        self.monitors[account_key] = PrairieTestMonitor(config=config, browser_pool=self.browser_pool,
+                                                        notifier=self.notifier)
+        # Every watch on the account is matched against the same page in one pass
+        self.matchers[account_key] = SlotMatcher([
+            WatchRule.from_criteria(watch.name, watch.criteria) for watch in account_watches
+        ])
+        return account_key
+
+    def remove_account(self, account_key):
+        """Stop monitoring an account and close its session."""
+        self.watches_by_account.pop(account_key, None)
+        self.matchers.pop(account_key, None)
+        monitor = self.monitors.pop(account_key, None)
+        if monitor is not None:
+            monitor.cleanup()
+
+    def check_account(self, account_key) -> bool:
+        """Fetch an account's schedule once and evaluate every watch on it; returns whether the fetch succeeded."""
+        start_check()
+        monitor = self.monitors[account_key]
+        with monitor.check_lock:
+            return self._finish_check(account_key, monitor._fetch_slots())
+
+    def _finish_check(self, account_key, slots: Optional[List[Dict[str, str]]]) -> bool:
+        """Alert every watch on what a check fetched, with check_lock held; returns whether the fetch succeeded."""
+        monitor = self.monitors[account_key]
+        if slots is None:
+            return False
+        if monitor.schedule_unchanged:
+            logger.info("Schedule unchanged for %s, nothing to match (%s)",
+                        account_key[1], monitor.page_cache.summary())
+            return True
+
+        self._alert_watches(account_key, slots)
+        monitor.last_check = datetime.now()
+        return True
+
+    def _alert_watches(self, account_key, slots: List[Dict[str, str]], snapshot_only: bool = False,
+                       detected_at: Optional[float] = None) -> int:
+        """Match every watch on an account against its slots and alert on new ones; returns how many were new.
+
+        A partial view (an extension snapshot) only adds slots; checks retire them.
+        detected_at is when the slots were seen, if not at the start of the last check.
+        """
+        monitor = self.monitors[account_key]
+        with STAGE_SECONDS.time(stage='match'):
+            matches = self.matchers[account_key].match_all(slots)
+
+        alerts = []
+        for watch in self.watches_by_account[account_key]:
+            matching = matches[watch.name]
+            if snapshot_only:
+                new_slots = monitor.slot_state.add(watch.name, matching)
+            else:
+                new_slots, _ = monitor.slot_state.diff(watch.name, matching, observed_at=monitor.check_started)
+            if new_slots:
+                logger.info("[%s] Found %s new available slots!", watch.name, len(new_slots))
+                alerts.append((watch, new_slots))
+            elif snapshot_only:
+                continue
+            elif matching:
+                logger.info("[%s] No new slots (%s already notified)", watch.name, len(matching))
+            else:
+                logger.info("[%s] No available slots found", watch.name)
+
+        # Reservation forms are read from a fetched page, so check the schedule before booking
+        refetch = snapshot_only and alerts and monitor.reserver.enabled
+        checked = monitor._fetch_slots() if refetch else None
+        for watch, new_slots in alerts:
+            monitor._send_notification(monitor._reserve_slots(new_slots, watch.name, detected_at=detected_at),
+                                       recipient=watch.notification_email, detected_at=detected_at,
+                                       watch=watch.name)
+        if refetch:
+            # The rest of that check, or the next one would find the page unchanged and skip its diff
+            self._finish_check(account_key, checked)
+        return sum(len(new_slots) for _, new_slots in alerts)
+
+    def ingest_slots(self, slots: List[Dict[str, str]], page_url: str = '') -> int:
+        """Alert every watch of the extension user's account on a snapshot; returns how many slots were new."""
+        host = urlparse(page_url).netloc
+        account = self.config['ingest_account']
+        accounts = [key for key, monitor in self.monitors.items()
+                    if urlparse(monitor.config['prairie_url']).netloc == host
+                    and (not account or monitor.config['school_email'] == account)]
+        if len(accounts) != 1:
+            raise IngestError(f"{len(accounts)} accounts on {host} match the snapshot; set INGEST_ACCOUNT to one")
+
+        received = time.time()
+        monitor = self.monitors[accounts[0]]
+        with monitor.check_lock:
+            if not monitor._fresh_snapshot(slots):
+                return 0
+            new = self._alert_watches(accounts[0], slots, snapshot_only=True, detected_at=received)
+        INGESTED.inc(result='new' if new else 'seen')
+        return new
+
+    def check_all(self) -> bool:
+        """Check every account concurrently and wait for the round to finish; True if every check succeeded."""
+        futures = {self.executor.submit(self.check_account, key): key for key in self.monitors}
+        wait(futures)
+        succeeded = True
+        for future, (url, email) in futures.items():
+            if future.exception():
+                logger.error("Error checking %s on %s: %s", email, url, future.exception())
+                succeeded = False
+            elif not future.result():
+                succeeded = False
+        return succeeded
+
+    def run(self):
+        """Check each account on its own schedule until interrupted."""
+        logger.info("Supervising %s watches across %s accounts with at most %s browsers",
+                    len(self.watches), len(self.monitors), self.browser_pool.size)
+        self.metrics_exporter.start()
+        self.ingest_server.start()
+
+        for account_key, monitor in self.monitors.items():
+            self.scheduler.add_job(
+                f"check {account_key[1]}",
+                partial(self.check_account, account_key),
+                monitor._next_delay
+            )
+        self.scheduler.run_forever()
+
+    def cleanup(self):
+        """Release every account session and pooled browser."""
+        self.scheduler.stop()
+        self.executor.shutdown(wait=False)
+        for monitor in self.monitors.values():
+            monitor.cleanup()
+        self.notifier.stop()
+        self.browser_pool.close()
+        self.metrics_exporter.stop()
+        self.ingest_server.stop()
+
+
+if __name__ == "__main__":
+    supervisor = WatchSupervisor(load_watches(sys.argv[1] if len(sys.argv) > 1 else 'watches.json'))
+    configure_logging(supervisor.config)
+
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        logger.info("Received interrupt signal, stopping supervisor...")
+    finally:
+        supervisor.cleanup()
+        stop_logging()